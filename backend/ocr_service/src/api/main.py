@@ -4,7 +4,8 @@ FastAPI main application for OCR VLM service
 from fastapi import FastAPI, File, UploadFile, HTTPException, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from typing import List, Dict, Any
+from typing import Optional
+import os
 import uuid
 import asyncio
 from datetime import datetime
@@ -12,9 +13,10 @@ import json
 
 from loguru import logger
 from .routes import ocr, health
+from ..core.job_queue import JobQueue, SQLiteJobStore
 from ..core.ocr_processor import OCRProcessor
-from ..core.cache import CacheManager
-from ..core.monitoring import MetricsCollector
+from ..utils.cache_manager import CacheManager
+from ..utils.metrics_collector import MetricsCollector
 
 app = FastAPI(
     title="OCR VLM Service",
@@ -36,22 +38,48 @@ app.include_router(ocr.router, prefix="/api/v1", tags=["ocr"])
 app.include_router(health.router, prefix="/api/v1", tags=["health"])
 
 # Global instances
-ocr_processor = OCRProcessor()
 cache_manager = CacheManager()
+ocr_processor = OCRProcessor(
+    stage_cache=cache_manager,
+    image_cache_mb=int(os.getenv("OCR_IMAGE_CACHE_MB", "512")),
+    image_cache_ttl=int(os.getenv("OCR_IMAGE_CACHE_TTL", "600"))
+)
 metrics = MetricsCollector()
+job_queue: Optional[JobQueue] = None
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize services on startup"""
+    global job_queue
+    
     await ocr_processor.initialize()
     await cache_manager.initialize()
+    
+    # Batch jobs persist in SQLite so they survive restarts without Redis
+    job_queue = JobQueue(
+        handler=ocr.process_job,
+        store=SQLiteJobStore(os.getenv("OCR_JOB_DB_PATH", "data/jobs.sqlite3")),
+        max_workers=int(os.getenv("OCR_JOB_WORKERS", "2"))
+    )
+    
+    ocr.ocr_processor = ocr_processor
+    ocr.cache_manager = cache_manager
+    ocr.metrics = metrics
+    ocr.job_queue = job_queue
+    health.ocr_processor = ocr_processor
+    health.cache_manager = cache_manager
+    
+    await job_queue.start()
     logger.info("OCR VLM Service started successfully")
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup on shutdown"""
+    if job_queue is not None:
+        await job_queue.stop()
+        job_queue.store.close()
     await ocr_processor.shutdown()
-    await cache_manager.shutdown()
+    await cache_manager.close()
     logger.info("OCR VLM Service shutdown complete")
 
 @app.get("/")
@@ -66,7 +94,7 @@ async def root():
 @app.get("/metrics")
 async def get_metrics():
     """Get performance metrics"""
-    return metrics.get_metrics()
+    return await metrics.get_system_metrics()
 
 if __name__ == "__main__":
     import uvicorn
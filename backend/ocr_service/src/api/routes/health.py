@@ -6,7 +6,7 @@ from fastapi.responses import JSONResponse
 
 from loguru import logger
 from ...core.ocr_processor import OCRProcessor
-from ...core.cache import CacheManager
+from ...utils.cache_manager import CacheManager
 
 router = APIRouter()
 
@@ -1,20 +1,23 @@
 """
 OCR processing endpoints
 """
-from fastapi import APIRouter, File, UploadFile, HTTPException, BackgroundTasks, Query
+from fastapi import APIRouter, File, UploadFile, HTTPException, Query
 from fastapi.responses import JSONResponse, StreamingResponse
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
+import base64
+import binascii
 import uuid
 import json
 from datetime import datetime
 
 from loguru import logger
-from ...core.ocr_processor import OCRProcessor
-from ...core.cache import CacheManager
-from ...core.monitoring import MetricsCollector
+from ...core.job_queue import Job, JobQueue
+from ...core.ocr_processor import OCRProcessor, ProgressCallback
+from ...utils.cache_manager import CacheManager
+from ...utils.metrics_collector import MetricsCollector
 from ...models.schemas import (
-    OCRRequest, OCRResponse, BatchOCRRequest, 
-    ProcessingStatus, DocumentType
+    OCRRequest, OCRResponse, BatchOCRRequest, JobStatusResponse,
+    ProcessingStatus, DocumentType, ProcessingConfig
 )
 
 router = APIRouter()
@@ -23,6 +26,69 @@ router = APIRouter()
 ocr_processor: OCRProcessor = None
 cache_manager: CacheManager = None
 metrics: MetricsCollector = None
+job_queue: JobQueue = None
+
+async def _process_with_cache(
+    content: bytes,
+    filename: str,
+    document_type: DocumentType,
+    language: str,
+    enable_cache: bool,
+    request_id: str,
+    progress_callback: Optional[ProgressCallback] = None,
+    config: Optional[ProcessingConfig] = None
+) -> Tuple[Dict[str, Any], bool]:
+    """
+    Return (result, cached) for a document, consulting the cache first
+    
+    Results are keyed by content hash, options and pipeline version, and
+    concurrent uploads of the same document share one processing run.
+    """
+    config = config or ProcessingConfig()
+    
+    async def process() -> Dict[str, Any]:
+        return await ocr_processor.process_document(
+            content=content,
+            filename=filename,
+            document_type=document_type,
+            language=language,
+            request_id=request_id,
+            config=config,
+            progress_callback=progress_callback
+        )
+    
+    if not enable_cache:
+        return await process(), False
+    
+    cache_key = await cache_manager.generate_key(
+        content,
+        DocumentType(document_type).value,
+        language,
+        processing_config=config.model_dump(mode="json"),
+        engine_version=ocr_processor.PIPELINE_VERSION
+    )
+    result, cached = await cache_manager.get_or_compute(cache_key, process, ttl=3600)  # 1 hour
+    
+    if cached:
+        logger.info(f"Cache hit for request {request_id}")
+        await metrics.increment('cache_hit')
+    else:
+        await metrics.increment('cache_miss')
+    
+    return result, cached
+
+async def process_job(job: Job, progress_callback: ProgressCallback) -> Dict[str, Any]:
+    """Job queue handler: run one queued document through the pipeline"""
+    result, _ = await _process_with_cache(
+        content=job.content,
+        filename=job.filename,
+        document_type=DocumentType(job.document_type),
+        language=job.language,
+        enable_cache=job.enable_cache,
+        request_id=job.id,
+        progress_callback=progress_callback
+    )
+    return result
 
 @router.post("/ocr/single", response_model=OCRResponse)
 async def process_single_document(
@@ -43,40 +109,31 @@ async def process_single_document(
         # Read file content
         content = await file.read()
         
-        # Check cache first
-        cache_key = f"ocr:{document_type}:{language}:{hash(content)}"
-        if enable_cache:
-            cached_result = await cache_manager.get(cache_key)
-            if cached_result:
-                logger.info(f"Cache hit for request {request_id}")
-                metrics.record_cache_hit()
-                return OCRResponse(
-                    request_id=request_id,
-                    status=ProcessingStatus.COMPLETED,
-                    result=json.loads(cached_result),
-                    processing_time=0.0,
-                    cached=True
-                )
-        
-        # Process document
+        # Process document (or serve it from cache)
         start_time = datetime.now()
         
-        result = await ocr_processor.process_document(
+        result, cached = await _process_with_cache(
             content=content,
             filename=file.filename,
             document_type=document_type,
             language=language,
+            enable_cache=enable_cache,
             request_id=request_id
         )
         
-        processing_time = (datetime.now() - start_time).total_seconds()
+        if cached:
+            return OCRResponse(
+                request_id=request_id,
+                status=ProcessingStatus.COMPLETED,
+                result=result,
+                processing_time=0.0,
+                cached=True
+            )
         
-        # Cache result
-        if enable_cache:
-            await cache_manager.set(cache_key, json.dumps(result), expire=3600)  # 1 hour
+        processing_time = (datetime.now() - start_time).total_seconds()
         
-        metrics.record_processing_time(processing_time)
-        metrics.record_success()
+        await metrics.timing('ocr_processing_time', processing_time * 1000)
+        await metrics.increment('ocr_success')
         
         return OCRResponse(
             request_id=request_id,
@@ -88,79 +145,69 @@ async def process_single_document(
         
     except Exception as e:
         logger.error(f"Error processing document: {e}")
-        metrics.record_error()
+        await metrics.increment('ocr_error')
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/ocr/batch", response_model=List[OCRResponse])
-async def process_batch_documents(
-    request: BatchOCRRequest,
-    background_tasks: BackgroundTasks
-):
+async def process_batch_documents(request: BatchOCRRequest):
     """
     Process multiple documents in batch mode
     
-    Returns immediately with task IDs, processes in background
+    Returns immediately with task IDs; documents are persisted to the job
+    queue and processed by its workers. Poll /ocr/status/{request_id}.
     """
-    try:
-        task_ids = []
-        responses = []
-        
-        for file_info in request.files:
-            task_id = str(uuid.uuid4())
-            task_ids.append(task_id)
-            
-            # Create immediate response
-            responses.append(OCRResponse(
-                request_id=task_id,
-                status=ProcessingStatus.QUEUED,
-                result=None,
-                processing_time=0.0,
-                cached=False
-            ))
-            
-            # Add to background processing
-            background_tasks.add_task(
-                process_single_background,
-                file_info,
-                request.document_type,
-                request.language,
-                request.enable_cache,
-                task_id
+    files = []
+    for file_info in request.files:
+        try:
+            content = base64.b64decode(file_info.content_base64, validate=True)
+        except (binascii.Error, ValueError):
+            raise HTTPException(
+                status_code=400, detail=f"Invalid base64 content for {file_info.filename}"
             )
-        
-        return responses
-        
+        files.append({'filename': file_info.filename, 'content': content})
+    
+    try:
+        jobs = await job_queue.submit(
+            files,
+            document_type=request.document_type.value,
+            language=request.language,
+            enable_cache=request.enable_cache
+        )
     except Exception as e:
         logger.error(f"Error starting batch processing: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+    
+    return [
+        OCRResponse(
+            request_id=job.id,
+            status=ProcessingStatus.QUEUED,
+            result=None,
+            processing_time=0.0,
+            cached=False
+        )
+        for job in jobs
+    ]
 
-async def process_single_background(
-    file_info: dict,
-    document_type: DocumentType,
-    language: str,
-    enable_cache: bool,
-    task_id: str
-):
-    """Background task for processing single document"""
-    try:
-        # TODO: Implement actual background processing
-        # This would involve saving the file, updating database status, etc.
-        logger.info(f"Background processing started for task {task_id}")
-        
-    except Exception as e:
-        logger.error(f"Background processing failed for task {task_id}: {e}")
-
-@router.get("/ocr/status/{request_id}")
+@router.get("/ocr/status/{request_id}", response_model=JobStatusResponse)
 async def get_processing_status(request_id: str):
     """
-    Get processing status for a specific request
+    Get processing status (and the result, once completed) for a batch job
     """
-    # TODO: Implement status tracking
-    return {
-        "request_id": request_id,
-        "status": ProcessingStatus.COMPLETED,
-        "progress": 100
-    }
+    job = await job_queue.get(request_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown request ID: {request_id}")
+    
+    return JobStatusResponse(
+        request_id=job.id,
+        status=job.status,
+        progress=job.progress,
+        pages_done=job.pages_done,
+        pages_total=job.pages_total,
+        filename=job.filename,
+        result=job.result,
+        error=job.error,
+        processing_time=job.processing_time
+    )
 
 @router.get("/ocr/supported-formats")
 async def get_supported_formats():
@@ -0,0 +1,394 @@
+"""
+Persistent OCR job queue with a bounded async worker pool
+"""
+import asyncio
+import json
+import sqlite3
+import threading
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from loguru import logger
+
+from ..models.schemas import ProcessingStatus
+
+
+@dataclass
+class Job:
+    """A queued document and its processing state"""
+
+    id: str
+    filename: str
+    document_type: str
+    language: str
+    enable_cache: bool = True
+    content: Optional[bytes] = None
+    batch_id: Optional[str] = None
+    status: ProcessingStatus = ProcessingStatus.QUEUED
+    pages_done: int = 0
+    pages_total: int = 0
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    attempts: int = 0
+    created_at: str = field(default_factory=lambda: datetime.now().isoformat())
+    started_at: Optional[str] = None
+    completed_at: Optional[str] = None
+
+    @property
+    def progress(self) -> int:
+        """Completion percentage"""
+        if self.status == ProcessingStatus.COMPLETED:
+            return 100
+        if not self.pages_total:
+            return 0
+        return int(100 * self.pages_done / self.pages_total)
+
+    @property
+    def processing_time(self) -> float:
+        if not self.started_at or not self.completed_at:
+            return 0.0
+        started = datetime.fromisoformat(self.started_at)
+        completed = datetime.fromisoformat(self.completed_at)
+        return (completed - started).total_seconds()
+
+
+class SQLiteJobStore:
+    """
+    Job store backed by a local SQLite file
+
+    Survives restarts without requiring Redis; jobs left ``processing`` by
+    a crashed worker are re-queued by ``recover``. Calls are synchronous and
+    serialized on one connection; ``JobQueue`` runs them off the event loop.
+    """
+
+    _COLUMNS = (
+        'id', 'filename', 'document_type', 'language', 'enable_cache', 'content',
+        'batch_id', 'status', 'pages_done', 'pages_total', 'result', 'error',
+        'attempts', 'created_at', 'started_at', 'completed_at'
+    )
+
+    def __init__(self, path: str = "data/jobs.sqlite3"):
+        self.path = path
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS ocr_jobs (
+                    id TEXT PRIMARY KEY,
+                    filename TEXT NOT NULL,
+                    document_type TEXT NOT NULL,
+                    language TEXT NOT NULL,
+                    enable_cache INTEGER NOT NULL DEFAULT 1,
+                    content BLOB,
+                    batch_id TEXT,
+                    status TEXT NOT NULL,
+                    pages_done INTEGER NOT NULL DEFAULT 0,
+                    pages_total INTEGER NOT NULL DEFAULT 0,
+                    result TEXT,
+                    error TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    created_at TEXT NOT NULL,
+                    started_at TEXT,
+                    completed_at TEXT
+                )
+            """)
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_ocr_jobs_status ON ocr_jobs (status, created_at)"
+            )
+
+    def _row_to_job(self, row: sqlite3.Row) -> Job:
+        data = dict(row)
+        data['enable_cache'] = bool(data['enable_cache'])
+        data['status'] = ProcessingStatus(data['status'])
+        data['result'] = json.loads(data['result']) if data['result'] else None
+        return Job(**data)
+
+    def add(self, jobs: List[Job]):
+        """Insert jobs in one transaction"""
+        placeholders = ", ".join("?" for _ in self._COLUMNS)
+        rows = [
+            (
+                job.id, job.filename, job.document_type, job.language, int(job.enable_cache),
+                job.content, job.batch_id, job.status.value, job.pages_done, job.pages_total,
+                json.dumps(job.result, ensure_ascii=False) if job.result is not None else None,
+                job.error, job.attempts, job.created_at, job.started_at, job.completed_at
+            )
+            for job in jobs
+        ]
+
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    f"INSERT INTO ocr_jobs ({', '.join(self._COLUMNS)}) VALUES ({placeholders})", rows
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def get(self, job_id: str, include_content: bool = False) -> Optional[Job]:
+        columns = self._COLUMNS if include_content else tuple(c for c in self._COLUMNS if c != 'content')
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(columns)} FROM ocr_jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+
+        if row is None:
+            return None
+        return self._row_to_job(row)
+
+    def claim_next(self) -> Optional[Job]:
+        """Atomically move the oldest queued job to ``processing`` and return it"""
+        now = datetime.now().isoformat()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT * FROM ocr_jobs WHERE status = ? ORDER BY created_at, rowid LIMIT 1",
+                    (ProcessingStatus.QUEUED.value,)
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+
+                self._conn.execute(
+                    "UPDATE ocr_jobs SET status = ?, started_at = ?, attempts = attempts + 1 WHERE id = ?",
+                    (ProcessingStatus.PROCESSING.value, now, row['id'])
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        job = self._row_to_job(row)
+        job.status = ProcessingStatus.PROCESSING
+        job.started_at = now
+        job.attempts += 1
+        return job
+
+    def update_progress(self, job_id: str, pages_done: int, pages_total: int):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE ocr_jobs SET pages_done = ?, pages_total = ? WHERE id = ?",
+                (pages_done, pages_total, job_id)
+            )
+
+    def complete(self, job_id: str, result: Dict[str, Any]):
+        """Store the result and drop the uploaded content"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE ocr_jobs SET status = ?, result = ?, content = NULL, completed_at = ? WHERE id = ?",
+                (
+                    ProcessingStatus.COMPLETED.value,
+                    json.dumps(result, ensure_ascii=False, default=str),
+                    datetime.now().isoformat(),
+                    job_id
+                )
+            )
+
+    def fail(self, job_id: str, error: str):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE ocr_jobs SET status = ?, error = ?, content = NULL, completed_at = ? WHERE id = ?",
+                (ProcessingStatus.FAILED.value, error, datetime.now().isoformat(), job_id)
+            )
+
+    def requeue(self, job_id: str, error: str):
+        """Put a job back for another attempt"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE ocr_jobs SET status = ?, error = ?, started_at = NULL WHERE id = ?",
+                (ProcessingStatus.QUEUED.value, error, job_id)
+            )
+
+    def recover(self, max_attempts: Optional[int] = None) -> int:
+        """
+        Re-queue jobs that were interrupted mid-processing
+
+        Jobs that already used ``max_attempts`` are failed instead, so a
+        document that crashes the worker process cannot loop forever.
+        Returns the number of re-queued jobs.
+        """
+        with self._lock:
+            if max_attempts is not None:
+                cursor = self._conn.execute(
+                    "UPDATE ocr_jobs SET status = ?, error = ?, content = NULL, completed_at = ? "
+                    "WHERE status = ? AND attempts >= ?",
+                    (
+                        ProcessingStatus.FAILED.value,
+                        f"Interrupted during attempt {max_attempts} of {max_attempts}",
+                        datetime.now().isoformat(),
+                        ProcessingStatus.PROCESSING.value,
+                        max_attempts
+                    )
+                )
+                if cursor.rowcount:
+                    logger.warning(f"Failed {cursor.rowcount} OCR jobs interrupted on their last attempt")
+
+            cursor = self._conn.execute(
+                "UPDATE ocr_jobs SET status = ?, started_at = NULL WHERE status = ?",
+                (ProcessingStatus.QUEUED.value, ProcessingStatus.PROCESSING.value)
+            )
+        return cursor.rowcount
+
+    def count(self, status: ProcessingStatus) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM ocr_jobs WHERE status = ?", (status.value,)
+            ).fetchone()
+        return row[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# Runs one job: ``handler(job, progress_callback) -> result``
+JobHandler = Callable[[Job, Callable[[int, int], Awaitable[None]]], Awaitable[Dict[str, Any]]]
+
+
+class JobQueue:
+    """
+    Bounded pool of async workers draining a persistent job store
+
+    Submissions return immediately; at most ``max_workers`` documents are
+    processed concurrently regardless of batch size.
+    """
+
+    def __init__(
+        self,
+        handler: JobHandler,
+        store: Optional[SQLiteJobStore] = None,
+        max_workers: int = 2,
+        max_attempts: int = 2,
+        poll_interval: float = 1.0
+    ):
+        self.handler = handler
+        self.store = store or SQLiteJobStore()
+        self.max_workers = max_workers
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self._workers: List[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+
+    async def start(self):
+        """Recover interrupted jobs and start the workers"""
+        if self._workers:
+            return
+
+        recovered = await asyncio.to_thread(self.store.recover, self.max_attempts)
+        if recovered:
+            logger.info(f"Re-queued {recovered} interrupted OCR jobs")
+
+        self._workers = [
+            asyncio.create_task(self._worker(i), name=f"ocr-job-worker-{i}")
+            for i in range(self.max_workers)
+        ]
+        logger.info(f"Started {self.max_workers} OCR job workers")
+
+    async def stop(self):
+        """Stop the workers; in-flight jobs are recovered on next start"""
+        workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    async def submit(
+        self,
+        files: List[Dict[str, Any]],
+        document_type: str,
+        language: str,
+        enable_cache: bool = True
+    ) -> List[Job]:
+        """
+        Enqueue documents
+
+        Args:
+            files: ``{'filename': ..., 'content': bytes}`` per document
+            document_type: Document type for every file
+            language: Document language
+            enable_cache: Whether results may come from / go to the cache
+
+        Returns:
+            Queued jobs, in input order
+        """
+        batch_id = str(uuid.uuid4())
+        jobs = [
+            Job(
+                id=str(uuid.uuid4()),
+                filename=file['filename'],
+                document_type=document_type,
+                language=language,
+                enable_cache=enable_cache,
+                content=file['content'],
+                batch_id=batch_id
+            )
+            for file in files
+        ]
+
+        await asyncio.to_thread(self.store.add, jobs)
+        self._wakeup.set()
+
+        for job in jobs:
+            job.content = None
+        return jobs
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    async def _worker(self, index: int):
+        while True:
+            # Cleared before claiming so a submit racing with an empty claim still wakes us
+            self._wakeup.clear()
+            job = await asyncio.to_thread(self.store.claim_next)
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._run(job)
+
+    async def _run(self, job: Job):
+        logger.info(f"Processing job {job.id} ({job.filename}), attempt {job.attempts}")
+
+        async def progress(pages_done: int, pages_total: int):
+            await asyncio.to_thread(self.store.update_progress, job.id, pages_done, pages_total)
+
+        try:
+            result = await self.handler(job, progress)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if job.attempts < self.max_attempts:
+                logger.warning(f"Job {job.id} failed, re-queuing: {e}")
+                await asyncio.to_thread(self.store.requeue, job.id, str(e))
+                self._wakeup.set()
+            else:
+                logger.error(f"Job {job.id} failed: {e}")
+                await asyncio.to_thread(self.store.fail, job.id, str(e))
+            return
+
+        await asyncio.to_thread(self.store.complete, job.id, result)
+        logger.info(f"Job {job.id} completed")
+
+    async def health_check(self) -> Dict[str, Any]:
+        queued = await asyncio.to_thread(self.store.count, ProcessingStatus.QUEUED)
+        processing = await asyncio.to_thread(self.store.count, ProcessingStatus.PROCESSING)
+        return {
+            'status': 'healthy' if all(not w.done() for w in self._workers) else 'degraded',
+            'workers': len(self._workers),
+            'queued': queued,
+            'processing': processing
+        }
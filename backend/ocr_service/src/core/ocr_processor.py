@@ -2,9 +2,12 @@
 Main OCR processor coordinating all processing stages
 """
 import asyncio
-from typing import Dict, Any, Optional, List
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import aclosing
+from typing import AsyncIterator, Awaitable, Callable, Dict, Any, Optional, List
 from pathlib import Path
-import tempfile
 import json
 from datetime import datetime
 
@@ -13,22 +16,52 @@ from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_excep
 
 from ..preprocessor.image_preprocessor import ImagePreprocessor
 from ..preprocessor.pdf_preprocessor import PDFPreprocessor
+from ..preprocessor.page_image import PageImage
 from ..ocr.text_detector import TextDetector
 from ..ocr.text_recognizer import TextRecognizer
-from ..layout.layout_analyzer import LayoutAnalyzer
+from ..layout.layout_analyzer import LayoutAnalyzer, summarize_layout
 from ..layout.table_detector import TableDetector
 from ..vlm.vlm_engine import VLMEngine
 from ..models.schemas import DocumentType, ProcessingConfig
+from ..utils.cache_manager import CacheManager
+from .page_pipeline import analyze_structure, run_page_pipeline
+from .stage_cache import StageCache, hash_bytes
+
+# Called as ``callback(pages_done, pages_total)`` while pages are recognized
+ProgressCallback = Callable[[int, int], Awaitable[None]]
 
 class OCRProcessor:
-    def __init__(self):
+    # Bump whenever pipeline output changes; part of the result cache key
+    PIPELINE_VERSION = "1.3.0"
+    
+    def __init__(
+        self,
+        max_page_workers: Optional[int] = None,
+        stage_cache: Optional[CacheManager] = None,
+        image_cache_mb: int = 512,
+        image_cache_ttl: int = 600
+    ):
         self.preprocessor = ImagePreprocessor()
         self.pdf_preprocessor = PDFPreprocessor()
         self.text_detector = TextDetector()
-        self.text_recognizer = TextRecognizer()
+        self.text_recognizer = TextRecognizer(use_worker_pool=True)
         self.layout_analyzer = LayoutAnalyzer()
         self.table_detector = TableDetector()
         self.vlm_engine = VLMEngine()
+        # Intermediate outputs (rendered/preprocessed pages, OCR, VLM) are
+        # cached per page so a parameter change only re-runs later stages
+        self.stage_cache = StageCache(stage_cache, version=self.PIPELINE_VERSION)
+        # Page arrays are large: they get their own process-local budget and
+        # a short TTL, never reach Redis and cannot evict final results. The
+        # manager is never initialized, so it stays memory-only.
+        self.image_cache = StageCache(
+            CacheManager(max_memory_mb=image_cache_mb) if stage_cache is not None else None,
+            ttl=image_cache_ttl,
+            version=self.PIPELINE_VERSION
+        )
+        self.vlm_engine.stage_cache = self.stage_cache
+        self.max_page_workers = max_page_workers or os.cpu_count() or 1
+        self._page_pool: Optional[ProcessPoolExecutor] = None
         self.is_initialized = False
     
     async def initialize(self):
@@ -55,6 +88,11 @@ class OCRProcessor:
     async def shutdown(self):
         """Cleanup resources"""
         logger.info("Shutting down OCR processor...")
+        if self._page_pool is not None:
+            self._page_pool.shutdown(wait=False, cancel_futures=True)
+            self._page_pool = None
+        self.text_recognizer.close()
+        await self.vlm_engine.shutdown()
         self.is_initialized = False
     
     @retry(
@@ -70,10 +108,14 @@ class OCRProcessor:
         document_type: DocumentType = DocumentType.BUILDING_TITLE,
         language: str = "zh-TW",
         request_id: Optional[str] = None,
-        config: Optional[ProcessingConfig] = None
+        config: Optional[ProcessingConfig] = None,
+        progress_callback: Optional[ProgressCallback] = None
     ) -> Dict[str, Any]:
         """
         Main document processing pipeline
+        
+        ``progress_callback`` receives (pages done, total pages) as page
+        recognition advances.
         """
         if not self.is_initialized:
             await self.initialize()
@@ -90,31 +132,28 @@ class OCRProcessor:
             else:
                 processed_images = await self._process_image(content, config)
             
-            # Step 2: Text detection and recognition
-            text_results = []
-            for img_idx, image in enumerate(processed_images):
-                text_blocks = await self.text_detector.detect(image)
-                recognized_text = await self.text_recognizer.recognize(
-                    image, text_blocks, language
-                )
-                text_results.append({
-                    'page': img_idx + 1,
-                    'text_blocks': recognized_text
-                })
-            
-            # Step 3: Layout analysis
-            layout_analysis = await self.layout_analyzer.analyze(processed_images[0])
-            
-            # Step 4: Table detection (if enabled)
-            tables = []
-            if config.enable_table_detection:
-                tables = await self.table_detector.detect_tables(processed_images)
+            # Steps 2-4: Text detection and recognition, layout analysis and
+            # table detection (if enabled) per page
+            page_results = await self._recognize_pages(
+                processed_images, language, config, progress_callback
+            )
+            # Results may be shared with the stage cache, so split without mutating
+            text_results = [
+                {key: value for key, value in result.items() if key not in ('layout', 'tables')}
+                for result in page_results
+            ]
+            layout_analysis = [
+                {'page': result['page'], **result['layout']} for result in page_results
+            ]
+            tables = [table for result in page_results for table in result.get('tables', [])]
             
             # Step 5: VLM-based content understanding
             vlm_result = await self.vlm_engine.process(
                 images=processed_images,
                 text_results=text_results,
-                layout_analysis=layout_analysis,
+                layout_analysis=[
+                    {'page': layout['page'], **summarize_layout(layout)} for layout in layout_analysis
+                ],
                 document_type=document_type,
                 language=language
             )
@@ -136,46 +175,273 @@ class OCRProcessor:
             logger.error(f"Error processing document {request_id}: {e}")
             raise
     
-    async def _process_pdf(self, content: bytes, config: ProcessingConfig) -> List:
-        """Process PDF document"""
-        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as tmp_file:
-            tmp_file.write(content)
-            tmp_file.flush()
+    async def _recognize_pages(
+        self,
+        pages: List[PageImage],
+        language: str,
+        config: ProcessingConfig,
+        progress_callback: Optional[ProgressCallback] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Run detection + recognition, layout analysis and table detection for every page
+        
+        Pages whose PDF text layer is usable take their words from it and
+        skip OCR, but are still laid out. With ``config.page_workers > 1``
+        the work fans out to a bounded process pool so the CPU-bound
+        OpenCV/Tesseract work stays off the event loop; results keep page
+        order and carry the page layout under ``'layout'`` and, with
+        ``config.enable_table_detection``, its tables under ``'tables'``.
+        """
+        workers = min(config.page_workers, self.max_page_workers)
+        total = len(pages)
+        done = 0
+        
+        async def report():
+            nonlocal done
+            done += 1
+            if progress_callback is not None:
+                await progress_callback(done, total)
+        
+        if progress_callback is not None:
+            await progress_callback(0, total)
+        
+        text_results: List[Optional[Dict[str, Any]]] = [None] * total
+        layout_only: List[int] = []
+        if config.use_text_layer:
+            for index, page in enumerate(pages):
+                text_layer = page.metadata.get('text_layer') or {}
+                if text_layer.get('usable'):
+                    text_results[index] = {
+                        'page': page.page_number,
+                        'text_blocks': text_layer['text_blocks'],
+                        'source': 'text_layer'
+                    }
+                    layout_only.append(index)
+        pending = [index for index in range(total) if text_results[index] is None]
+        
+        # Pages already recognized at this language are served from the stage cache
+        stage_params = {'language': language, 'tables': config.enable_table_detection}
+        use_cache = self.stage_cache.enabled and config.enable_stage_cache
+        if use_cache:
+            cached = await asyncio.gather(*(
+                self.stage_cache.get('ocr', pages[index].content_hash, stage_params)
+                for index in pending
+            ))
+            for index, result in zip(pending, cached):
+                if result is not None:
+                    text_results[index] = self._for_page(result, pages[index].page_number)
+                    await report()
+            pending = [index for index in pending if text_results[index] is None]
+        
+        detect_tables = config.enable_table_detection
+        
+        def store(index: int, result: Dict[str, Any]):
+            # Text-layer pages keep their words and source, gaining layout/tables
+            text_results[index] = {**(text_results[index] or {}), **result}
+        
+        jobs = [(index, False) for index in layout_only] + [(index, True) for index in pending]
+        if workers <= 1 or len(jobs) <= 1:
+            table_detector = self.table_detector if detect_tables else None
+            for index, recognize in jobs:
+                page = pages[index]
+                result = {'page': page.page_number}
+                if recognize:
+                    text_blocks = await asyncio.to_thread(self.text_detector.detect_array, page.gray)
+                    result['text_blocks'] = await self.text_recognizer.recognize(
+                        page, text_blocks, language
+                    )
+                text_blocks = result['text_blocks'] if recognize else text_results[index]['text_blocks']
+                result.update(await asyncio.to_thread(
+                    analyze_structure, page.gray, page.page_number, text_blocks,
+                    self.layout_analyzer, table_detector
+                ))
+                store(index, result)
+                await report()
+        else:
+            pool = self._get_page_pool()
+            loop = asyncio.get_running_loop()
+            semaphore = asyncio.Semaphore(workers)
+            
+            async def run(index: int, recognize: bool):
+                async with semaphore:
+                    text_blocks = None if recognize else text_results[index]['text_blocks']
+                    result = await loop.run_in_executor(
+                        pool, run_page_pipeline, pages[index], language, recognize,
+                        detect_tables, text_blocks
+                    )
+                store(index, result)
+                await report()
             
-            # Extract and preprocess PDF pages
-            pages = await self.pdf_preprocessor.extract_pages(
-                tmp_file.name, 
+            await asyncio.gather(*(run(index, recognize) for index, recognize in jobs))
+        
+        if use_cache:
+            await asyncio.gather(*(
+                self.stage_cache.set('ocr', pages[index].content_hash, stage_params, text_results[index])
+                for index in pending
+            ))
+        return text_results
+    
+    @staticmethod
+    def _for_page(result: Dict[str, Any], page_number: int) -> Dict[str, Any]:
+        """
+        Copy of a cached page result renumbered to ``page_number``
+        
+        OCR results are cached by page pixels, so a hit may have been
+        computed for an identical page at another position.
+        """
+        result = {**result, 'page': page_number}
+        if 'tables' in result:
+            result['tables'] = [{**table, 'page': page_number} for table in result['tables']]
+        return result
+    
+    def _get_page_pool(self) -> ProcessPoolExecutor:
+        """Create the page worker pool on first use"""
+        if self._page_pool is None:
+            self._page_pool = ProcessPoolExecutor(
+                max_workers=self.max_page_workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+            logger.info(f"Started page worker pool with {self.max_page_workers} processes")
+        return self._page_pool
+    
+    async def _process_pdf(self, content: bytes, config: ProcessingConfig) -> List[PageImage]:
+        """Process PDF document, preprocessing pages as they are rendered"""
+        processed_pages = []
+        async with aclosing(self._render_pdf_pages(content, config)) as pages:
+            async for page in pages:
+                processed_pages.append(await self._preprocess_page(page, config))
+        return processed_pages
+    
+    async def _render_pdf_pages(
+        self,
+        content: bytes,
+        config: ProcessingConfig
+    ) -> AsyncIterator[PageImage]:
+        """
+        Stream rendered pages in page order
+        
+        Renders are cached per page by document hash and DPI; only pages
+        missing from the stage cache go through the renderer.
+        """
+        def to_page(page_info: Dict[str, Any]) -> PageImage:
+            page = page_info['image']
+            page.metadata['dpi'] = page_info['dimensions']['dpi']
+            if page_info.get('text_layer'):
+                page.metadata['text_layer'] = page_info['text_layer']
+            return page
+        
+        # Preprocessing starts from gray, so pages are rendered gray and
+        # handed over without a copy or PNG round-trip
+        if not (self.image_cache.enabled and config.enable_stage_cache):
+            async for page_info in self.pdf_preprocessor.iter_pages(
+                content,
+                extract_text=config.use_text_layer,
+                dpi=config.pdf_dpi,
+                max_pages=config.max_pages,
+                grayscale=True,
+                adaptive_dpi=config.adaptive_dpi
+            ):
+                yield to_page(page_info)
+            return
+        
+        document_hash = hash_bytes(content)
+        metadata = await self.pdf_preprocessor.get_metadata(content)
+        page_numbers = range(1, min(metadata['page_count'], config.max_pages) + 1)
+        
+        def render_params(page_number: int) -> Dict[str, Any]:
+            return {
+                'dpi': config.pdf_dpi,
+                'page': page_number,
+                'grayscale': True,
+                'adaptive_dpi': config.adaptive_dpi,
+                'text_layer': config.use_text_layer
+            }
+        
+        cached = await asyncio.gather(*(
+            self.image_cache.get('render', document_hash, render_params(n)) for n in page_numbers
+        ))
+        missing = [n for n, page in zip(page_numbers, cached) if page is None]
+        
+        rendered = None
+        if missing:
+            rendered = self.pdf_preprocessor.iter_pages(
+                content,
+                page_range=",".join(str(n) for n in missing),
+                extract_text=config.use_text_layer,
                 dpi=config.pdf_dpi,
-                max_pages=config.max_pages
+                max_pages=config.max_pages,
+                grayscale=True,
+                adaptive_dpi=config.adaptive_dpi
             )
-            
-            # Preprocess each page
-            processed_pages = []
-            for page in pages:
-                processed = await self.preprocessor.preprocess(
-                    page, 
-                    enhance_quality=config.enhance_quality,
-                    remove_noise=config.remove_noise
-                )
-                processed_pages.append(processed)
-            
-            return processed_pages
+        
+        try:
+            for page_number, page in zip(page_numbers, cached):
+                if page is None:
+                    try:
+                        page_info = await rendered.__anext__()
+                    except StopAsyncIteration:
+                        raise ValueError(
+                            f"PDF renderer stopped before page {page_number} "
+                            f"(requested pages {','.join(map(str, missing))})"
+                        ) from None
+                    page = to_page(page_info)
+                    await self.image_cache.set('render', document_hash, render_params(page_number), page)
+                yield page
+        finally:
+            if rendered is not None:
+                await rendered.aclose()
     
-    async def _process_image(self, content: bytes, config: ProcessingConfig) -> List:
+    async def _process_image(self, content: bytes, config: ProcessingConfig) -> List[PageImage]:
         """Process single image"""
-        processed_image = await self.preprocessor.preprocess(
-            content,
-            enhance_quality=config.enhance_quality,
-            remove_noise=config.remove_noise,
-            resize_to=config.target_size
+        processed_image = await self._preprocess_page(
+            PageImage.from_bytes(content), config, resize_to=config.target_size
         )
         return [processed_image]
     
+    async def _preprocess_page(
+        self,
+        page: PageImage,
+        config: ProcessingConfig,
+        resize_to: Optional[tuple] = None
+    ) -> PageImage:
+        """Preprocess one page, cached by the page pixels and preprocessing flags"""
+        async def preprocess() -> PageImage:
+            return await self.preprocessor.preprocess_page(
+                page,
+                enhance_quality=config.enhance_quality,
+                remove_noise=config.remove_noise,
+                resize_to=resize_to,
+                profile=config.preprocessing_profile,
+                quality_gate=config.quality_gate
+            )
+        
+        if not (self.image_cache.enabled and config.enable_stage_cache):
+            return await preprocess()
+        
+        processed = await self.image_cache.get_or_compute(
+            'preprocess',
+            page.content_hash,
+            {
+                'enhance_quality': config.enhance_quality,
+                'remove_noise': config.remove_noise,
+                'resize_to': resize_to,
+                'profile': config.preprocessing_profile,
+                'quality_gate': config.quality_gate
+            },
+            preprocess
+        )
+        # Cached pages are shared (and may sit at another document position),
+        # so hand out a copy carrying this page's number and metadata
+        processed = processed.with_array(processed.array)
+        processed.page_number = page.page_number
+        processed.metadata.update(page.metadata)
+        return processed
+    
     def _compile_result(
         self,
         vlm_result: Dict[str, Any],
         text_results: List[Dict],
-        layout_analysis: Dict,
+        layout_analysis: List[Dict],
         tables: List[Dict],
         document_type: DocumentType,
         config: ProcessingConfig
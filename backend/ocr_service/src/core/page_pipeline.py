@@ -0,0 +1,88 @@
+"""
+Per-page OCR pipeline executed inside worker processes
+"""
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from ..layout.layout_analyzer import LayoutAnalyzer
+from ..layout.line_extractor import extract_lines
+from ..layout.table_detector import TableDetector
+from ..ocr.text_detector import TextDetector
+from ..ocr.text_recognizer import TextRecognizer
+from ..preprocessor.page_image import PageImage
+
+# Stage instances are created once per worker process and reused across pages
+_text_detector: Optional[TextDetector] = None
+_text_recognizer: Optional[TextRecognizer] = None
+_layout_analyzer: Optional[LayoutAnalyzer] = None
+_table_detector: Optional[TableDetector] = None
+
+
+def _get_stages():
+    global _text_detector, _text_recognizer, _layout_analyzer, _table_detector
+
+    if _text_detector is None:
+        _text_detector = TextDetector()
+        # Pooled Tesseract APIs live as long as the worker process
+        _text_recognizer = TextRecognizer(use_worker_pool=True)
+        _layout_analyzer = LayoutAnalyzer()
+        _table_detector = TableDetector()
+
+    return _text_detector, _text_recognizer, _layout_analyzer, _table_detector
+
+
+def analyze_structure(
+    image: np.ndarray,
+    page_number: int,
+    text_blocks: Optional[List[Dict[str, Any]]],
+    layout_analyzer: LayoutAnalyzer,
+    table_detector: Optional[TableDetector] = None
+) -> Dict[str, Any]:
+    """
+    Layout analysis and (with a detector) table detection for one page
+
+    Both read the same ruling lines, extracted once.
+    """
+    lines = extract_lines(image, layout_analyzer.min_line_length)
+    structure: Dict[str, Any] = {'layout': layout_analyzer.analyze_array(image, lines)}
+    if table_detector is not None:
+        structure['tables'] = table_detector.detect_array(image, text_blocks, lines, page_number)
+    return structure
+
+
+def run_page_pipeline(
+    page: PageImage,
+    language: str,
+    recognize: bool = True,
+    detect_tables: bool = False,
+    text_blocks: Optional[List[Dict[str, Any]]] = None
+) -> Dict[str, Any]:
+    """
+    Run the CPU-bound stages (detection + recognition, layout, tables) for one page
+
+    Args:
+        page: Preprocessed page
+        language: Language code for OCR
+        recognize: Run OCR; False when the page's text came from its PDF
+            text layer and only layout analysis is needed
+        detect_tables: Reconstruct ruled tables
+        text_blocks: Words filling table cells when ``recognize`` is False
+
+    Returns:
+        Text results entry for the page, with its layout under ``'layout'``
+        and, when requested, its tables under ``'tables'``
+    """
+    text_detector, text_recognizer, layout_analyzer, table_detector = _get_stages()
+
+    image = page.gray
+    result: Dict[str, Any] = {'page': page.page_number}
+    if recognize:
+        regions = text_detector.detect_array(image)
+        text_blocks = result['text_blocks'] = text_recognizer.recognize_array(image, regions, language)
+    result.update(analyze_structure(
+        image, page.page_number, text_blocks, layout_analyzer,
+        table_detector if detect_tables else None
+    ))
+
+    return result
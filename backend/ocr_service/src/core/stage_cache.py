@@ -0,0 +1,78 @@
+"""
+Per-stage caching of pipeline outputs keyed by page content
+"""
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from loguru import logger
+
+from ..utils.cache_manager import CacheManager
+
+
+class StageCache:
+    """
+    Cache for individual pipeline stages
+
+    Entries are keyed by a content hash (document or page) plus the
+    parameters that affect that stage only, e.g. render by DPI, preprocess
+    by enhance/noise flags, OCR by language and VLM by prompt. Changing one
+    parameter therefore only re-runs the stages that depend on it.
+    """
+
+    NAMESPACE = "stage"
+
+    def __init__(
+        self,
+        cache_manager: Optional[CacheManager] = None,
+        ttl: int = 7 * 24 * 3600,
+        version: str = "1"
+    ):
+        self.cache_manager = cache_manager
+        self.ttl = ttl
+        self.version = version
+
+    @property
+    def enabled(self) -> bool:
+        return self.cache_manager is not None
+
+    def key(self, stage: str, content_hash: str, params: Optional[Dict[str, Any]] = None) -> str:
+        params_str = json.dumps(
+            {'params': params or {}, 'version': self.version}, sort_keys=True, default=str
+        )
+        params_hash = hashlib.blake2b(params_str.encode(), digest_size=8).hexdigest()
+        return f"{self.NAMESPACE}:{stage}:{content_hash}:{params_hash}"
+
+    async def get(self, stage: str, content_hash: str, params: Optional[Dict[str, Any]] = None) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        value = await self.cache_manager.get(self.key(stage, content_hash, params))
+        if value is not None:
+            logger.debug(f"Stage cache hit: {stage} {content_hash[:12]}")
+        return value
+
+    async def set(self, stage: str, content_hash: str, params: Optional[Dict[str, Any]], value: Any):
+        if not self.enabled or value is None:
+            return
+        await self.cache_manager.set(self.key(stage, content_hash, params), value, ttl=self.ttl)
+
+    async def get_or_compute(
+        self,
+        stage: str,
+        content_hash: str,
+        params: Optional[Dict[str, Any]],
+        compute: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Cached stage output, computed (once across concurrent callers) on a miss"""
+        if not self.enabled:
+            return await compute()
+
+        value, _ = await self.cache_manager.get_or_compute(
+            self.key(stage, content_hash, params), compute, ttl=self.ttl
+        )
+        return value
+
+
+def hash_bytes(data: bytes) -> str:
+    """Content hash for raw inputs (uploaded documents, encoded images)"""
+    return hashlib.blake2b(data, digest_size=32).hexdigest()
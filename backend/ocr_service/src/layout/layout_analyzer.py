@@ -3,12 +3,36 @@ Layout analysis module for document structure understanding
 """
 import cv2
 import numpy as np
-from typing import Dict, Any, List
-import asyncio
+from collections import Counter
+from typing import Dict, Any, List, Optional, Union
 from loguru import logger
 
+from ..preprocessor.page_image import PageImage, as_gray_array
+from .line_extractor import RuledLines, cluster_positions, extract_lines
+
+def summarize_layout(layout: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Compact digest of a page layout for VLM prompts
+    
+    Keeps counts and the classification instead of every line, region
+    and section box.
+    """
+    return {
+        'document_type': layout['document_type'],
+        'ruled_lines': {
+            'horizontal': len(layout['horizontal_lines']),
+            'vertical': len(layout['vertical_lines'])
+        },
+        'sections': dict(Counter(section['section_type'] for section in layout['sections'])),
+        'text_regions': len(layout['text_regions']),
+        'confidence': layout['layout_confidence']
+    }
+
+
 class LayoutAnalyzer:
-    def __init__(self):
+    def __init__(self, min_line_length: int = 100, line_merge_distance: int = 8):
+        self.min_line_length = min_line_length
+        self.line_merge_distance = line_merge_distance
         self.is_initialized = False
     
     async def initialize(self):
@@ -25,117 +49,77 @@ class LayoutAnalyzer:
             logger.error(f"Failed to initialize layout analyzer: {e}")
             raise
     
-    async def analyze(self, image_data: bytes) -> Dict[str, Any]:
+    async def analyze(self, image_data: Union[PageImage, bytes]) -> Dict[str, Any]:
         """
         Analyze document layout and structure
         
         Args:
-            image_data: Preprocessed image bytes
+            image_data: Preprocessed page (or encoded image bytes)
             
         Returns:
             Layout analysis results with regions and structure
         """
+        image = as_gray_array(image_data)
+        
+        if image is None:
+            logger.error("Layout analysis failed: could not decode image")
+            raise ValueError("Failed to decode image for layout analysis")
+        
+        return self.analyze_array(image)
+    
+    def analyze_array(self, image: np.ndarray, lines: Optional[RuledLines] = None) -> Dict[str, Any]:
+        """
+        Synchronous layout analysis core on a grayscale array
+        
+        Safe to call from worker processes; ``analyze`` wraps it for the
+        in-process async pipeline. Pass ``lines`` when the page's ruling
+        lines were already extracted.
+        """
         try:
-            # Convert bytes to numpy array
-            nparr = np.frombuffer(image_data, np.uint8)
-            image = cv2.imdecode(nparr, cv2.IMREAD_GRAYSCALE)
-            
-            if image is None:
-                raise ValueError("Failed to decode image for layout analysis")
-            
             # Detect horizontal and vertical lines
-            horizontal_lines = await self._detect_horizontal_lines(image)
-            vertical_lines = await self._detect_vertical_lines(image)
+            if lines is None:
+                lines = self._detect_lines(image)
             
             # Detect text regions
-            text_regions = await self._detect_text_regions(image)
+            text_regions = self._detect_text_regions(image)
             
             # Identify layout sections
-            sections = await self._identify_sections(
-                image, horizontal_lines, vertical_lines, text_regions
+            sections = self._identify_sections(
+                image, lines.horizontal, lines.vertical, text_regions
             )
             
             # Determine document type based on layout
-            doc_type = await self._classify_document_type(sections)
+            doc_type = self._classify_document_type(sections)
             
             layout_analysis = {
                 'document_type': doc_type,
                 'sections': sections,
-                'horizontal_lines': horizontal_lines,
-                'vertical_lines': vertical_lines,
+                'horizontal_lines': lines.horizontal.tolist(),
+                'vertical_lines': lines.vertical.tolist(),
                 'text_regions': text_regions,
                 'page_dimensions': image.shape,
                 'layout_confidence': self._calculate_layout_confidence(sections)
             }
             
-            logger.info(f"Layout analysis completed: {doc_type}")
+            logger.debug(f"Layout analysis completed: {doc_type}")
             return layout_analysis
             
         except Exception as e:
             logger.error(f"Layout analysis failed: {e}")
             raise
     
-    async def _detect_horizontal_lines(self, image: np.ndarray) -> List[Dict[str, Any]]:
-        """Detect horizontal lines in document"""
-        try:
-            # Apply edge detection
-            edges = cv2.Canny(image, 50, 150)
-            
-            # Use Hough Line Transform for horizontal lines
-            lines = cv2.HoughLinesP(
-                edges, 1, np.pi/180, threshold=50, minLineLength=100, maxLineGap=10
-            )
-            
-            horizontal_lines = []
-            if lines is not None:
-                for line in lines:
-                    x1, y1, x2, y2 = line[0]
-                    
-                    # Filter for horizontal lines (within ±10 degrees)
-                    if abs(y2 - y1) < 5 and abs(x2 - x1) > 50:
-                        horizontal_lines.append({
-                            'start': (x1, y1),
-                            'end': (x2, y2),
-                            'length': abs(x2 - x1),
-                            'position': y1
-                        })
-            
-            return horizontal_lines
-            
-        except Exception as e:
-            logger.warning(f"Horizontal line detection failed: {e}")
-            return []
-    
-    async def _detect_vertical_lines(self, image: np.ndarray) -> List[Dict[str, Any]]:
-        """Detect vertical lines in document"""
+    def _detect_lines(self, image: np.ndarray) -> RuledLines:
+        """Detect horizontal and vertical ruling lines in one pass"""
         try:
-            edges = cv2.Canny(image, 50, 150)
-            
-            lines = cv2.HoughLinesP(
-                edges, 1, np.pi/180, threshold=50, minLineLength=100, maxLineGap=10
-            )
-            
-            vertical_lines = []
-            if lines is not None:
-                for line in lines:
-                    x1, y1, x2, y2 = line[0]
-                    
-                    # Filter for vertical lines (within ±10 degrees)
-                    if abs(x2 - x1) < 5 and abs(y2 - y1) > 50:
-                        vertical_lines.append({
-                            'start': (x1, y1),
-                            'end': (x2, y2),
-                            'length': abs(y2 - y1),
-                            'position': x1
-                        })
-            
-            return vertical_lines
+            return extract_lines(image, self.min_line_length)
             
         except Exception as e:
-            logger.warning(f"Vertical line detection failed: {e}")
-            return []
+            logger.warning(f"Line detection failed: {e}")
+            empty = np.empty((0, 4), dtype=np.int32)
+            mask = np.zeros_like(image)
+            return RuledLines(empty, empty, mask, mask)
     
-    async def _detect_text_regions(self, image: np.ndarray) -> List[Dict[str, Any]]:
+    def _detect_text_regions(self, image: np.ndarray) -> List[Dict[str, Any]]:
         """Detect potential text regions"""
         try:
             # Use morphological operations to find text-like regions
@@ -168,47 +152,42 @@ class LayoutAnalyzer:
             logger.warning(f"Text region detection failed: {e}")
             return []
     
-    async def _identify_sections(self, image: np.ndarray, 
-                               horizontal_lines: List, 
-                               vertical_lines: List, 
+    def _identify_sections(self, image: np.ndarray, 
+                               horizontal_lines: np.ndarray, 
+                               vertical_lines: np.ndarray, 
                                text_regions: List) -> List[Dict[str, Any]]:
         """Identify document sections based on lines and text regions"""
         sections = []
         
-        # Simple section identification based on line positions
-        h_positions = sorted([line['position'] for line in horizontal_lines])
-        v_positions = sorted([line['position'] for line in vertical_lines])
+        # Grid boundaries, with duplicate and broken rulings merged
+        h_positions = cluster_positions(horizontal_lines[:, 1], self.line_merge_distance)
+        v_positions = cluster_positions(vertical_lines[:, 0], self.line_merge_distance)
+        if len(h_positions) < 2 or len(v_positions) < 2 or not text_regions:
+            return sections
         
-        # Create grid-based sections
-        for i in range(len(h_positions) - 1):
-            for j in range(len(v_positions) - 1):
-                y_start = h_positions[i]
-                y_end = h_positions[i + 1]
-                x_start = v_positions[j]
-                x_end = v_positions[j + 1]
-                
-                # Count text regions in this section
-                text_count = sum(1 for region in text_regions 
-                                if self._is_in_region(region['bbox'], x_start, y_start, x_end, y_end))
-                
-                if text_count > 0:
-                    sections.append({
-                        'bbox': [x_start, y_start, x_end - x_start, y_end - y_start],
-                        'text_regions_count': text_count,
-                        'section_type': self._classify_section_type(x_start, y_start, x_end, y_end, image.shape)
-                    })
+        # Locate each region's cell by binary search on the boundaries; a
+        # region counts only when it lies entirely inside that cell
+        x, y, w, h = np.array([region['bbox'] for region in text_regions], dtype=np.int64).T
+        rows = np.searchsorted(h_positions, y, side='right') - 1
+        cols = np.searchsorted(v_positions, x, side='right') - 1
+        n_rows, n_cols = len(h_positions) - 1, len(v_positions) - 1
+        inside = (rows >= 0) & (rows < n_rows) & (cols >= 0) & (cols < n_cols)
+        rows, cols = np.clip(rows, 0, n_rows - 1), np.clip(cols, 0, n_cols - 1)
+        inside &= (y + h <= h_positions[rows + 1]) & (x + w <= v_positions[cols + 1])
+        counts = np.bincount(rows[inside] * n_cols + cols[inside], minlength=n_rows * n_cols)
+        
+        for cell in np.flatnonzero(counts):
+            i, j = divmod(int(cell), n_cols)
+            y_start, y_end = int(h_positions[i]), int(h_positions[i + 1])
+            x_start, x_end = int(v_positions[j]), int(v_positions[j + 1])
+            sections.append({
+                'bbox': [x_start, y_start, x_end - x_start, y_end - y_start],
+                'text_regions_count': int(counts[cell]),
+                'section_type': self._classify_section_type(x_start, y_start, x_end, y_end, image.shape)
+            })
         
         return sections
     
-    def _is_in_region(self, bbox: List[int], x_start: int, y_start: int, 
-                     x_end: int, y_end: int) -> bool:
-        """Check if bounding box is within region"""
-        x, y, w, h = bbox
-        return (x_start <= x <= x_end and 
-                y_start <= y <= y_end and
-                x + w <= x_end and 
-                y + h <= y_end)
-    
     def _classify_section_type(self, x_start: int, y_start: int, 
                              x_end: int, y_end: int, 
                              image_shape: tuple) -> str:
@@ -235,7 +214,7 @@ class LayoutAnalyzer:
         # Main content
         return 'main_content'
     
-    async def _classify_document_type(self, sections: List[Dict[str, Any]]) -> str:
+    def _classify_document_type(self, sections: List[Dict[str, Any]]) -> str:
         """Classify document type based on layout features"""
         if not sections:
             return 'unknown'
@@ -275,19 +254,12 @@ class LayoutAnalyzer:
             cv2.rectangle(test_image, (10, 60), (140, 180), 0, 2)  # Left
             cv2.rectangle(test_image, (150, 60), (290, 180), 0, 2)  # Right
             
-            success, encoded = cv2.imencode('.png', test_image)
-            if success:
-                analysis = await self.analyze(encoded.tobytes())
-                
-                return {
-                    'status': 'healthy',
-                    'message': f'Layout analyzer functioning normally, detected {len(analysis["sections"])} sections',
-                    'document_type': analysis['document_type']
-                }
+            analysis = await self.analyze(PageImage(test_image))
             
             return {
                 'status': 'healthy',
-                'message': 'Layout analyzer basic functionality verified'
+                'message': f'Layout analyzer functioning normally, detected {len(analysis["sections"])} sections',
+                'document_type': analysis['document_type']
             }
             
         except Exception as e:
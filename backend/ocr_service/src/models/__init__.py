@@ -2,6 +2,6 @@
 Data models and schemas for Jason JSON format
 """
 
-from .jason_schema import TranscriptPayload
+from .json_schema import TranscriptPayload
 
 __all__ = ["TranscriptPayload"]
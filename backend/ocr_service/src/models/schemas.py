@@ -0,0 +1,105 @@
+"""
+API request/response schemas and processing configuration
+"""
+
+from enum import Enum
+from typing import Any, Dict, List, Literal, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+
+class DocumentType(str, Enum):
+    """Supported document types"""
+
+    BUILDING_TITLE = "building_title"
+    LAND_TITLE = "land_title"
+    GENERIC = "generic"
+
+
+class ProcessingStatus(str, Enum):
+    """Processing status of a request"""
+
+    QUEUED = "queued"
+    PROCESSING = "processing"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class ProcessingConfig(BaseModel):
+    """Options controlling the OCR pipeline"""
+
+    enhance_quality: bool = Field(True, description="啟用影像品質增強")
+    remove_noise: bool = Field(True, description="啟用雜訊移除")
+    preprocessing_profile: Literal["legacy", "balanced", "fast"] = Field(
+        "balanced", description="影像前處理濾波組合"
+    )
+    quality_gate: bool = Field(
+        True, description="依頁面品質評估只執行需要的前處理步驟"
+    )
+    target_size: Optional[Tuple[int, int]] = Field(
+        None, description="圖片輸入縮放尺寸 (width, height)"
+    )
+    pdf_dpi: int = Field(300, ge=72, le=600, description="PDF 轉圖解析度 (自動解析度時為上限)")
+    adaptive_dpi: bool = Field(
+        True, description="依各頁文字大小自動選擇最低足夠的轉圖解析度"
+    )
+    max_pages: int = Field(50, ge=1, description="最多處理頁數")
+    enable_table_detection: bool = Field(True, description="啟用表格偵測")
+    page_workers: int = Field(
+        1, ge=1, description="逐頁並行處理的 worker 數 (1 = 在目前程序內逐頁處理)"
+    )
+    use_text_layer: bool = Field(
+        True, description="PDF 內嵌文字層足夠時直接採用, 略過該頁 OCR"
+    )
+    enable_stage_cache: bool = Field(
+        True, description="快取各階段中間結果 (渲染、前處理、OCR、VLM)"
+    )
+
+
+class OCRRequest(BaseModel):
+    """Single document OCR request options"""
+
+    document_type: DocumentType = Field(DocumentType.BUILDING_TITLE, description="文件類型")
+    language: str = Field("zh-TW", description="文件語言代碼")
+    enable_cache: bool = Field(True, description="啟用結果快取")
+    config: ProcessingConfig = Field(default_factory=ProcessingConfig, description="處理參數")
+
+
+class BatchFile(BaseModel):
+    """A file submitted inside a batch request"""
+
+    filename: str = Field(..., description="檔名 (含副檔名)")
+    content_base64: str = Field(..., description="Base64 編碼的檔案內容")
+
+
+class BatchOCRRequest(BaseModel):
+    """Batch OCR request"""
+
+    files: List[BatchFile] = Field(..., min_length=1, description="待處理檔案列表")
+    document_type: DocumentType = Field(DocumentType.BUILDING_TITLE, description="文件類型")
+    language: str = Field("zh-TW", description="文件語言代碼")
+    enable_cache: bool = Field(True, description="啟用結果快取")
+
+
+class OCRResponse(BaseModel):
+    """OCR processing response"""
+
+    request_id: str = Field(..., description="請求 ID")
+    status: ProcessingStatus = Field(..., description="處理狀態")
+    result: Optional[Dict[str, Any]] = Field(None, description="處理結果")
+    processing_time: float = Field(0.0, ge=0.0, description="處理時間 (秒)")
+    cached: bool = Field(False, description="是否來自快取")
+
+
+class JobStatusResponse(BaseModel):
+    """Status of a queued (batch) OCR job"""
+
+    request_id: str = Field(..., description="請求 ID")
+    status: ProcessingStatus = Field(..., description="處理狀態")
+    progress: int = Field(0, ge=0, le=100, description="完成百分比")
+    pages_done: int = Field(0, ge=0, description="已完成頁數")
+    pages_total: int = Field(0, ge=0, description="總頁數 (尚未解析前為 0)")
+    filename: Optional[str] = Field(None, description="檔名")
+    result: Optional[Dict[str, Any]] = Field(None, description="處理結果 (完成後提供)")
+    error: Optional[str] = Field(None, description="錯誤訊息")
+    processing_time: float = Field(0.0, ge=0.0, description="處理時間 (秒)")
@@ -0,0 +1,222 @@
+"""
+Pool of long-lived in-process Tesseract instances (tesserocr binding)
+"""
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+from loguru import logger
+
+from ..utils.error_handler import TimeoutError as OCRTimeoutError
+
+try:
+    import tesserocr
+    from PIL import Image
+except ImportError:
+    tesserocr = None
+
+
+class TesseractWorkerPool:
+    """
+    Reusable ``tesserocr.PyTessBaseAPI`` instances keyed by language string
+
+    Each API loads its traineddata once and is reused across calls, instead
+    of pytesseract forking a new process (and reloading the models) for
+    every ``image_to_data``. An API is used by one thread at a time.
+    """
+
+    def __init__(
+        self,
+        size_per_language: int = 2,
+        tessdata_path: Optional[str] = None,
+        checkout_timeout: float = 60.0
+    ):
+        self.size_per_language = size_per_language
+        self.tessdata_path = tessdata_path
+        # Seconds to wait for an API once the language's pool is exhausted
+        self.checkout_timeout = checkout_timeout
+        self._idle: Dict[str, queue.Queue] = {}
+        self._created: Dict[str, int] = {}
+        self._all: List[Any] = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def is_available() -> bool:
+        """Whether the tesserocr binding is installed"""
+        return tesserocr is not None
+
+    def preload(self, lang: str):
+        """Create one API for ``lang`` so the first request does not pay for it"""
+        with self.acquire(lang):
+            pass
+
+    @contextmanager
+    def acquire(self, lang: str) -> Iterator[Any]:
+        """Check out an API for ``lang``, creating one while under the pool size"""
+        api = self._checkout(lang)
+        try:
+            yield api
+        finally:
+            self._checkin(lang, api)
+
+    def _checkout(self, lang: str) -> Any:
+        with self._lock:
+            idle = self._idle.setdefault(lang, queue.Queue())
+            try:
+                return idle.get_nowait()
+            except queue.Empty:
+                pass
+
+            if self._created.get(lang, 0) < self.size_per_language:
+                self._created[lang] = self._created.get(lang, 0) + 1
+                create = True
+            else:
+                create = False
+
+        if create:
+            try:
+                return self._create_api(lang)
+            except Exception:
+                # Give the slot back, or waiters would block on an API that never exists
+                with self._lock:
+                    if self._idle.get(lang) is idle:
+                        self._created[lang] -= 1
+                raise
+
+        # Pool exhausted for this language: wait for an API to be returned
+        try:
+            return idle.get(timeout=self.checkout_timeout)
+        except queue.Empty:
+            raise OCRTimeoutError(
+                f"No Tesseract instance for '{lang}' became free within {self.checkout_timeout}s",
+                details={'lang': lang, 'pool_size': self.size_per_language}
+            )
+
+    def _checkin(self, lang: str, api: Any):
+        """Return an API to its idle queue, or end it if the pool was closed meanwhile"""
+        with self._lock:
+            idle = self._idle.get(lang)
+            owned = idle is not None and any(pooled is api for pooled in self._all)
+        if owned:
+            idle.put(api)
+        else:
+            self._end(api)
+
+    def _create_api(self, lang: str) -> Any:
+        if tesserocr is None:
+            raise ImportError("tesserocr package is not installed")
+
+        kwargs = {'lang': lang}
+        if self.tessdata_path:
+            kwargs['path'] = self.tessdata_path
+
+        api = tesserocr.PyTessBaseAPI(**kwargs)
+        with self._lock:
+            self._all.append(api)
+
+        logger.info(f"Loaded Tesseract model '{lang}' into worker pool")
+        return api
+
+    def image_to_data(
+        self,
+        image: np.ndarray,
+        lang: str,
+        psm: int = 6,
+        variables: Optional[Dict[str, str]] = None
+    ) -> Dict[str, List[Any]]:
+        """
+        Recognize an image and return pytesseract-style ``image_to_data`` output
+
+        Args:
+            image: Grayscale image
+            lang: Tesseract language string (e.g. ``chi_tra+eng``)
+            psm: Page segmentation mode
+            variables: Tesseract variables set for this call
+
+        Returns:
+            Dict of parallel lists keyed like ``pytesseract.Output.DICT``
+        """
+        with self.acquire(lang) as api:
+            api.SetPageSegMode(psm)
+            for name, value in (variables or {}).items():
+                api.SetVariable(name, str(value))
+
+            api.SetImage(Image.fromarray(image))
+            api.Recognize()
+
+            return self._collect_words(api)
+
+    def _collect_words(self, api: Any) -> Dict[str, List[Any]]:
+        """Walk the result iterator at word level"""
+        data = {
+            key: [] for key in (
+                'level', 'page_num', 'block_num', 'par_num', 'line_num', 'word_num',
+                'left', 'top', 'width', 'height', 'conf', 'text'
+            )
+        }
+
+        iterator = api.GetIterator()
+        if iterator is None:
+            return data
+
+        word_level = tesserocr.RIL.WORD
+        block_num = line_num = word_num = 0
+
+        for word in tesserocr.iterate_level(iterator, word_level):
+            if word.IsAtBeginningOf(tesserocr.RIL.BLOCK):
+                block_num += 1
+                line_num = 0
+            if word.IsAtBeginningOf(tesserocr.RIL.TEXTLINE):
+                line_num += 1
+                word_num = 0
+            word_num += 1
+
+            bbox = word.BoundingBox(word_level)
+            if bbox is None:
+                continue
+            x1, y1, x2, y2 = bbox
+
+            data['level'].append(5)
+            data['page_num'].append(1)
+            data['block_num'].append(block_num)
+            data['par_num'].append(1)
+            data['line_num'].append(line_num)
+            data['word_num'].append(word_num)
+            data['left'].append(x1)
+            data['top'].append(y1)
+            data['width'].append(x2 - x1)
+            data['height'].append(y2 - y1)
+            data['conf'].append(word.Confidence(word_level))
+            data['text'].append(word.GetUTF8Text(word_level) or '')
+
+        return data
+
+    def close(self):
+        """
+        Release all Tesseract instances
+
+        Idle instances are ended now; instances checked out by a running
+        call are ended when that call returns them.
+        """
+        with self._lock:
+            self._all = []
+            idle_queues = list(self._idle.values())
+            self._idle.clear()
+            self._created.clear()
+
+        for idle in idle_queues:
+            while True:
+                try:
+                    api = idle.get_nowait()
+                except queue.Empty:
+                    break
+                self._end(api)
+
+    @staticmethod
+    def _end(api: Any):
+        try:
+            api.End()
+        except Exception as e:
+            logger.warning(f"Failed to release Tesseract instance: {e}")
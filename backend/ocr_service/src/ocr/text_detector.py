@@ -3,10 +3,12 @@ Text detection module using OpenCV and contour analysis
 """
 import cv2
 import numpy as np
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Union
 import asyncio
 from loguru import logger
 
+from ..preprocessor.page_image import PageImage, as_gray_array
+
 class TextDetector:
     def __init__(self):
         self.is_initialized = False
@@ -25,24 +27,32 @@ class TextDetector:
             logger.error(f"Failed to initialize text detector: {e}")
             raise
     
-    async def detect(self, image_data: bytes) -> List[Dict[str, Any]]:
+    async def detect(self, image_data: Union[PageImage, bytes]) -> List[Dict[str, Any]]:
         """
         Detect text regions in image
         
         Args:
-            image_data: Preprocessed image bytes
+            image_data: Preprocessed page (or encoded image bytes)
             
         Returns:
             List of text regions with coordinates and confidence
         """
+        image = as_gray_array(image_data)
+        
+        if image is None:
+            logger.error("Text detection failed: could not decode image")
+            raise ValueError("Failed to decode image for text detection")
+        
+        return self.detect_array(image)
+    
+    def detect_array(self, image: np.ndarray) -> List[Dict[str, Any]]:
+        """
+        Synchronous detection core on a grayscale array
+        
+        Safe to call from worker processes; ``detect`` wraps it for the
+        in-process async pipeline.
+        """
         try:
-            # Convert bytes to numpy array
-            nparr = np.frombuffer(image_data, np.uint8)
-            image = cv2.imdecode(nparr, cv2.IMREAD_GRAYSCALE)
-            
-            if image is None:
-                raise ValueError("Failed to decode image for text detection")
-            
             # Apply adaptive thresholding
             binary = cv2.adaptiveThreshold(
                 image, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
@@ -125,7 +135,7 @@ class TextDetector:
         except Exception:
             return 0.5  # Default confidence
     
-    async def detect_with_ml(self, image_data: bytes) -> List[Dict[str, Any]]:
+    async def detect_with_ml(self, image_data: Union[PageImage, bytes]) -> List[Dict[str, Any]]:
         """
         Advanced text detection using machine learning models
         (Placeholder for future integration with EAST, CRAFT, etc.)
@@ -142,19 +152,12 @@ class TextDetector:
             cv2.putText(test_image, "TEST", (10, 50), 
                        cv2.FONT_HERSHEY_SIMPLEX, 1, 255, 2)
             
-            success, encoded = cv2.imencode('.png', test_image)
-            if success:
-                regions = await self.detect(encoded.tobytes())
-                
-                return {
-                    'status': 'healthy',
-                    'message': f'Text detector functioning normally, detected {len(regions)} regions',
-                    'detected_regions': len(regions)
-                }
+            regions = await self.detect(PageImage(test_image))
             
             return {
                 'status': 'healthy',
-                'message': 'Text detector basic functionality verified'
+                'message': f'Text detector functioning normally, detected {len(regions)} regions',
+                'detected_regions': len(regions)
             }
             
         except Exception as e:
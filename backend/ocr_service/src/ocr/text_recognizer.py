@@ -4,13 +4,35 @@ Text recognition module using Tesseract OCR
 import pytesseract
 import cv2
 import numpy as np
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Union
 import asyncio
 from loguru import logger
 
+from ..preprocessor.page_image import PageImage, as_gray_array
+from .tesseract_pool import TesseractWorkerPool
+
 class TextRecognizer:
-    def __init__(self):
+    # Tesseract rejects images taller than 32767 px; stay well below it
+    MAX_MOSAIC_HEIGHT = 30000
+    
+    def __init__(
+        self,
+        batch_regions: bool = True,
+        mosaic_padding: int = 16,
+        use_worker_pool: bool = False,
+        pool_size_per_language: int = 2,
+        preload_languages: tuple = ('zh-TW',)
+    ):
         self.is_initialized = False
+        self.batch_regions = batch_regions
+        self.mosaic_padding = mosaic_padding
+        self.preload_languages = preload_languages
+        self.worker_pool: Optional[TesseractWorkerPool] = None
+        if use_worker_pool:
+            if TesseractWorkerPool.is_available():
+                self.worker_pool = TesseractWorkerPool(size_per_language=pool_size_per_language)
+            else:
+                logger.warning("tesserocr not installed, falling back to pytesseract subprocesses")
         self.supported_languages = {
             'zh-TW': 'chi_tra+eng',    # Traditional Chinese + English
             'zh-CN': 'chi_sim+eng',     # Simplified Chinese + English
@@ -27,7 +49,11 @@ class TextRecognizer:
         
         try:
             # Check Tesseract availability
-            pytesseract.get_tesseract_version()
+            if self.worker_pool is not None:
+                for language in self.preload_languages:
+                    self.worker_pool.preload(self._get_lang(language))
+            else:
+                pytesseract.get_tesseract_version()
             self.is_initialized = True
             logger.info("Text recognizer initialized successfully")
         except Exception as e:
@@ -36,33 +62,57 @@ class TextRecognizer:
     
     async def recognize(
         self, 
-        image_data: bytes, 
+        image_data: Union[PageImage, bytes], 
         text_regions: List[Dict[str, Any]],
         language: str = 'zh-TW',
-        config: Optional[Dict[str, Any]] = None
+        config: Optional[Dict[str, Any]] = None,
+        batch: Optional[bool] = None
     ) -> List[Dict[str, Any]]:
         """
         Recognize text in detected regions
         
         Args:
-            image_data: Preprocessed image bytes
+            image_data: Preprocessed page (or encoded image bytes)
             text_regions: Detected text regions from TextDetector
             language: Language code for OCR
             config: Additional Tesseract configuration
+            batch: Stitch regions into one mosaic per Tesseract call
+                (defaults to ``self.batch_regions``)
             
         Returns:
             List of recognized text with confidence and position
         """
+        image = as_gray_array(image_data)
+        
+        if image is None:
+            logger.error("Text recognition failed: could not decode image")
+            raise ValueError("Failed to decode image for text recognition")
+        
+        if self.worker_pool is not None:
+            # In-process API calls release the GIL; keep them off the event loop
+            return await asyncio.to_thread(
+                self.recognize_array, image, text_regions, language, config, batch
+            )
+        
+        return self.recognize_array(image, text_regions, language, config, batch)
+    
+    def recognize_array(
+        self,
+        image: np.ndarray,
+        text_regions: List[Dict[str, Any]],
+        language: str = 'zh-TW',
+        config: Optional[Dict[str, Any]] = None,
+        batch: Optional[bool] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Synchronous recognition core on a grayscale array
+        
+        Safe to call from worker processes; ``recognize`` wraps it for the
+        in-process async pipeline.
+        """
         try:
-            # Convert bytes to numpy array
-            nparr = np.frombuffer(image_data, np.uint8)
-            image = cv2.imdecode(nparr, cv2.IMREAD_GRAYSCALE)
-            
-            if image is None:
-                raise ValueError("Failed to decode image for text recognition")
-            
             # Get language configuration
-            lang = self.supported_languages.get(language, self.supported_languages['default'])
+            lang = self._get_lang(language)
             
             # Default Tesseract configuration
             tesseract_config = config or {
@@ -71,6 +121,13 @@ class TextRecognizer:
                 '-c': 'preserve_interword_spaces=1'
             }
             
+            if self.batch_regions if batch is None else batch:
+                recognized_text = self._recognize_batched(
+                    image, text_regions, lang, tesseract_config
+                )
+                logger.info(f"Recognized {len(recognized_text)} text elements")
+                return recognized_text
+            
             recognized_text = []
             
             for region in text_regions:
@@ -83,12 +140,7 @@ class TextRecognizer:
                     continue
                 
                 # Apply OCR
-                ocr_result = pytesseract.image_to_data(
-                    roi, 
-                    lang=lang,
-                    output_type=pytesseract.Output.DICT,
-                    config=self._build_config_string(tesseract_config)
-                )
+                ocr_result = self._image_to_data(roi, lang, tesseract_config)
                 
                 # Process OCR results
                 region_text = self._process_ocr_results(ocr_result, x, y)
@@ -103,6 +155,145 @@ class TextRecognizer:
             logger.error(f"Text recognition failed: {e}")
             raise
     
+    def _recognize_batched(
+        self,
+        image: np.ndarray,
+        text_regions: List[Dict[str, Any]],
+        lang: str,
+        tesseract_config: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        """
+        Recognize all regions with one Tesseract call per mosaic
+        
+        Regions are stacked vertically, separated by white padding, into as
+        few mosaics as the height limit allows. Word boxes are mapped back
+        to page coordinates through ``_process_ocr_results`` offsets.
+        """
+        rois = []
+        for region in text_regions:
+            x, y, w, h = region['bbox']
+            roi = image[y:y+h, x:x+w]
+            if roi.size > 0:
+                rois.append((x, y, roi))
+        
+        recognized_text = []
+        for chunk in self._chunk_for_mosaic(rois):
+            mosaic, placements = self._build_mosaic(chunk)
+            
+            ocr_result = self._image_to_data(mosaic, lang, tesseract_config)
+            
+            recognized_text.extend(self._split_mosaic_results(ocr_result, placements))
+        
+        return recognized_text
+    
+    def _chunk_for_mosaic(self, rois: List[tuple]) -> List[List[tuple]]:
+        """Split regions into groups whose stacked height fits one mosaic"""
+        chunks, current, height = [], [], self.mosaic_padding
+        
+        for roi_entry in rois:
+            roi_height = roi_entry[2].shape[0] + self.mosaic_padding
+            if current and height + roi_height > self.MAX_MOSAIC_HEIGHT:
+                chunks.append(current)
+                current, height = [], self.mosaic_padding
+            current.append(roi_entry)
+            height += roi_height
+        
+        if current:
+            chunks.append(current)
+        return chunks
+    
+    def _build_mosaic(self, rois: List[tuple]) -> tuple:
+        """
+        Stack regions into one white canvas
+        
+        Returns:
+            (mosaic, placements) where each placement is
+            (mosaic_top, mosaic_bottom, offset_x, offset_y)
+        """
+        pad = self.mosaic_padding
+        width = max(roi.shape[1] for _, _, roi in rois) + 2 * pad
+        height = sum(roi.shape[0] + pad for _, _, roi in rois) + pad
+        
+        mosaic = np.full((height, width), 255, dtype=np.uint8)
+        placements = []
+        top = pad
+        
+        for x, y, roi in rois:
+            roi_h, roi_w = roi.shape[:2]
+            mosaic[top:top+roi_h, pad:pad+roi_w] = roi
+            placements.append((top, top + roi_h, x - pad, y - top))
+            top += roi_h + pad
+        
+        return mosaic, placements
+    
+    def _split_mosaic_results(
+        self,
+        ocr_result: Dict[str, Any],
+        placements: List[tuple]
+    ) -> List[Dict[str, Any]]:
+        """Assign mosaic word boxes back to their source regions"""
+        if not ocr_result['text']:
+            return []
+        
+        tops = np.array([placement[0] for placement in placements])
+        centers = (np.asarray(ocr_result['top'], dtype=np.float64)
+                   + np.asarray(ocr_result['height'], dtype=np.float64) / 2)
+        owners = np.searchsorted(tops, centers, side='right') - 1
+        
+        recognized_text = []
+        for region_idx, (_, _, offset_x, offset_y) in enumerate(placements):
+            indices = np.flatnonzero(owners == region_idx)
+            if indices.size == 0:
+                continue
+            
+            region_result = {
+                key: [values[i] for i in indices]
+                for key, values in ocr_result.items()
+                if isinstance(values, list)
+            }
+            recognized_text.extend(
+                self._process_ocr_results(region_result, offset_x, offset_y)
+            )
+        
+        return recognized_text
+    
+    def _get_lang(self, language: str) -> str:
+        """Map a language code to a Tesseract language string"""
+        return self.supported_languages.get(language, self.supported_languages['default'])
+    
+    def _image_to_data(
+        self,
+        image: np.ndarray,
+        lang: str,
+        tesseract_config: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Run Tesseract through the worker pool when enabled, else pytesseract"""
+        if self.worker_pool is not None:
+            psm, variables = self._pool_options(tesseract_config)
+            return self.worker_pool.image_to_data(image, lang, psm=psm, variables=variables)
+        
+        return pytesseract.image_to_data(
+            image,
+            lang=lang,
+            output_type=pytesseract.Output.DICT,
+            config=self._build_config_string(tesseract_config)
+        )
+    
+    def _pool_options(self, config: Dict[str, Any]) -> tuple:
+        """Translate a command-line style config into PSM + API variables"""
+        psm = int(config.get('--psm', 6))
+        variables = {}
+        setting = config.get('-c')
+        if setting and '=' in setting:
+            name, value = setting.split('=', 1)
+            variables[name] = value
+        return psm, variables
+    
+    def close(self):
+        """Release pooled Tesseract instances"""
+        if self.worker_pool is not None:
+            self.worker_pool.close()
+    
     def _build_config_string(self, config: Dict[str, Any]) -> str:
         """Build Tesseract configuration string"""
         return ' '.join([f'{k}={v}' if k.startswith('-c') else f'{k} {v}' 
@@ -147,7 +338,7 @@ class TextRecognizer:
     
     async def recognize_whole_image(
         self, 
-        image_data: bytes, 
+        image_data: Union[PageImage, bytes], 
         language: str = 'zh-TW',
         config: Optional[Dict[str, Any]] = None
     ) -> str:
@@ -155,13 +346,12 @@ class TextRecognizer:
         Recognize text from whole image (without region detection)
         """
         try:
-            nparr = np.frombuffer(image_data, np.uint8)
-            image = cv2.imdecode(nparr, cv2.IMREAD_GRAYSCALE)
+            image = as_gray_array(image_data)
             
             if image is None:
                 raise ValueError("Failed to decode image")
             
-            lang = self.supported_languages.get(language, self.supported_languages['default'])
+            lang = self._get_lang(language)
             
             tesseract_config = config or {
                 '--psm': '6',
@@ -188,19 +378,12 @@ class TextRecognizer:
             cv2.putText(test_image, "OCR Test 測試", (10, 50), 
                        cv2.FONT_HERSHEY_SIMPLEX, 1, 255, 2)
             
-            success, encoded = cv2.imencode('.png', test_image)
-            if success:
-                text = await self.recognize_whole_image(encoded.tobytes(), 'zh-TW')
-                
-                return {
-                    'status': 'healthy',
-                    'message': f'Text recognizer functioning normally, recognized: {text}',
-                    'recognized_text': text
-                }
+            text = await self.recognize_whole_image(PageImage(test_image), 'zh-TW')
             
             return {
                 'status': 'healthy',
-                'message': 'Text recognizer basic functionality verified'
+                'message': f'Text recognizer functioning normally, recognized: {text}',
+                'recognized_text': text
             }
             
         except Exception as e:
@@ -0,0 +1,152 @@
+"""
+Shared, pooled API clients for VLM providers
+"""
+import os
+from typing import Any, Dict, Optional, Tuple
+
+from loguru import logger
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+try:
+    from openai import AsyncOpenAI
+except ImportError:
+    AsyncOpenAI = None
+try:
+    from anthropic import AsyncAnthropic
+except ImportError:
+    AsyncAnthropic = None
+try:
+    import google.generativeai as genai
+except ImportError:
+    genai = None
+
+# Connection pool defaults; override with VLM_HTTP_MAX_CONNECTIONS,
+# VLM_HTTP_MAX_KEEPALIVE and VLM_HTTP_KEEPALIVE_EXPIRY environment variables
+DEFAULT_MAX_CONNECTIONS = 32
+DEFAULT_MAX_KEEPALIVE = 16
+DEFAULT_KEEPALIVE_EXPIRY = 120.0
+DEFAULT_TIMEOUT = 120.0
+DEFAULT_CONNECT_TIMEOUT = 10.0
+
+
+def _number_from_env(name: str, default: float) -> float:
+    value = os.getenv(name)
+    if not value:
+        return default
+    try:
+        return type(default)(value)
+    except ValueError:
+        logger.warning(f"Ignoring invalid {name}={value!r}")
+        return default
+
+
+class VLMClientRegistry:
+    """
+    One long-lived SDK client per (provider, base_url, api_key)
+
+    Clients own an ``httpx.AsyncClient`` with keep-alive enabled, so TLS
+    sessions and connections are reused across pages instead of being
+    re-established by a fresh client on every call.
+    """
+
+    def __init__(
+        self,
+        max_connections: Optional[int] = None,
+        max_keepalive_connections: Optional[int] = None,
+        keepalive_expiry: Optional[float] = None,
+        timeout: float = DEFAULT_TIMEOUT,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT
+    ):
+        self.max_connections = max_connections or int(
+            _number_from_env("VLM_HTTP_MAX_CONNECTIONS", DEFAULT_MAX_CONNECTIONS)
+        )
+        self.max_keepalive_connections = max_keepalive_connections or int(
+            _number_from_env("VLM_HTTP_MAX_KEEPALIVE", DEFAULT_MAX_KEEPALIVE)
+        )
+        self.keepalive_expiry = keepalive_expiry or _number_from_env(
+            "VLM_HTTP_KEEPALIVE_EXPIRY", DEFAULT_KEEPALIVE_EXPIRY
+        )
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self._clients: Dict[Tuple[str, Optional[str], str], Any] = {}
+        self._google_api_key: Optional[str] = None
+
+    def _http_client(self) -> Optional[Any]:
+        """Keep-alive HTTP transport handed to an SDK client"""
+        if httpx is None:
+            return None
+
+        return httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+                keepalive_expiry=self.keepalive_expiry
+            ),
+            timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout)
+        )
+
+    def openai(self, provider: str, api_key: str, base_url: Optional[str] = None) -> Any:
+        """Shared ``AsyncOpenAI`` client for an OpenAI-compatible endpoint"""
+        if not AsyncOpenAI:
+            raise ImportError("openai package is not installed")
+
+        key = (provider, base_url, api_key)
+        if key not in self._clients:
+            self._clients[key] = AsyncOpenAI(
+                api_key=api_key, base_url=base_url, http_client=self._http_client()
+            )
+            logger.debug(f"Created pooled client for {provider} ({base_url or 'default'})")
+        return self._clients[key]
+
+    def anthropic(self, api_key: str) -> Any:
+        """Shared ``AsyncAnthropic`` client"""
+        if not AsyncAnthropic:
+            raise ImportError("anthropic package is not installed")
+
+        key = ("anthropic", None, api_key)
+        if key not in self._clients:
+            self._clients[key] = AsyncAnthropic(api_key=api_key, http_client=self._http_client())
+            logger.debug("Created pooled client for anthropic")
+        return self._clients[key]
+
+    def configure_google(self, api_key: str):
+        """Configure the process-global Gemini SDK once per API key"""
+        if not genai:
+            raise ImportError("google-generativeai package is not installed")
+
+        if self._google_api_key != api_key:
+            genai.configure(api_key=api_key)
+            self._google_api_key = api_key
+
+    async def aclose(self):
+        """Close all pooled clients and their connections"""
+        clients, self._clients = self._clients, {}
+        self._google_api_key = None
+
+        for (provider, base_url, _), client in clients.items():
+            try:
+                await client.close()
+            except Exception as e:
+                logger.warning(f"Failed to close client for {provider} ({base_url or 'default'}): {e}")
+
+
+_registry: Optional[VLMClientRegistry] = None
+
+
+def get_client_registry() -> VLMClientRegistry:
+    """Process-wide client registry"""
+    global _registry
+    if _registry is None:
+        _registry = VLMClientRegistry()
+    return _registry
+
+
+async def close_client_registry():
+    """Close the process-wide registry; a later call creates a fresh one"""
+    global _registry
+    if _registry is not None:
+        registry, _registry = _registry, None
+        await registry.aclose()
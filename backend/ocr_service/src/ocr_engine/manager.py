@@ -1,26 +1,53 @@
 import asyncio
+import time
 from typing import List, Dict, Any, Optional
 from pathlib import Path
 from datetime import datetime
 from loguru import logger
 from .base import OCREngine
 from .vlm import VLMEngine
+from .clients import close_client_registry
+from ..utils.metrics_collector import MetricsCollector
+from ..vlm.provider_router import ProviderRouter, get_provider_router
 
 class OCREngineManager:
     """
     Manages OCR engines with failover strategy (Cloud VLM Only):
     1. Primary VLM (DeepSeek, Grok)
     2. Backup VLMs (GPT-4o, Claude, etc.)
+
+    Engines are tried in the order given by the provider router (recent
+    success rate, then cost); providers with an open circuit are skipped.
+
+    In hedging mode the next engine is started in parallel once the
+    current one has run longer than its recorded p95 latency; the first
+    valid result wins and the remaining calls are cancelled.
     """
-    def __init__(self):
+    LATENCY_METRIC = "ocr_engine_latency"
+
+    def __init__(
+        self,
+        metrics_collector: Optional[MetricsCollector] = None,
+        router: Optional[ProviderRouter] = None,
+        hedge: bool = False,
+        default_hedge_delay: float = 15.0,
+        min_latency_samples: int = 5,
+        latency_window_minutes: int = 60
+    ):
         self.engines: List[OCREngine] = []
+        self.metrics_collector = metrics_collector or MetricsCollector()
+        self.router = router or get_provider_router()
+        self.hedge = hedge
+        self.default_hedge_delay = default_hedge_delay
+        self.min_latency_samples = min_latency_samples
+        self.latency_window_minutes = latency_window_minutes
         self._init_engines()
 
     def _init_engines(self):
         # 1. Primary: Cost-effective & Vision Capable Models
         # DeepSeek V3 (OpenAI Compatible) - Strong Chinese, low cost
         self.engines.append(VLMEngine(provider="deepseek", model="deepseek-chat"))
-        
+
         # Grok (xAI) - Strong vision capabilities
         self.engines.append(VLMEngine(provider="grok", model="grok-2-vision-1212"))
 
@@ -30,42 +57,195 @@ class OCREngineManager:
         self.engines.append(VLMEngine(provider="google", model="gemini-1.5-pro-latest"))
         self.engines.append(VLMEngine(provider="dashscope", model="qwen-vl-max"))
 
-    async def process_document(self, image_path: Path) -> Dict[str, Any]:
+    async def initialize(self):
+        """Open pooled API clients for every engine with credentials"""
+        for engine in self._available_engines():
+            initialize = getattr(engine, "initialize", None)
+            if initialize is not None:
+                await initialize()
+
+    async def shutdown(self):
+        """Release engine clients and close pooled connections"""
+        for engine in self.engines:
+            close = getattr(engine, "close", None)
+            if close is not None:
+                await close()
+        await close_client_registry()
+
+    def _available_engines(self) -> List[OCREngine]:
+        available = []
+        for engine in self.engines:
+            # Check if we should skip (e.g., no API key)
+            if isinstance(engine, VLMEngine) and not engine.api_key:
+                logger.debug(f"Skipping {engine.name} (No API Key)")
+                continue
+            available.append(engine)
+
+        # Healthiest/cheapest providers first; open circuits drop out
+        ranked = self.router.order(dict.fromkeys(self._provider_key(e) for e in available))
+        rank = {provider: i for i, provider in enumerate(ranked)}
+        return sorted(
+            (engine for engine in available if self._provider_key(engine) in rank),
+            key=lambda engine: rank[self._provider_key(engine)]
+        )
+
+    @staticmethod
+    def _provider_key(engine: OCREngine) -> str:
+        return getattr(engine, "provider", None) or engine.name
+
+    async def process_document(self, image_path: Path, hedge: Optional[bool] = None) -> Dict[str, Any]:
         """
         Try engines in order until one succeeds.
+
+        Args:
+            image_path: Image to process
+            hedge: Override the manager's hedging mode for this call
         """
+        engines = self._available_engines()
+
+        if self.hedge if hedge is None else hedge:
+            return await self._process_hedged(engines, image_path)
+
         errors = []
-        
-        for engine in self.engines:
-            try:
-                # Check if we should skip (e.g., no API key)
-                if isinstance(engine, VLMEngine) and not engine.api_key:
-                    logger.debug(f"Skipping {engine.name} (No API Key)")
-                    continue
 
-                logger.info(f"Attempting processing with {engine.name}")
-                result = await engine.process(image_path)
-                
-                # Basic validation
+        for engine in engines:
+            try:
+                result = await self._run_engine(engine, image_path)
                 if result:
-                    logger.success(f"Successfully processed with {engine.name}")
-                    
-                    # Inject metadata
-                    if "metadata" not in result:
-                        result["metadata"] = {}
-                    
-                    result["metadata"].update({
-                        "ocr_engine": engine.name,
-                        "processed_at": datetime.now().isoformat(),
-                    })
-                    
                     return result
-                    
+
             except Exception as e:
                 logger.warning(f"Engine {engine.name} failed: {e}")
                 errors.append(f"{engine.name}: {str(e)}")
                 continue
-        
+
         error_msg = f"All OCR engines failed. Errors: {'; '.join(errors)}"
         logger.error(error_msg)
         raise RuntimeError(error_msg)
+
+    async def _process_hedged(self, engines: List[OCREngine], image_path: Path) -> Dict[str, Any]:
+        """Race engines, starting the next one when the current exceeds its p95"""
+        remaining = list(engines)
+        pending: Dict[asyncio.Task, OCREngine] = {}
+        errors = []
+        hedge_deadline: Optional[float] = None
+
+        async def launch() -> bool:
+            nonlocal hedge_deadline
+            if not remaining:
+                return False
+            engine = remaining.pop(0)
+            task = asyncio.create_task(self._run_engine(engine, image_path))
+            pending[task] = engine
+            hedge_deadline = time.monotonic() + await self._hedge_delay(engine)
+            return True
+
+        await launch()
+
+        try:
+            while pending:
+                timeout = None
+                if remaining and hedge_deadline is not None:
+                    timeout = max(0.0, hedge_deadline - time.monotonic())
+
+                done, _ = await asyncio.wait(
+                    pending.keys(), timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+
+                if not done:
+                    logger.info(
+                        f"Hedging: {', '.join(e.name for e in pending.values())} "
+                        f"slower than p95, starting {remaining[0].name}"
+                    )
+                    await launch()
+                    continue
+
+                failed = False
+                for task in done:
+                    engine = pending.pop(task)
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        logger.warning(f"Engine {engine.name} failed: {e}")
+                        errors.append(f"{engine.name}: {str(e)}")
+                        failed = True
+                        continue
+
+                    if result:
+                        return result
+                    errors.append(f"{engine.name}: empty result")
+                    failed = True
+
+                # A failure hands over to the next engine without waiting
+                if failed:
+                    await launch()
+        finally:
+            for task in pending:
+                task.cancel()
+
+        error_msg = f"All OCR engines failed. Errors: {'; '.join(errors)}"
+        logger.error(error_msg)
+        raise RuntimeError(error_msg)
+
+    async def _run_engine(self, engine: OCREngine, image_path: Path) -> Dict[str, Any]:
+        """Run one engine, recording its latency and injecting metadata"""
+        provider = self._provider_key(engine)
+        if not self.router.allow_request(provider):
+            raise RuntimeError(f"Circuit open for {engine.name}")
+
+        logger.info(f"Attempting processing with {engine.name}")
+        start_time = time.monotonic()
+
+        # Every attempt feeds the latency distribution: failures with their
+        # duration, and cancelled hedge losers with their elapsed time as a
+        # lower bound. Recording only winners would bias p95 low.
+        try:
+            result = await engine.process(image_path)
+        except asyncio.CancelledError:
+            self.router.record_cancelled(provider)
+            await self._record_latency(engine, (time.monotonic() - start_time) * 1000)
+            raise
+        except Exception:
+            latency_ms = (time.monotonic() - start_time) * 1000
+            self.router.record_failure(provider, latency_ms)
+            await self._record_latency(engine, latency_ms)
+            raise
+
+        latency_ms = (time.monotonic() - start_time) * 1000
+        if result:
+            self.router.record_success(provider, latency_ms)
+        else:
+            self.router.record_failure(provider, latency_ms)
+
+        await self._record_latency(engine, latency_ms)
+
+        # Basic validation
+        if result:
+            logger.success(f"Successfully processed with {engine.name}")
+
+            # Inject metadata
+            if "metadata" not in result:
+                result["metadata"] = {}
+
+            result["metadata"].update({
+                "ocr_engine": engine.name,
+                "processed_at": datetime.now().isoformat(),
+            })
+
+        return result
+
+    async def _record_latency(self, engine: OCREngine, latency_ms: float):
+        await self.metrics_collector.timing(
+            self.LATENCY_METRIC, latency_ms, tags={"engine": engine.name}
+        )
+
+    async def _hedge_delay(self, engine: OCREngine) -> float:
+        """Seconds to wait on ``engine`` before hedging: its recent p95, else the default"""
+        stats = await self.metrics_collector.get_statistics(
+            self.LATENCY_METRIC,
+            tags={"engine": engine.name},
+            time_window_minutes=self.latency_window_minutes
+        )
+        if not stats or stats.get("count", 0) < self.min_latency_samples:
+            return self.default_hedge_delay
+        return stats["p95"] / 1000.0
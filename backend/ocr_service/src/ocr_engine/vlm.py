@@ -2,26 +2,19 @@ import os
 import base64
 import json
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Sequence
 import asyncio
 
 from loguru import logger
-try:
-    from openai import AsyncOpenAI
-except ImportError:
-    AsyncOpenAI = None
-try:
-    from anthropic import AsyncAnthropic
-except ImportError:
-    AsyncAnthropic = None
 try:
     import google.generativeai as genai
 except ImportError:
     genai = None
 
 from .base import OCREngine
+from .clients import get_client_registry
 
-SYSTEM_PROMPT = """
+_PROMPT_HEAD = """
 # 角色指令
 你是一位專業的地政士（土地登記專業代理人），專門解析「建物登記第二類謄本」（建物標示及所有權部）。你的任務是從用戶提供的PDF謄本文字內容中，精準提取結構化資訊，並輸出標準化JSON格式。
 
@@ -32,116 +25,186 @@ SYSTEM_PROMPT = """
    - 數字、日期、地址保持原文格式
    - 遇不一致處（如多個執照號碼）全部保留並註記
 3. **完整涵蓋**：確保提取謄本中所有欄位資訊，不遺漏任何段落
+"""
 
-# 輸出格式規範
-輸出 **必須且只能** 為以下JSON結構，包含所有6個主要部分：
-
-```json
-{
-  "document_info": {
-    "document_type": "string (謄本類型)",
-    "print_time": "string (列印時間)",
-    "document_id_checking_number": "string (謄本檢查號)",
-    "verification_url": "string (查驗網址)",
-    "issuing_office": "string (核發單位)",
-    "issuing_officer": "string (主任姓名)",
-    "certificate_number": "string (電謄字第號)"
-  },
-  "building_basic_info": {
-    "district": "string (行政區)",
-    "section": "string (地段/小段)",
-    "building_number": "string (建號)",
-    "address": "string (門牌地址)",
-    "land_lot_number": "string (坐落地號)"
-  },
-  "building_characteristics": {
-    "building_registration_date": "string (建物標示部登記日期)",
-    "building_sitting_on_land_lot_number": "string (建物座落地號)",
-    "building_address": "string (建物門牌)",
-    "main_use": "string (主要用途)",
-    "main_structure": "string (主要建材)",
-    "total_floors": "string (層數)",
-    "located_floor": "string (層次)",
-    "construction_completion_date": "string (建築完成日期)",
-    "accessory_structures": ["string (附屬建物用途清單)"],
-    "use_permit_number": ["string (使用執照字號清單)"]
-  },
-  "shared_areas": {
-    "shared_building_number": "string (共有部分建號)",
-    "shared_area_sqm": "number (共有部分面積，轉換為數字)"
-  },
-  "ownership_info": {
-    "registration_order": "string (登記次序)",
-    "registration_date": "string (登記日期)",
-    "cause_date": "string (原因發生日期)",
-    "owner": "string (所有權人姓名)",
-    "owner_address": "string (所有權人住址)",
-    "ownership_share": "string (權利範圍)",
-    "ownership_certificate_number": "string (權狀字號)"
-  },
-  "notes": [
-    "string (重要備註事項清單)"
-  ]
+# Output schema, one entry per section; pages only get the sections they carry
+OUTPUT_SCHEMA: Dict[str, Any] = {
+    "document_info": {
+        "document_type": "string (謄本類型)",
+        "print_time": "string (列印時間)",
+        "document_id_checking_number": "string (謄本檢查號)",
+        "verification_url": "string (查驗網址)",
+        "issuing_office": "string (核發單位)",
+        "issuing_officer": "string (主任姓名)",
+        "certificate_number": "string (電謄字第號)"
+    },
+    "building_basic_info": {
+        "district": "string (行政區)",
+        "section": "string (地段/小段)",
+        "building_number": "string (建號)",
+        "address": "string (門牌地址)",
+        "land_lot_number": "string (坐落地號)"
+    },
+    "building_characteristics": {
+        "building_registration_date": "string (建物標示部登記日期)",
+        "building_sitting_on_land_lot_number": "string (建物座落地號)",
+        "building_address": "string (建物門牌)",
+        "main_use": "string (主要用途)",
+        "main_structure": "string (主要建材)",
+        "total_floors": "string (層數)",
+        "located_floor": "string (層次)",
+        "construction_completion_date": "string (建築完成日期)",
+        "accessory_structures": ["string (附屬建物用途清單)"],
+        "use_permit_number": ["string (使用執照字號清單)"]
+    },
+    "shared_areas": {
+        "shared_building_number": "string (共有部分建號)",
+        "shared_area_sqm": "number (共有部分面積，轉換為數字)"
+    },
+    "ownership_info": {
+        "registration_order": "string (登記次序)",
+        "registration_date": "string (登記日期)",
+        "cause_date": "string (原因發生日期)",
+        "owner": "string (所有權人姓名)",
+        "owner_address": "string (所有權人住址)",
+        "ownership_share": "string (權利範圍)",
+        "ownership_certificate_number": "string (權狀字號)"
+    },
+    "notes": [
+        "string (重要備註事項清單)"
+    ]
 }
-```
+
+# Few-shot output, keyed like OUTPUT_SCHEMA
+OUTPUT_EXAMPLE: Dict[str, Any] = {
+    "document_info": {
+        "document_type": "建物登記第二類謄本（建物標示及所有權部）",
+        "print_time": "民國102年07月05日10時46分",
+        "document_number": "102AF007104REG03135F0D8C4F040059A60088EE802831",
+        "verification_url": "http://ttt.land.net.tw",
+        "issuing_office": "大安地政事務所",
+        "issuing_officer": "主任 高麗香",
+        "certificate_number": "大安電腾字第007104號"
+    },
+    "building_basic_info": {
+        "district": "大安區",
+        "section": "大安段一小段",
+        "building_number": "02069-000建號",
+        "address": "敦化南路586號十三樓之1",
+        "land_lot_number": "大安段一小段 0020-0000"
+    },
+    "building_characteristics": {
+        "main_use": "住家用",
+        "main_structure": "鋼筋混凝土造",
+        "total_floors": "018層",
+        "located_floor": "十三層",
+        "construction_completion_date": "民國076年07月11日",
+        "accessory_structures": ["陽台", "花台"],
+        "use_permit_number": ["76年使字509號", "76年使509號"]
+    },
+    "shared_areas": {
+        "shared_building_number": "大安段一小段02089-000建號",
+        "shared_area_sqm": 2029.25
+    },
+    "ownership_info": {
+        "registration_order": "0001",
+        "registration_date": "民國076年09月08日",
+        "cause_date": "民國076年07月11日",
+        "owner": "詹琬",
+        "owner_address": "台北市松山區五全里7粼永吉路316號11楼",
+        "ownership_share": "全部 1分之1",
+        "ownership_certificate_number": "076北建字第024560號"
+    },
+    "notes": [
+        "本謄本係建物標示及所有權部簡本，详细權利狀態請参閣全部本",
+        "本電子謄本查驗期限為三個月"
+    ]
+}
+
+
+def build_system_prompt(sections: Optional[Sequence[str]] = None) -> str:
+    """
+    System prompt asking for ``sections`` of the output schema only
+
+    Unknown names are ignored; with none (or none known) the whole schema
+    is requested. The few-shot example is cut to the same sections.
+    """
+    names = [name for name in sections or () if name in OUTPUT_SCHEMA] or list(OUTPUT_SCHEMA)
+
+    def fenced(value: Dict[str, Any]) -> str:
+        return f"```json\n{json.dumps(value, ensure_ascii=False, indent=2)}\n```"
+
+    return f"""{_PROMPT_HEAD}
+# 輸出格式規範
+輸出 **必須且只能** 為以下JSON結構，包含所有{len(names)}個主要部分：
+
+{fenced({name: OUTPUT_SCHEMA[name] for name in names})}
 
 # 輸出範例 (Few-shot Example)
 以下為一個標準的輸出範例，請嚴格參考此格式：
 
-```json
-{
-  "document_info": {
-    "document_type": "建物登記第二類謄本（建物標示及所有權部）",
-    "print_time": "民國102年07月05日10時46分",
-    "document_number": "102AF007104REG03135F0D8C4F040059A60088EE802831",
-    "verification_url": "http://ttt.land.net.tw",
-    "issuing_office": "大安地政事務所",
-    "issuing_officer": "主任 高麗香",
-    "certificate_number": "大安電腾字第007104號"
-  },
-  "building_basic_info": {
-    "district": "大安區",
-    "section": "大安段一小段",
-    "building_number": "02069-000建號",
-    "address": "敦化南路586號十三樓之1",
-    "land_lot_number": "大安段一小段 0020-0000"
-  },
-  "building_characteristics": {
-    "main_use": "住家用",
-    "main_structure": "鋼筋混凝土造",
-    "total_floors": "018層",
-    "located_floor": "十三層",
-    "construction_completion_date": "民國076年07月11日",
-    "accessory_structures": ["陽台", "花台"],
-    "use_permit_number": ["76年使字509號", "76年使509號"]
-  },
-  "shared_areas": {
-    "shared_building_number": "大安段一小段02089-000建號",
-    "shared_area_sqm": 2029.25
-  },
-  "ownership_info": {
-    "registration_order": "0001",
-    "registration_date": "民國076年09月08日",
-    "cause_date": "民國076年07月11日",
-    "owner": "詹琬",
-    "owner_address": "台北市松山區五全里7粼永吉路316號11楼",
-    "ownership_share": "全部 1分之1",
-    "ownership_certificate_number": "076北建字第024560號"
-  },
-  "notes": [
-    "本謄本係建物標示及所有權部簡本，详细權利狀態請参閣全部本",
-    "本電子謄本查驗期限為三個月"
-  ]
-}
-```
+{fenced({name: OUTPUT_EXAMPLE[name] for name in names})}
 """
 
+
+SYSTEM_PROMPT = build_system_prompt()
+
+# OpenAI-compatible providers and their endpoints (None = SDK default)
+OPENAI_COMPATIBLE_BASE_URLS = {
+    "openai": None,
+    "deepseek": "https://api.deepseek.com",
+    "grok": "https://api.x.ai/v1",
+}
+
+# Model each provider is called with when none is chosen explicitly
+DEFAULT_MODELS = {
+    "deepseek": "deepseek-chat",
+    "grok": "grok-2-vision-1212",
+    "openai": "gpt-4o",
+    "anthropic": "claude-3-5-sonnet-20240620",
+    "google": "gemini-1.5-pro-latest",
+    "dashscope": "qwen-vl-max",
+}
+
 class VLMEngine(OCREngine):
     def __init__(self, provider: str, model: str, api_key: Optional[str] = None):
         self.provider = provider
         self.model = model
         self.api_key = api_key or self._get_api_key(provider)
-        
+        self._client = None
+
+    async def initialize(self):
+        """Bind the pooled client for this provider (shared across engines)"""
+        if not self.api_key or self._client is not None:
+            return
+        self._client = self._get_client()
+
+    async def close(self):
+        """Release this engine's client reference; connections belong to the registry"""
+        self._client = None
+
+    def _get_client(self) -> Any:
+        registry = get_client_registry()
+
+        if self.provider in OPENAI_COMPATIBLE_BASE_URLS:
+            return registry.openai(
+                self.provider, self.api_key, OPENAI_COMPATIBLE_BASE_URLS[self.provider]
+            )
+        elif self.provider == "anthropic":
+            return registry.anthropic(self.api_key)
+        elif self.provider == "google":
+            registry.configure_google(self.api_key)
+            return genai.GenerativeModel(self.model)
+        else:
+            raise ValueError(f"Unsupported provider: {self.provider}")
+
+    @property
+    def client(self) -> Any:
+        """Pooled client, bound lazily when ``initialize`` was not called"""
+        if self._client is None:
+            self._client = self._get_client()
+        return self._client
+
     def _get_api_key(self, provider: str) -> Optional[str]:
         key_map = {
             "openai": "OPENAI_API_KEY",
@@ -169,27 +232,113 @@ class VLMEngine(OCREngine):
         logger.info(f"Processing {image_path} with {self.name}")
         
         try:
-            if self.provider == "openai":
-                return await self._process_openai_compatible(image_path, base_url=None)
+            if self.provider in OPENAI_COMPATIBLE_BASE_URLS:
+                return await self._process_openai_compatible(image_path)
             elif self.provider == "anthropic":
                 return await self._process_anthropic(image_path)
             elif self.provider == "google":
                 return await self._process_google(image_path)
-            elif self.provider == "deepseek":
-                return await self._process_openai_compatible(image_path, base_url="https://api.deepseek.com")
-            elif self.provider == "grok":
-                return await self._process_openai_compatible(image_path, base_url="https://api.x.ai/v1")
             else:
                 raise ValueError(f"Unsupported provider: {self.provider}")
         except Exception as e:
             logger.error(f"Error processing with {self.name}: {e}")
             raise
 
-    async def _process_openai_compatible(self, image_path: Path, base_url: Optional[str]) -> Dict[str, Any]:
-        if not AsyncOpenAI:
-            raise ImportError("openai package is not installed")
-            
-        client = AsyncOpenAI(api_key=self.api_key, base_url=base_url)
+    async def complete(
+        self,
+        messages: List[Dict[str, Any]],
+        timeout: Optional[float] = None,
+        json_output: bool = True
+    ) -> str:
+        """
+        Send OpenAI-style chat messages and return the reply text
+
+        Messages may carry ``text`` and base64 ``image_url`` content parts;
+        they are translated to the provider's own request format.
+        """
+        if not self.api_key:
+            raise ValueError(f"API key not found for {self.provider}")
+
+        if self.provider in OPENAI_COMPATIBLE_BASE_URLS:
+            kwargs: Dict[str, Any] = {"model": self.model, "messages": messages}
+            if json_output:
+                kwargs["response_format"] = {"type": "json_object"}
+            if timeout is not None:
+                kwargs["timeout"] = timeout
+            response = await self.client.chat.completions.create(**kwargs)
+            return response.choices[0].message.content
+        elif self.provider == "anthropic":
+            system, chat = self._anthropic_messages(messages)
+            kwargs = {"model": self.model, "max_tokens": 4096, "messages": chat}
+            if system:
+                kwargs["system"] = system
+            if timeout is not None:
+                kwargs["timeout"] = timeout
+            response = await self.client.messages.create(**kwargs)
+            return response.content[0].text
+        elif self.provider == "google":
+            kwargs = {}
+            if json_output:
+                kwargs["generation_config"] = {"response_mime_type": "application/json"}
+            if timeout is not None:
+                kwargs["request_options"] = {"timeout": timeout}
+            response = await self.client.generate_content_async(
+                self._google_parts(messages), **kwargs
+            )
+            return response.text
+        else:
+            raise ValueError(f"Unsupported provider: {self.provider}")
+
+    @staticmethod
+    def _content_parts(message: Dict[str, Any]) -> List[Dict[str, Any]]:
+        content = message.get("content", "")
+        if isinstance(content, str):
+            return [{"type": "text", "text": content}]
+        return content
+
+    @staticmethod
+    def _split_data_url(url: str) -> tuple:
+        """``data:<media type>;base64,<data>`` -> (media type, base64 data)"""
+        header, _, data = url.partition(",")
+        return header[len("data:"):].split(";")[0], data
+
+    def _anthropic_messages(self, messages: List[Dict[str, Any]]) -> tuple:
+        """System text and Messages-API turns from OpenAI-style messages"""
+        system = []
+        chat = []
+        for message in messages:
+            parts = self._content_parts(message)
+            if message.get("role") == "system":
+                system.extend(part["text"] for part in parts if part.get("type") == "text")
+                continue
+
+            content = []
+            for part in parts:
+                if part.get("type") == "image_url":
+                    media_type, data = self._split_data_url(part["image_url"]["url"])
+                    content.append({
+                        "type": "image",
+                        "source": {"type": "base64", "media_type": media_type, "data": data}
+                    })
+                else:
+                    content.append({"type": "text", "text": part.get("text", "")})
+            chat.append({"role": message.get("role", "user"), "content": content})
+        return "\n\n".join(system), chat
+
+    def _google_parts(self, messages: List[Dict[str, Any]]) -> List[Any]:
+        """Flat Gemini content parts (text and inline images) from chat messages"""
+        parts: List[Any] = []
+        for message in messages:
+            for part in self._content_parts(message):
+                if part.get("type") == "image_url":
+                    media_type, data = self._split_data_url(part["image_url"]["url"])
+                    parts.append({"mime_type": media_type, "data": base64.b64decode(data)})
+                else:
+                    parts.append(part.get("text", ""))
+        return parts
+
+    async def _process_openai_compatible(self, image_path: Path) -> Dict[str, Any]:
+        client = self.client
         base64_image = self._encode_image(image_path)
         
         response = await client.chat.completions.create(
@@ -219,10 +368,7 @@ class VLMEngine(OCREngine):
         return json.loads(content)
 
     async def _process_anthropic(self, image_path: Path) -> Dict[str, Any]:
-        if not AsyncAnthropic:
-            raise ImportError("anthropic package is not installed")
-
-        client = AsyncAnthropic(api_key=self.api_key)
+        client = self.client
         base64_image = self._encode_image(image_path)
         media_type = "image/jpeg" # Assuming jpeg, should detect
         if image_path.suffix.lower() == '.png':
@@ -263,11 +409,7 @@ class VLMEngine(OCREngine):
         return json.loads(content)
 
     async def _process_google(self, image_path: Path) -> Dict[str, Any]:
-        if not genai:
-            raise ImportError("google-generativeai package is not installed")
-
-        genai.configure(api_key=self.api_key)
-        model = genai.GenerativeModel(self.model)
+        model = self.client
         
         import PIL.Image
         img = PIL.Image.open(image_path)
@@ -0,0 +1,158 @@
+"""
+Decoded page representation shared across OCR pipeline stages
+"""
+import hashlib
+from typing import Any, Dict, Optional, Union
+
+import cv2
+import numpy as np
+
+
+class PageImage:
+    """
+    A single page held as a decoded ndarray.
+
+    Stages read ``array`` (or ``gray``) directly instead of decoding bytes
+    again; PNG/JPEG encodings are produced lazily, only when the page has
+    to leave the process (e.g. VLM upload), and memoized.
+
+    ``owner`` keeps alive an object whose buffer ``array`` views without
+    copying (e.g. a PyMuPDF pixmap); it is never pickled.
+    """
+
+    def __init__(
+        self,
+        array: np.ndarray,
+        page_number: int = 1,
+        metadata: Optional[Dict[str, Any]] = None,
+        owner: Any = None
+    ):
+        if array is None or array.size == 0:
+            raise ValueError("Page image array is empty")
+
+        self.array = array
+        self.page_number = page_number
+        self.metadata = metadata or {}
+        self._owner = owner
+        self._gray: Optional[np.ndarray] = array if array.ndim == 2 else None
+        self._encoded: Dict[str, bytes] = {}
+        self._content_hash: Optional[str] = None
+
+    @classmethod
+    def from_bytes(
+        cls,
+        image_data: bytes,
+        page_number: int = 1,
+        grayscale: bool = False,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> "PageImage":
+        """Decode encoded image bytes (PNG, JPEG, ...) into a page"""
+        nparr = np.frombuffer(image_data, np.uint8)
+        if nparr.size == 0:
+            raise ValueError("Failed to decode image")
+
+        flags = cv2.IMREAD_GRAYSCALE if grayscale else cv2.IMREAD_COLOR
+        image = cv2.imdecode(nparr, flags)
+        if image is None:
+            raise ValueError("Failed to decode image")
+
+        page = cls(image, page_number=page_number, metadata=metadata)
+        if image_data[:8] == b'\x89PNG\r\n\x1a\n':
+            page._encoded['png'] = bytes(image_data)
+        return page
+
+    @classmethod
+    def coerce(
+        cls,
+        image: Union["PageImage", np.ndarray, bytes],
+        page_number: int = 1
+    ) -> "PageImage":
+        """Accept a page, a decoded array or encoded bytes"""
+        if isinstance(image, PageImage):
+            return image
+        if isinstance(image, np.ndarray):
+            return cls(image, page_number=page_number)
+        return cls.from_bytes(image, page_number=page_number)
+
+    @property
+    def gray(self) -> np.ndarray:
+        """Grayscale view of the page (converted once and memoized)"""
+        if self._gray is None:
+            self._gray = cv2.cvtColor(self.array, cv2.COLOR_BGR2GRAY)
+        return self._gray
+
+    @property
+    def shape(self) -> tuple:
+        return self.array.shape
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the pixel buffers and memoized encodings"""
+        size = self.array.nbytes + sum(len(data) for data in self._encoded.values())
+        if self._gray is not None and self._gray is not self.array:
+            size += self._gray.nbytes
+        return size
+
+    @property
+    def content_hash(self) -> str:
+        """BLAKE2b digest of the pixels (with shape and dtype), computed once"""
+        if self._content_hash is None:
+            digest = hashlib.blake2b(digest_size=32)
+            digest.update(f"{self.array.shape}:{self.array.dtype}".encode())
+            digest.update(np.ascontiguousarray(self.array).data)
+            self._content_hash = digest.hexdigest()
+        return self._content_hash
+
+    def with_array(self, array: np.ndarray) -> "PageImage":
+        """Return a new page carrying this page's number and metadata"""
+        # Views of a borrowed buffer must keep its owner alive; new arrays must not
+        owner = self._owner if self._owner is not None and np.may_share_memory(array, self.array) else None
+        return PageImage(array, page_number=self.page_number, metadata=dict(self.metadata), owner=owner)
+
+    def to_png(self) -> bytes:
+        """PNG encoding of the page, encoded on first use"""
+        if 'png' not in self._encoded:
+            self._encoded['png'] = self._encode('.png')
+        return self._encoded['png']
+
+    def to_jpeg(self, quality: int = 90) -> bytes:
+        """JPEG encoding of the page, encoded on first use per quality"""
+        key = f'jpeg:{quality}'
+        if key not in self._encoded:
+            self._encoded[key] = self._encode('.jpg', [cv2.IMWRITE_JPEG_QUALITY, quality])
+        return self._encoded[key]
+
+    def _encode(self, ext: str, params: Optional[list] = None) -> bytes:
+        success, encoded = cv2.imencode(ext, self.array, params or [])
+        if not success:
+            raise ValueError(f"Failed to encode page {self.page_number} as {ext}")
+        return encoded.tobytes()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Only the pixels cross process boundaries; encodings are rebuilt on demand
+        return {
+            'array': self.array,
+            'page_number': self.page_number,
+            'metadata': self.metadata
+        }
+
+    def __setstate__(self, state: Dict[str, Any]):
+        self.__init__(state['array'], state['page_number'], state['metadata'])
+
+    def __repr__(self) -> str:
+        return f"PageImage(page={self.page_number}, shape={self.array.shape})"
+
+
+def as_gray_array(image_data: Union[PageImage, np.ndarray, bytes]) -> Optional[np.ndarray]:
+    """Grayscale ndarray for a page, decoding only when given encoded bytes"""
+    if isinstance(image_data, PageImage):
+        return image_data.gray
+    if isinstance(image_data, np.ndarray):
+        if image_data.ndim == 2:
+            return image_data
+        return cv2.cvtColor(image_data, cv2.COLOR_BGR2GRAY)
+
+    nparr = np.frombuffer(image_data, np.uint8)
+    if nparr.size == 0:
+        return None
+    return cv2.imdecode(nparr, cv2.IMREAD_GRAYSCALE)
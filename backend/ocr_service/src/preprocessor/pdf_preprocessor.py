@@ -3,16 +3,117 @@ PDF preprocessing module for document extraction and conversion
 """
 import fitz  # PyMuPDF
 import io
-from typing import List, Dict, Any, Optional
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Deque, List, Dict, Any, Optional
 import asyncio
 from loguru import logger
 from PIL import Image
+import cv2
 import numpy as np
 
+from .page_image import PageImage
+
+
+def estimate_x_height(gray: np.ndarray, min_components: int = 10) -> Optional[float]:
+    """
+    Median glyph height in pixels, from connected components of dark ink
+    
+    Components that look like rules, borders or specks are ignored. For
+    Latin text the median lands on the x-height; CJK glyphs, whose strokes
+    are often disconnected, are first bridged by a small vertical closing
+    so they measure as whole characters. Returns None when the page has
+    too little text to measure.
+    """
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+    binary = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, _STROKE_BRIDGE)
+    count, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+    
+    # Row 0 is the background
+    widths = stats[1:, cv2.CC_STAT_WIDTH]
+    heights = stats[1:, cv2.CC_STAT_HEIGHT]
+    areas = stats[1:, cv2.CC_STAT_AREA]
+    glyphs = (
+        (heights >= 3)
+        & (heights <= gray.shape[0] * 0.1)
+        & (areas >= 4)
+        & (widths <= heights * 5)
+        & (heights <= widths * 10)
+    )
+    
+    if np.count_nonzero(glyphs) < min_components:
+        return None
+    return float(np.median(heights[glyphs]))
+
+
+# Joins vertically stacked strokes of one glyph without merging text lines
+_STROKE_BRIDGE = cv2.getStructuringElement(cv2.MORPH_RECT, (1, 3))
+
+
+class _PixmapBuffer:
+    """Exposes pixmap samples to NumPy while holding the pixmap alive"""
+    
+    def __init__(self, pix: fitz.Pixmap, shape: tuple, strides: tuple):
+        self.pix = pix
+        self.__array_interface__ = {
+            'version': 3,
+            'shape': shape,
+            'strides': strides,
+            'typestr': '|u1',
+            'data': (pix.samples_ptr, True),
+        }
+
+
+def pixmap_to_page(pix: fitz.Pixmap, page_number: int = 1) -> PageImage:
+    """
+    Wrap a pixmap's samples as a page through the array interface
+    
+    Grayscale pixmaps are used without copying; the array's base holds the
+    pixmap, so its memory outlives the page for as long as any view of the
+    array does. RGB pixmaps are swapped to OpenCV's BGR order, which
+    copies them.
+    """
+    if pix.alpha:
+        raise ValueError("Pixmaps with alpha are not supported")
+    
+    if pix.n == 1:
+        shape, strides = (pix.height, pix.width), (pix.stride, 1)
+    else:
+        shape, strides = (pix.height, pix.width, pix.n), (pix.stride, pix.n, 1)
+    array = np.asarray(_PixmapBuffer(pix, shape, strides))
+    
+    if pix.n == 1:
+        return PageImage(array, page_number=page_number, owner=pix)
+    return PageImage(cv2.cvtColor(array, cv2.COLOR_RGB2BGR), page_number=page_number)
+
+
 class PDFPreprocessor:
-    def __init__(self, target_dpi: int = 300, max_pages: int = 50):
+    def __init__(
+        self,
+        target_dpi: int = 300,
+        max_pages: int = 50,
+        max_in_flight: int = 2,
+        min_text_chars: int = 20,
+        min_text_coverage: float = 0.5,
+        min_valid_char_ratio: float = 0.9,
+        probe_dpi: int = 96,
+        min_dpi: int = 150,
+        target_x_height: float = 24.0,
+        dpi_step: int = 25
+    ):
         self.target_dpi = target_dpi
         self.max_pages = max_pages
+        # Pages rendered ahead of the consumer by iter_pages
+        self.max_in_flight = max_in_flight
+        # A page's text layer replaces OCR only when it passes all of these
+        self.min_text_chars = min_text_chars
+        self.min_text_coverage = min_text_coverage
+        self.min_valid_char_ratio = min_valid_char_ratio
+        # Adaptive DPI: the smallest DPI giving Tesseract ~target_x_height px glyphs
+        self.probe_dpi = probe_dpi
+        self.min_dpi = min_dpi
+        self.target_x_height = target_x_height
+        self.dpi_step = dpi_step
         self.is_initialized = False
     
     async def initialize(self):
@@ -33,7 +134,10 @@ class PDFPreprocessor:
         self, 
         pdf_data: bytes, 
         page_range: Optional[str] = None,
-        extract_text: bool = True
+        extract_text: bool = True,
+        dpi: Optional[int] = None,
+        max_pages: Optional[int] = None,
+        adaptive_dpi: bool = False
     ) -> List[Dict[str, Any]]:
         """
         Extract pages from PDF with optional text extraction
@@ -42,33 +146,27 @@ class PDFPreprocessor:
             pdf_data: PDF file bytes
             page_range: Page range (e.g., "1-5,7,9-12")
             extract_text: Whether to extract text content
+            dpi: Render resolution (defaults to ``target_dpi``)
+            max_pages: Page limit (defaults to ``self.max_pages``)
+            adaptive_dpi: Pick each page's DPI from its text size, up to ``dpi``
             
         Returns:
             List of page information with images and optional text
         """
         try:
-            # Open PDF from memory
-            pdf_document = fitz.open(stream=pdf_data, filetype="pdf")
-            
-            # Parse page range
-            pages_to_process = self._parse_page_range(page_range, pdf_document.page_count)
-            
-            if not pages_to_process:
-                raise ValueError("No valid pages to process")
-            
-            if len(pages_to_process) > self.max_pages:
-                raise ValueError(f"PDF contains too many pages ({len(pages_to_process)} > {self.max_pages})")
-            
             extracted_pages = []
-            
-            for page_num in pages_to_process:
-                page_info = await self._process_page(
-                    pdf_document, page_num, extract_text
-                )
+            async for page_info in self.iter_pages(
+                pdf_data,
+                page_range,
+                extract_text,
+                dpi=dpi,
+                max_pages=max_pages,
+                adaptive_dpi=adaptive_dpi
+            ):
+                # List callers get encoded pages; streaming callers skip encoding
+                page_info['image_data'] = page_info.pop('image').to_png()
                 extracted_pages.append(page_info)
             
-            pdf_document.close()
-            
             logger.info(f"Extracted {len(extracted_pages)} pages from PDF")
             return extracted_pages
             
@@ -76,6 +174,76 @@ class PDFPreprocessor:
             logger.error(f"PDF extraction failed: {e}")
             raise
     
+    async def iter_pages(
+        self,
+        pdf_data: bytes,
+        page_range: Optional[str] = None,
+        extract_text: bool = True,
+        dpi: Optional[int] = None,
+        max_pages: Optional[int] = None,
+        max_in_flight: Optional[int] = None,
+        grayscale: bool = False,
+        adaptive_dpi: bool = False
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Render pages one at a time from the in-memory PDF
+        
+        Pages are rendered on a dedicated thread at most ``max_in_flight``
+        pages ahead of the consumer, so memory stays bounded however long
+        the document is. Closing the generator early stops rendering.
+        
+        Each page's ``image`` is a ``PageImage`` over the raw pixmap; no PNG
+        is encoded unless a caller asks the page for one.
+        
+        Args:
+            pdf_data: PDF file bytes
+            page_range: Page range (e.g., "1-5,7,9-12")
+            extract_text: Whether to extract text content
+            dpi: Render resolution (defaults to ``target_dpi``)
+            max_pages: Page limit (defaults to ``self.max_pages``)
+            max_in_flight: Render-ahead bound (defaults to ``self.max_in_flight``)
+            grayscale: Render straight to 8-bit gray (zero-copy handoff)
+            adaptive_dpi: Pick each page's DPI from its text size, up to ``dpi``
+            
+        Yields:
+            Page information, in page order
+        """
+        pdf_document = fitz.open(stream=pdf_data, filetype="pdf")
+        # PyMuPDF documents are not thread-safe: one render thread per document
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pdf-render")
+        pending: Deque[asyncio.Future] = deque()
+        
+        try:
+            pages_to_process = self._parse_page_range(page_range, pdf_document.page_count, max_pages)
+            if not pages_to_process:
+                raise ValueError("No valid pages to process")
+            
+            loop = asyncio.get_running_loop()
+            remaining = iter(pages_to_process)
+            dpi = dpi or self.target_dpi
+            
+            def render_next():
+                page_num = next(remaining, None)
+                if page_num is not None:
+                    pending.append(loop.run_in_executor(
+                        executor, self._render_page, pdf_document, page_num,
+                        extract_text, dpi, grayscale, adaptive_dpi
+                    ))
+            
+            for _ in range(max(1, max_in_flight or self.max_in_flight)):
+                render_next()
+            
+            while pending:
+                page_info = await pending.popleft()
+                render_next()
+                yield page_info
+        finally:
+            for future in pending:
+                future.cancel()
+            # Let a render already running finish before the document goes away
+            await asyncio.to_thread(executor.shutdown, True)
+            pdf_document.close()
+    
     async def convert_to_images(
         self, 
         pdf_data: bytes, 
@@ -118,45 +286,51 @@ class PDFPreprocessor:
             logger.error(f"PDF metadata extraction failed: {e}")
             raise
     
-    async def _process_page(
+    def _render_page(
         self, 
         pdf_document: fitz.Document, 
         page_num: int, 
-        extract_text: bool
+        extract_text: bool,
+        dpi: int,
+        grayscale: bool = False,
+        adaptive_dpi: bool = False
     ) -> Dict[str, Any]:
-        """Process individual PDF page"""
+        """Render an individual PDF page (blocking; runs on the render thread)"""
         try:
             page = pdf_document[page_num - 1]  # 0-based index
             
-            # Get page dimensions
-            rect = page.rect
-            width = rect.width
-            height = rect.height
+            if adaptive_dpi:
+                dpi = self._select_dpi(page, dpi)
             
             # Calculate zoom factor for target DPI
-            zoom = self.target_dpi / 72  # PDF uses 72 DPI
+            zoom = dpi / 72  # PDF uses 72 DPI
             matrix = fitz.Matrix(zoom, zoom)
             
-            # Render page to image
-            pix = page.get_pixmap(matrix=matrix)
-            
-            # Convert to bytes
-            image_data = pix.tobytes("png")
+            # Render page to raw pixels; encoding is left to whoever needs it
+            pix = page.get_pixmap(
+                matrix=matrix,
+                colorspace=fitz.csGRAY if grayscale else fitz.csRGB,
+                alpha=False
+            )
+            image = pixmap_to_page(pix, page_number=page_num)
             
             # Extract text if requested
             text_content = None
+            text_layer = None
             if extract_text:
                 text_content = page.get_text()
+                text_layer = self._extract_text_layer(page, matrix)
             
             page_info = {
                 'page_number': page_num,
-                'image_data': image_data,
+                'image': image,
                 'dimensions': {
-                    'width': int(width * zoom),
-                    'height': int(height * zoom),
-                    'dpi': self.target_dpi
+                    'width': pix.width,
+                    'height': pix.height,
+                    'dpi': dpi
                 },
                 'text_content': text_content,
+                'text_layer': text_layer,
                 'has_images': len(page.get_images()) > 0,
                 'rotation': page.rotation
             }
@@ -167,11 +341,90 @@ class PDFPreprocessor:
             logger.error(f"Failed to process page {page_num}: {e}")
             raise
     
-    def _parse_page_range(self, page_range: Optional[str], total_pages: int) -> List[int]:
+    def _select_dpi(self, page: fitz.Page, max_dpi: int) -> int:
+        """
+        Smallest DPI (in ``dpi_step`` steps, within [min_dpi, max_dpi]) at
+        which the page's text reaches ``target_x_height`` pixels
+        
+        Measured on a cheap low-DPI gray probe; pages without measurable
+        text keep ``max_dpi``.
+        """
+        zoom = self.probe_dpi / 72
+        probe = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csGRAY, alpha=False)
+        x_height = estimate_x_height(pixmap_to_page(probe).array)
+        if not x_height:
+            return max_dpi
+        
+        dpi = self.probe_dpi * self.target_x_height / x_height
+        dpi = int(np.ceil(dpi / self.dpi_step)) * self.dpi_step
+        return int(min(max(dpi, self.min_dpi), max_dpi))
+    
+    def _extract_text_layer(self, page: fitz.Page, matrix: fitz.Matrix) -> Dict[str, Any]:
+        """
+        Assess a page's embedded text layer and, if usable, return it as OCR blocks
+        
+        Coverage is the share of the page's text-plus-image area taken by
+        words, so a scan with a hidden or partial text layer (large images,
+        little text) falls back to OCR while born-digital pages pass. Bboxes
+        are in pixels of the page rendered with ``matrix``.
+        """
+        words = page.get_text("words")
+        # Extraction coordinates are in unrotated page space
+        bounds = page.rect * page.derotation_matrix
+        page_area = abs(bounds) or 1.0
+        
+        text = "".join(word[4] for word in words)
+        valid_chars = sum(1 for char in text if char.isprintable() and char != "\ufffd")
+        valid_ratio = valid_chars / len(text) if text else 0.0
+        
+        text_area = sum(abs(fitz.Rect(word[:4]) & bounds) for word in words)
+        image_area = sum(
+            abs(fitz.Rect(info['bbox']) & bounds) for info in page.get_image_info()
+        )
+        content_area = min(text_area + image_area, page_area)
+        coverage = min(text_area / content_area, 1.0) if content_area else 0.0
+        
+        layer = {
+            'chars': len(text),
+            'valid_char_ratio': round(valid_ratio, 3),
+            'coverage': round(coverage, 3),
+            'usable': (
+                len(text) >= self.min_text_chars
+                and valid_ratio >= self.min_valid_char_ratio
+                and coverage >= self.min_text_coverage
+            )
+        }
+        if not layer['usable']:
+            return layer
+        
+        # Map word boxes onto the (rotated) rendered page
+        transform = page.rotation_matrix * matrix
+        text_blocks = []
+        for x0, y0, x1, y1, word, block_num, line_num, word_num in words:
+            rect = fitz.Rect(x0, y0, x1, y1) * transform
+            text_blocks.append({
+                'text': word,
+                'confidence': 1.0,
+                'bbox': [int(rect.x0), int(rect.y0), int(round(rect.width)), int(round(rect.height))],
+                'page_num': page.number + 1,
+                'block_num': block_num,
+                'line_num': line_num,
+                'word_num': word_num
+            })
+        layer['text_blocks'] = text_blocks
+        return layer
+    
+    def _parse_page_range(
+        self,
+        page_range: Optional[str],
+        total_pages: int,
+        max_pages: Optional[int] = None
+    ) -> List[int]:
         """Parse page range string into list of page numbers"""
+        max_pages = max_pages or self.max_pages
         if not page_range:
             # Return all pages up to max_pages
-            return list(range(1, min(total_pages, self.max_pages) + 1))
+            return list(range(1, min(total_pages, max_pages) + 1))
         
         try:
             pages = []
@@ -198,8 +451,8 @@ class PDFPreprocessor:
             pages = sorted(set(pages))
             
             # Limit to max_pages
-            if len(pages) > self.max_pages:
-                pages = pages[:self.max_pages]
+            if len(pages) > max_pages:
+                pages = pages[:max_pages]
             
             return pages
             
@@ -3,20 +3,219 @@ Cache manager for OCR results optimization
 """
 import hashlib
 import json
-import pickle
-from typing import Dict, Any, Optional
+import sys
+import time
+import uuid
+from collections import OrderedDict
+from itertools import islice
+from typing import Awaitable, Callable, Dict, Any, Iterator, Optional, Tuple
 import asyncio
 import aioredis
 from loguru import logger
 
+from .codecs import CodecRegistry, default_registry
+
+# Items per container looked at by estimate_size; the rest are extrapolated
+_SIZE_SAMPLE = 16
+
+def estimate_size(value: Any) -> int:
+    """
+    Rough in-memory footprint of a cached value, without serializing it
+    
+    Anything exposing ``nbytes`` (arrays, pages) counts that. Containers add
+    their items, extrapolated from the first few so large results stay cheap.
+    """
+    nbytes = getattr(value, 'nbytes', None)
+    if isinstance(nbytes, int):
+        return nbytes
+    
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        items = [estimate_size(key) + estimate_size(item) for key, item in islice(value.items(), _SIZE_SAMPLE)]
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        items = [estimate_size(item) for item in islice(value, _SIZE_SAMPLE)]
+    else:
+        return size
+    if items:
+        size += sum(items) * len(value) // len(items)
+    return size
+
+class SingleFlight:
+    """Collapse concurrent calls for the same key into one execution"""
+    
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Future] = {}
+    
+    def __contains__(self, key: str) -> bool:
+        return key in self._inflight
+    
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Await ``fn()``, or the already running call for ``key``"""
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(fn())
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        
+        # A cancelled caller must not cancel the work other callers share
+        return await asyncio.shield(future)
+
+class MemoryCache:
+    """
+    Size-bounded LRU cache with per-entry TTL
+    
+    Entry sizes are measured once, at insertion, so eviction never has to
+    re-serialize the cache. Least recently used entries are evicted first.
+    """
+    
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        # key -> (value, size in bytes, expiry on the monotonic clock or None)
+        self._entries: "OrderedDict[str, Tuple[Any, int, Optional[float]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+    
+    def keys(self) -> Iterator[str]:
+        return iter(list(self._entries))
+    
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        
+        value, _, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+        
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+    
+    def set(self, key: str, value: Any, size: int, ttl: Optional[int] = None) -> bool:
+        """Store ``value`` accounted as ``size`` bytes; False if it can never fit"""
+        if key in self._entries:
+            self._remove(key)
+        
+        if size > self.max_bytes:
+            return False
+        
+        expires_at = time.monotonic() + ttl if ttl else None
+        self._entries[key] = (value, size, expires_at)
+        self.current_bytes += size
+        self._evict()
+        return True
+    
+    def delete(self, key: str) -> bool:
+        if key not in self._entries:
+            return False
+        self._remove(key)
+        return True
+    
+    def clear(self):
+        self._entries.clear()
+        self.current_bytes = 0
+    
+    def purge_expired(self) -> int:
+        """Drop all expired entries"""
+        now = time.monotonic()
+        expired = [
+            key for key, (_, _, expires_at) in self._entries.items()
+            if expires_at is not None and expires_at <= now
+        ]
+        for key in expired:
+            self._remove(key)
+        self.expirations += len(expired)
+        return len(expired)
+    
+    def _remove(self, key: str):
+        _, size, _ = self._entries.pop(key)
+        self.current_bytes -= size
+    
+    def _evict(self) -> int:
+        evicted = 0
+        while self.current_bytes > self.max_bytes and self._entries:
+            key = next(iter(self._entries))
+            self._remove(key)
+            evicted += 1
+        self.evictions += evicted
+        return evicted
+    
+    def resize(self, max_bytes: int) -> int:
+        """Change the budget, evicting LRU entries that no longer fit"""
+        self.max_bytes = max_bytes
+        return self._evict()
+    
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self.current_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations
+        }
+
 class CacheManager:
-    def __init__(self, redis_url: Optional[str] = None, max_memory_mb: int = 100):
+    """
+    Result cache backed by Redis, or by process memory when Redis is unavailable
+    
+    With ``tiered=True`` the memory cache becomes an L1 in front of Redis
+    (L2): reads try L1 first and promote L2 hits, writes go to both tiers.
+    L1 entries live at most ``l1_ttl`` seconds; with ``broadcast_invalidations``
+    writes and deletes are also published on ``invalidation_channel`` so
+    other processes drop their stale L1 copies.
+    """
+    
+    def __init__(
+        self,
+        redis_url: Optional[str] = None,
+        max_memory_mb: int = 100,
+        tiered: bool = False,
+        l1_ttl: int = 300,
+        broadcast_invalidations: bool = False,
+        invalidation_channel: str = "ocr:cache:invalidate",
+        codecs: Optional[CodecRegistry] = None
+    ):
         self.redis_url = redis_url or "redis://localhost:6379"
-        self.max_memory_mb = max_memory_mb
         self.redis_client = None
-        self.memory_cache = {}
+        # Per-namespace serialization for values leaving the process
+        self.codecs = codecs or default_registry()
+        self.memory_cache = MemoryCache(max_memory_mb * 1024 * 1024)
+        self.max_memory_mb = max_memory_mb
+        self.tiered = tiered
+        self.l1_ttl = l1_ttl
+        self.broadcast_invalidations = broadcast_invalidations
+        self.invalidation_channel = invalidation_channel
+        self.instance_id = uuid.uuid4().hex
+        self.single_flight = SingleFlight()
+        self._pubsub = None
+        self._invalidation_task: Optional[asyncio.Task] = None
         self.is_initialized = False
     
+    @property
+    def max_memory_mb(self) -> int:
+        return self._max_memory_mb
+    
+    @max_memory_mb.setter
+    def max_memory_mb(self, value: int):
+        self._max_memory_mb = value
+        self.memory_cache.resize(value * 1024 * 1024)
+    
     async def initialize(self):
         """Initialize cache manager"""
         if self.is_initialized:
@@ -37,20 +236,42 @@ class CacheManager:
                 logger.warning(f"Redis not available, using in-memory cache: {redis_error}")
                 self.redis_client = None
             
+            if self._use_l1 and self.broadcast_invalidations:
+                await self._subscribe_invalidations()
+            
             self.is_initialized = True
             
         except Exception as e:
             logger.error(f"Failed to initialize cache manager: {e}")
             raise
     
+    @property
+    def _use_l1(self) -> bool:
+        """Whether the memory cache fronts Redis as an L1 tier"""
+        return self.tiered and self.redis_client is not None
+    
     async def get(self, key: str) -> Optional[Any]:
         """Get value from cache"""
         try:
+            if self._use_l1:
+                value = self.memory_cache.get(key)
+                if value is not None:
+                    return value
+                
+                cached_data = await self.redis_client.get(key)
+                if not cached_data:
+                    return None
+                
+                # Promote so the next read skips the network hop
+                value = self.codecs.decode(cached_data)
+                self.memory_cache.set(key, value, estimate_size(value), ttl=self.l1_ttl)
+                return value
+            
             if self.redis_client:
                 # Try Redis first
                 cached_data = await self.redis_client.get(key)
                 if cached_data:
-                    return pickle.loads(cached_data)
+                    return self.codecs.decode(cached_data)
             
             # Fall back to memory cache
             return self.memory_cache.get(key)
@@ -62,15 +283,22 @@ class CacheManager:
     async def set(self, key: str, value: Any, ttl: int = 3600) -> bool:
         """Set value in cache with TTL"""
         try:
-            serialized_value = pickle.dumps(value)
-            
             if self.redis_client:
-                # Use Redis
+                # Encoding (pickle + compression) is CPU-bound; keep it off the loop
+                serialized_value = await asyncio.to_thread(self.codecs.encode, key, value)
                 await self.redis_client.set(key, serialized_value, ex=ttl)
+                
+                if self._use_l1:
+                    # Write-through; L1 never outlives the L2 entry
+                    self.memory_cache.set(
+                        key, value, estimate_size(value), ttl=min(ttl, self.l1_ttl) if ttl else self.l1_ttl
+                    )
+                    await self._publish_invalidation(key)
             else:
-                # Use memory cache with LRU eviction
-                self.memory_cache[key] = value
-                await self._clean_memory_cache()
+                # Memory cache holds the live object, so it is sized as one
+                # (never encoded) and evicted LRU
+                if not self.memory_cache.set(key, value, estimate_size(value), ttl=ttl):
+                    logger.debug(f"Value for {key} exceeds memory cache budget, not cached")
             
             return True
             
@@ -84,8 +312,10 @@ class CacheManager:
             if self.redis_client:
                 await self.redis_client.delete(key)
             
-            if key in self.memory_cache:
-                del self.memory_cache[key]
+            self.memory_cache.delete(key)
+            
+            if self._use_l1:
+                await self._publish_invalidation(key)
             
             return True
             
@@ -101,33 +331,113 @@ class CacheManager:
             
             self.memory_cache.clear()
             
+            if self._use_l1:
+                await self._publish_invalidation("*")
+            
             return True
             
         except Exception as e:
             logger.warning(f"Cache clear failed: {e}")
             return False
     
+    async def _subscribe_invalidations(self):
+        """Listen for other processes' writes and drop stale L1 entries"""
+        try:
+            self._pubsub = self.redis_client.pubsub()
+            await self._pubsub.subscribe(self.invalidation_channel)
+            self._invalidation_task = asyncio.create_task(self._listen_invalidations())
+            logger.info(f"Subscribed to cache invalidations on {self.invalidation_channel}")
+        except Exception as e:
+            logger.warning(f"Cache invalidation subscribe failed, L1 relies on TTL only: {e}")
+            self._pubsub = None
+    
+    async def _listen_invalidations(self):
+        try:
+            async for message in self._pubsub.listen():
+                if message.get('type') == 'message':
+                    self._handle_invalidation(message['data'])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Cache invalidation listener stopped: {e}")
+    
+    def _handle_invalidation(self, data: Any):
+        if isinstance(data, bytes):
+            data = data.decode("utf-8")
+        
+        sender, _, key = data.partition(":")
+        if sender == self.instance_id:
+            return
+        
+        if key == "*":
+            self.memory_cache.clear()
+        else:
+            self.memory_cache.delete(key)
+    
+    async def _publish_invalidation(self, key: str):
+        if not self.broadcast_invalidations:
+            return
+        try:
+            await self.redis_client.publish(self.invalidation_channel, f"{self.instance_id}:{key}")
+        except Exception as e:
+            logger.warning(f"Cache invalidation publish failed for key {key}: {e}")
+    
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        ttl: int = 3600
+    ) -> Tuple[Any, bool]:
+        """
+        Return ``(value, cached)`` for ``key``, computing and storing it on a miss
+        
+        Concurrent misses for the same key share a single ``compute()`` call.
+        """
+        cached_value = await self.get(key)
+        if cached_value is not None:
+            return cached_value, True
+        
+        async def compute_and_store() -> Any:
+            value = await compute()
+            await self.set(key, value, ttl=ttl)
+            return value
+        
+        if key in self.single_flight:
+            logger.info(f"Joining in-flight computation for {key}")
+        
+        return await self.single_flight.do(key, compute_and_store), False
+    
+    @staticmethod
+    def content_hash(content: bytes) -> str:
+        """Stable content digest (unlike ``hash()``, identical across processes)"""
+        return hashlib.blake2b(content, digest_size=32).hexdigest()
+    
     async def generate_key(
         self, 
         content: bytes, 
         document_type: str, 
         language: str,
-        processing_config: Optional[Dict[str, Any]] = None
+        processing_config: Optional[Dict[str, Any]] = None,
+        engine_version: Optional[str] = None
     ) -> str:
         """Generate cache key based on content and parameters"""
+        content_hash = self.content_hash(content)
+        
         try:
-            # Create hash of content
-            content_hash = hashlib.md5(content).hexdigest()
-            
-            # Include processing parameters
-            config_str = json.dumps(processing_config or {}, sort_keys=True)
+            # Include processing parameters and the pipeline version, so a
+            # config change or an engine upgrade never serves stale results
+            config_str = json.dumps(
+                {'config': processing_config or {}, 'engine_version': engine_version},
+                sort_keys=True,
+                default=str
+            )
             
             key_parts = [
                 "ocr",
                 document_type,
                 language,
                 content_hash,
-                hashlib.md5(config_str.encode()).hexdigest()[:8]
+                hashlib.blake2b(config_str.encode(), digest_size=8).hexdigest()
             ]
             
             return ":".join(key_parts)
@@ -135,37 +445,24 @@ class CacheManager:
         except Exception as e:
             logger.warning(f"Cache key generation failed: {e}")
             # Fallback key
-            return f"ocr:{document_type}:{language}:{hashlib.md5(content).hexdigest()}"
+            return f"ocr:{document_type}:{language}:{content_hash}"
     
     async def _clean_memory_cache(self):
-        """Clean memory cache based on size limits"""
-        if not self.memory_cache:
-            return
-        
-        # Calculate current memory usage
-        current_size = sum(
-            len(pickle.dumps(value)) for value in self.memory_cache.values()
-        ) / (1024 * 1024)  # Convert to MB
+        """Drop expired entries and enforce the memory budget"""
+        expired = self.memory_cache.purge_expired()
+        evicted = self.memory_cache.resize(self.max_memory_mb * 1024 * 1024)
         
-        if current_size > self.max_memory_mb:
-            # Remove oldest items (simple LRU)
-            items_to_remove = int(len(self.memory_cache) * 0.2)  # Remove 20%
-            
-            # Sort by access time (simplified - remove arbitrary items)
-            keys_to_remove = list(self.memory_cache.keys())[:items_to_remove]
-            
-            for key in keys_to_remove:
-                del self.memory_cache[key]
-            
-            logger.info(f"Cleaned memory cache, removed {items_to_remove} items")
+        if expired or evicted:
+            logger.info(f"Cleaned memory cache, removed {expired} expired and {evicted} LRU items")
     
     async def get_stats(self) -> Dict[str, Any]:
         """Get cache statistics"""
         try:
             stats = {
-                'cache_type': 'redis' if self.redis_client else 'memory',
+                'cache_type': ('tiered' if self._use_l1 else 'redis') if self.redis_client else 'memory',
                 'memory_cache_size': len(self.memory_cache),
-                'max_memory_mb': self.max_memory_mb
+                'max_memory_mb': self.max_memory_mb,
+                'memory_cache': self.memory_cache.stats()
             }
             
             if self.redis_client:
@@ -222,9 +519,20 @@ class CacheManager:
                 'message': f'Cache manager error: {e}'
             }
     
+    async def is_ready(self) -> bool:
+        """Whether the cache has been initialized (readiness probe)"""
+        return self.is_initialized
+    
     async def close(self):
         """Close cache connections"""
         try:
+            if self._invalidation_task is not None:
+                self._invalidation_task.cancel()
+                await asyncio.gather(self._invalidation_task, return_exceptions=True)
+                self._invalidation_task = None
+            if self._pubsub is not None:
+                await self._pubsub.unsubscribe(self.invalidation_channel)
+                self._pubsub = None
             if self.redis_client:
                 await self.redis_client.close()
         except Exception as e:
@@ -0,0 +1,215 @@
+"""
+Versioned serialization codecs for cached values
+"""
+import json
+import pickle
+import zlib
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from loguru import logger
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Frame layout: MAGIC (2 bytes) | FORMAT_VERSION | serializer id | compression id | payload
+MAGIC = b"OC"
+FORMAT_VERSION = 1
+HEADER_SIZE = len(MAGIC) + 3
+
+SERIALIZERS: Dict[str, int] = {"pickle": 1, "json": 2, "orjson": 3, "msgpack": 4}
+COMPRESSIONS: Dict[str, int] = {"none": 0, "zlib": 1, "zstd": 2}
+
+
+def _pickle_dumps(value: Any) -> bytes:
+    return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _orjson_dumps(value: Any) -> bytes:
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+def _json_dumps(value: Any) -> bytes:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def _msgpack_dumps(value: Any) -> bytes:
+    return msgpack.packb(value, use_bin_type=True, default=str)
+
+
+def _msgpack_loads(data: bytes) -> Any:
+    return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+
+def _serializer_functions(name: str) -> Tuple[Callable[[Any], bytes], Callable[[bytes], Any]]:
+    if name == "pickle":
+        return _pickle_dumps, pickle.loads
+    if name == "json":
+        return _json_dumps, json.loads
+    if name == "orjson":
+        if orjson is None:
+            raise ImportError("orjson package is not installed")
+        return _orjson_dumps, orjson.loads
+    if name == "msgpack":
+        if msgpack is None:
+            raise ImportError("msgpack package is not installed")
+        return _msgpack_dumps, _msgpack_loads
+    raise ValueError(f"Unknown serializer: {name}")
+
+
+def _compress(name: str, data: bytes, level: int) -> bytes:
+    if name == "zlib":
+        return zlib.compress(data, level)
+    if name == "zstd":
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    return data
+
+
+def _decompress(name: str, data: bytes) -> bytes:
+    if name == "zlib":
+        return zlib.decompress(data)
+    if name == "zstd":
+        if zstandard is None:
+            raise ImportError("zstandard package is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return data
+
+
+class Codec:
+    """
+    Serializer plus optional compression, framed with a version header
+
+    Unavailable optional backends fall back to stdlib equivalents
+    (orjson/msgpack -> json, zstd -> zlib), so a codec can always be built.
+    Payloads smaller than ``min_compress_bytes`` are stored uncompressed.
+    Values the serializer cannot represent (e.g. ``Decimal`` or tuple
+    subclasses under orjson) are pickled instead; the frame header records
+    which serializer wrote each value.
+    """
+
+    def __init__(
+        self,
+        serializer: str = "orjson",
+        compression: str = "zstd",
+        level: int = 3,
+        min_compress_bytes: int = 1024
+    ):
+        if serializer not in SERIALIZERS:
+            raise ValueError(f"Unknown serializer: {serializer}")
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown compression: {compression}")
+
+        if (serializer == "orjson" and orjson is None) or (serializer == "msgpack" and msgpack is None):
+            logger.debug(f"{serializer} not installed, falling back to json")
+            serializer = "json"
+        if compression == "zstd" and zstandard is None:
+            logger.debug("zstandard not installed, falling back to zlib")
+            compression = "zlib"
+            level = min(level, 9)
+
+        self.serializer = serializer
+        self.compression = compression
+        self.level = level
+        self.min_compress_bytes = min_compress_bytes
+        self._dumps, _ = _serializer_functions(serializer)
+
+    @property
+    def name(self) -> str:
+        return f"{self.serializer}+{self.compression}"
+
+    def encode(self, value: Any) -> bytes:
+        serializer = self.serializer
+        try:
+            payload = self._dumps(value)
+        except TypeError as e:
+            if serializer == "pickle":
+                raise
+            logger.debug(f"{serializer} cannot encode value ({e}), falling back to pickle")
+            serializer = "pickle"
+            payload = _pickle_dumps(value)
+
+        compression = self.compression
+        if compression != "none" and len(payload) >= self.min_compress_bytes:
+            payload = _compress(compression, payload, self.level)
+        else:
+            compression = "none"
+
+        header = MAGIC + bytes((FORMAT_VERSION, SERIALIZERS[serializer], COMPRESSIONS[compression]))
+        return header + payload
+
+    def decode(self, data: bytes) -> Any:
+        return decode(data)
+
+    def __repr__(self) -> str:
+        return f"Codec({self.name})"
+
+
+_SERIALIZER_NAMES = {code: name for name, code in SERIALIZERS.items()}
+_COMPRESSION_NAMES = {code: name for name, code in COMPRESSIONS.items()}
+
+
+def decode(data: bytes) -> Any:
+    """
+    Decode any framed payload, whichever codec produced it
+
+    Un-framed data is treated as a legacy raw pickle written before codecs
+    were introduced.
+    """
+    if not data.startswith(MAGIC) or len(data) < HEADER_SIZE:
+        return pickle.loads(data)
+
+    version, serializer_id, compression_id = data[len(MAGIC):HEADER_SIZE]
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported cache frame version: {version}")
+
+    payload = _decompress(_COMPRESSION_NAMES[compression_id], data[HEADER_SIZE:])
+    _, loads = _serializer_functions(_SERIALIZER_NAMES[serializer_id])
+    return loads(payload)
+
+
+class CodecRegistry:
+    """Selects a codec by key namespace (the key prefix before the first ':')"""
+
+    def __init__(self, default: Optional[Codec] = None, namespaces: Optional[Dict[str, Codec]] = None):
+        self.default = default or Codec("pickle", "none")
+        self.namespaces = dict(namespaces or {})
+
+    def register(self, namespace: str, codec: Codec):
+        self.namespaces[namespace] = codec
+
+    def for_key(self, key: str) -> Codec:
+        namespace, _, _ = key.partition(":")
+        return self.namespaces.get(namespace, self.default)
+
+    def encode(self, key: str, value: Any) -> bytes:
+        return self.for_key(key).encode(value)
+
+    def decode(self, data: bytes) -> Any:
+        return decode(data)
+
+
+def default_registry() -> CodecRegistry:
+    """
+    Codecs used by CacheManager unless configured otherwise
+
+    OCR results are JSON-shaped and compress well; intermediate stage
+    outputs (page arrays, OCR blocks) are pickled with fast compression;
+    other values keep plain pickle so arbitrary Python objects remain
+    cacheable.
+    """
+    return CodecRegistry(
+        default=Codec("pickle", "none"),
+        namespaces={
+            "ocr": Codec("orjson", "zstd"),
+            "stage": Codec("pickle", "zstd", level=1),
+        }
+    )
@@ -0,0 +1,137 @@
+"""
+Per-page VLM prompt context under a provider token budget
+"""
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from .rate_limiter import estimate_tokens, limit_from_env
+
+# Context tokens per request, on top of the system prompt and the page
+# image; override per provider with <PROVIDER>_CONTEXT_TOKENS
+DEFAULT_CONTEXT_BUDGETS: Dict[str, int] = {
+    "deepseek": 6000,
+    "grok": 6000,
+    "openai": 6000,
+    "anthropic": 4000,
+    "google": 8000,
+    "dashscope": 4000,
+    "default": 3000,
+}
+
+# Sections of a document type's output schema (see OUTPUT_SCHEMA) and the
+# transcript wording that shows a page carries them
+SCHEMA_SECTIONS: Dict[str, Dict[str, Tuple[str, ...]]] = {
+    "building_title": {
+        "document_info": ("謄本", "列印時間", "檢查號", "地政事務所"),
+        "building_basic_info": ("建號", "門牌", "地號"),
+        "building_characteristics": ("標示部", "主要用途", "主要建材", "層數", "層次", "建築完成日期", "附屬建物"),
+        "shared_areas": ("共有部分",),
+        "ownership_info": ("所有權部", "所有權人", "權利範圍", "登記次序", "權狀字號"),
+        "notes": ("備註", "其他登記事項"),
+    },
+}
+
+
+@dataclass
+class PageContext:
+    """What the VLM is told about one page besides its image"""
+
+    page: int
+    total_pages: int
+    text: str
+    layout: Optional[Dict[str, Any]] = None
+
+    def fingerprint(self) -> str:
+        """Stable serialization for cache keys"""
+        return json.dumps(
+            [self.page, self.total_pages, self.text, self.layout],
+            ensure_ascii=False, sort_keys=True, separators=(",", ":")
+        )
+
+
+def page_text(text_blocks: List[Dict[str, Any]]) -> str:
+    """OCR words of one page, a text line per (block, line) of the recognizer"""
+    lines: List[List[str]] = []
+    current = None
+    for block in text_blocks:
+        text = str(block.get('text', '')).strip()
+        if not text:
+            continue
+        key = (block.get('block_num'), block.get('line_num'))
+        if key != current or key == (None, None):
+            lines.append([])
+            current = key
+        lines[-1].append(text)
+    return "\n".join(" ".join(words) for words in lines)
+
+
+class ContextBuilder:
+    """
+    Builds the per-page context text sent alongside each page image
+
+    Only the page's own OCR text, its layout summary and the schema
+    sections the page appears to contain are included. When the estimated
+    token count exceeds the provider budget, OCR text lines are dropped
+    from the end; the layout summary goes only if it alone does not fit.
+    """
+
+    def __init__(self, budgets: Optional[Dict[str, int]] = None):
+        self.budgets = dict(DEFAULT_CONTEXT_BUDGETS, **(budgets or {}))
+
+    def budget_for(self, provider: Optional[str]) -> int:
+        provider = provider or "default"
+        default = self.budgets.get(provider, self.budgets["default"])
+        return limit_from_env(provider, "context_tokens", default)
+
+    def schema_sections(self, document_type: str, text: str) -> List[str]:
+        """Schema sections whose wording appears on the page (all when none does)"""
+        sections = SCHEMA_SECTIONS.get(getattr(document_type, "value", document_type), {})
+        found = [name for name, keywords in sections.items() if any(keyword in text for keyword in keywords)]
+        return found or list(sections)
+
+    def build(
+        self,
+        context: PageContext,
+        document_type: str,
+        language: str,
+        provider: Optional[str] = None
+    ) -> str:
+        """Render ``context`` within the provider's token budget"""
+        budget = self.budget_for(provider)
+        document_type = getattr(document_type, "value", document_type)
+
+        header = [
+            f"Document Type: {document_type}",
+            f"Language: {language}",
+            f"Page: {context.page}/{context.total_pages}",
+        ]
+        sections = self.schema_sections(document_type, context.text)
+        if sections:
+            header.append(f"Schema Sections: {', '.join(sections)}")
+        layout = ""
+        if context.layout:
+            layout = f"Layout: {json.dumps(context.layout, ensure_ascii=False, separators=(',', ':'))}"
+
+        def render(lines: List[str], omitted: int, include_layout: bool) -> str:
+            parts = header + ([layout] if include_layout and layout else [])
+            parts += ["", "Extracted Text Content:"] + lines
+            if omitted:
+                parts.append(f"[{omitted} more lines omitted]")
+            return "\n".join(parts)
+
+        lines = context.text.splitlines()
+        for include_layout in (True, False):
+            fixed = estimate_tokens(render([], len(lines), include_layout))
+            if fixed > budget:
+                continue
+            # Per-line estimates round up, so the kept prefix never overshoots
+            kept, used = 0, fixed
+            for line in lines:
+                used += estimate_tokens(line) + 1
+                if used > budget:
+                    break
+                kept += 1
+            return render(lines[:kept], len(lines) - kept, include_layout)
+
+        return render([], len(lines), False)
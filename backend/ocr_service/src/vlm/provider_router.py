@@ -0,0 +1,220 @@
+"""
+Per-provider circuit breakers and health/cost-aware provider ordering
+"""
+import time
+from collections import deque
+from enum import Enum
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+
+from loguru import logger
+
+# Relative input cost (USD per 1M tokens, vision-capable tier); cheaper
+# providers are preferred among equally healthy ones
+DEFAULT_PROVIDER_COSTS: Dict[str, float] = {
+    "deepseek": 0.27,
+    "dashscope": 0.8,
+    "google": 1.25,
+    "grok": 2.0,
+    "openai": 2.5,
+    "anthropic": 3.0,
+}
+DEFAULT_COST = 5.0
+
+
+class CircuitState(str, Enum):
+    """Circuit breaker states"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Rolling-window circuit breaker for one provider
+
+    The breaker opens when the failure rate over the last ``window_size``
+    calls reaches ``failure_threshold``; calls slower than
+    ``slow_call_ms`` count as failures. After ``open_seconds`` a limited
+    number of probe calls are let through (half-open): a success closes
+    the circuit, a failure re-opens it.
+    """
+
+    def __init__(
+        self,
+        provider: str,
+        failure_threshold: float = 0.5,
+        min_calls: int = 4,
+        window_size: int = 20,
+        open_seconds: float = 30.0,
+        slow_call_ms: Optional[float] = 60_000.0,
+        half_open_max_calls: int = 1
+    ):
+        self.provider = provider
+        self.failure_threshold = failure_threshold
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.slow_call_ms = slow_call_ms
+        self.half_open_max_calls = half_open_max_calls
+
+        self.state = CircuitState.CLOSED
+        self._outcomes: Deque[Tuple[bool, float]] = deque(maxlen=window_size)
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+
+    @property
+    def failure_rate(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return sum(1 for ok, _ in self._outcomes if not ok) / len(self._outcomes)
+
+    @property
+    def success_rate(self) -> float:
+        """Smoothed success rate; an unused provider starts optimistic"""
+        successes = sum(1 for ok, _ in self._outcomes if ok)
+        return (successes + 1) / (len(self._outcomes) + 1)
+
+    @property
+    def mean_latency_ms(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return sum(latency for _, latency in self._outcomes) / len(self._outcomes)
+
+    def _refresh(self):
+        if self.state == CircuitState.OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self.state = CircuitState.HALF_OPEN
+            self._half_open_calls = 0
+
+    def is_available(self) -> bool:
+        """Whether a call could be attempted now (no side effects)"""
+        self._refresh()
+        if self.state == CircuitState.CLOSED:
+            return True
+        if self.state == CircuitState.HALF_OPEN:
+            return self._half_open_calls < self.half_open_max_calls
+        return False
+
+    def allow_request(self) -> bool:
+        """Admit a call, reserving a probe slot when half-open"""
+        if not self.is_available():
+            return False
+        if self.state == CircuitState.HALF_OPEN:
+            self._half_open_calls += 1
+        return True
+
+    def record_success(self, latency_ms: float = 0.0):
+        if self.slow_call_ms is not None and latency_ms > self.slow_call_ms:
+            self.record_failure(latency_ms)
+            return
+
+        if self.state == CircuitState.HALF_OPEN:
+            logger.info(f"Circuit for {self.provider} closed after successful probe")
+            self.state = CircuitState.CLOSED
+            self._outcomes.clear()
+        self._outcomes.append((True, latency_ms))
+
+    def record_failure(self, latency_ms: float = 0.0):
+        self._outcomes.append((False, latency_ms))
+
+        if self.state == CircuitState.HALF_OPEN:
+            self._open()
+        elif (
+            self.state == CircuitState.CLOSED
+            and len(self._outcomes) >= self.min_calls
+            and self.failure_rate >= self.failure_threshold
+        ):
+            self._open()
+
+    def record_cancelled(self):
+        """Release a probe slot for a call abandoned without an outcome"""
+        if self.state == CircuitState.HALF_OPEN and self._half_open_calls > 0:
+            self._half_open_calls -= 1
+
+    def _open(self):
+        logger.warning(
+            f"Circuit for {self.provider} opened "
+            f"(failure rate {self.failure_rate:.0%} over {len(self._outcomes)} calls)"
+        )
+        self.state = CircuitState.OPEN
+        self._opened_at = time.monotonic()
+        self._half_open_calls = 0
+
+
+class ProviderRouter:
+    """Orders providers by recent success rate, then cost, skipping open circuits"""
+
+    def __init__(
+        self,
+        costs: Optional[Dict[str, float]] = None,
+        success_rate_bucket: float = 0.1,
+        **breaker_options
+    ):
+        self.costs = costs if costs is not None else DEFAULT_PROVIDER_COSTS
+        self.success_rate_bucket = success_rate_bucket
+        self.breaker_options = breaker_options
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def breaker(self, provider: str) -> CircuitBreaker:
+        if provider not in self._breakers:
+            self._breakers[provider] = CircuitBreaker(provider, **self.breaker_options)
+        return self._breakers[provider]
+
+    def order(self, providers: Iterable[str]) -> List[str]:
+        """
+        Providers worth trying, best first
+
+        Success rates are bucketed so that cost decides between providers
+        of similar health; the given order breaks remaining ties.
+        """
+        candidates = []
+        for position, provider in enumerate(providers):
+            breaker = self.breaker(provider)
+            if not breaker.is_available():
+                logger.debug(f"Skipping {provider}: circuit {breaker.state.value}")
+                continue
+
+            bucket = int(breaker.success_rate / self.success_rate_bucket + 1e-9)
+            cost = self.costs.get(provider, DEFAULT_COST)
+            candidates.append(((-bucket, cost, position), provider))
+
+        return [provider for _, provider in sorted(candidates)]
+
+    def allow_request(self, provider: str) -> bool:
+        return self.breaker(provider).allow_request()
+
+    def record_success(self, provider: str, latency_ms: float = 0.0):
+        self.breaker(provider).record_success(latency_ms)
+
+    def record_failure(self, provider: str, latency_ms: float = 0.0):
+        self.breaker(provider).record_failure(latency_ms)
+
+    def record_cancelled(self, provider: str):
+        self.breaker(provider).record_cancelled()
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Breaker state per provider, for health reporting"""
+        return {
+            provider: {
+                "state": breaker.state.value,
+                "success_rate": round(breaker.success_rate, 3),
+                "mean_latency_ms": round(breaker.mean_latency_ms, 1),
+            }
+            for provider, breaker in self._breakers.items()
+        }
+
+
+_router: Optional[ProviderRouter] = None
+
+
+def get_provider_router() -> ProviderRouter:
+    """Process-wide router shared by the VLM engine and the engine manager"""
+    global _router
+    if _router is None:
+        _router = ProviderRouter()
+    return _router
+
+
+def reset_provider_router():
+    """Drop all breaker state"""
+    global _router
+    _router = None
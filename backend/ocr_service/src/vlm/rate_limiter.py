@@ -0,0 +1,140 @@
+"""
+Provider-level rate limiting for VLM API calls
+"""
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from loguru import logger
+
+# Conservative defaults; override per provider with <PROVIDER>_RPM,
+# <PROVIDER>_TPM and <PROVIDER>_MAX_CONCURRENCY environment variables
+DEFAULT_PROVIDER_LIMITS: Dict[str, Dict[str, int]] = {
+    "deepseek": {"rpm": 60, "tpm": 1_000_000, "max_concurrency": 8},
+    "grok": {"rpm": 60, "tpm": 500_000, "max_concurrency": 8},
+    "openai": {"rpm": 500, "tpm": 300_000, "max_concurrency": 16},
+    "anthropic": {"rpm": 50, "tpm": 80_000, "max_concurrency": 8},
+    "google": {"rpm": 60, "tpm": 1_000_000, "max_concurrency": 8},
+    "dashscope": {"rpm": 60, "tpm": 300_000, "max_concurrency": 8},
+    "default": {"rpm": 30, "tpm": 100_000, "max_concurrency": 4},
+}
+
+# Rough input-token cost of one page image across providers
+IMAGE_TOKEN_ESTIMATE = 1000
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Local token estimate without a provider tokenizer
+
+    CJK characters are counted as one token each, everything else at
+    roughly four characters per token.
+    """
+    if not text:
+        return 0
+
+    cjk = sum(1 for char in text if '\u3000' <= char <= '\u9fff' or '\uf900' <= char <= '\uffef')
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def estimate_request_tokens(messages: List[Dict[str, Any]]) -> int:
+    """Estimate input tokens for chat-style messages (text parts + images)"""
+    total = 0
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, str):
+            total += estimate_tokens(content)
+            continue
+
+        for part in content or []:
+            if part.get("type") == "text":
+                total += estimate_tokens(part.get("text", ""))
+            elif part.get("type") in ("image_url", "image"):
+                total += IMAGE_TOKEN_ESTIMATE
+    return total
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at ``rate_per_minute``"""
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate_per_second = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate_per_second)
+        self.updated_at = now
+
+    async def acquire(self, amount: float = 1):
+        """Wait until ``amount`` tokens are available and take them"""
+        # A single request larger than the bucket would otherwise wait forever
+        amount = min(amount, self.capacity)
+
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate_per_second)
+
+
+class ProviderRateLimiter:
+    """Concurrency cap plus request (RPM) and token (TPM) buckets for one provider"""
+
+    def __init__(self, provider: str, rpm: int, tpm: int, max_concurrency: int):
+        self.provider = provider
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._requests = TokenBucket(rpm)
+        self._tokens = TokenBucket(tpm)
+
+    @asynccontextmanager
+    async def limit(self, tokens: int = 0) -> AsyncIterator[None]:
+        """Hold a concurrency slot after paying for one request and ``tokens``"""
+        async with self._semaphore:
+            await self._requests.acquire(1)
+            if tokens:
+                await self._tokens.acquire(tokens)
+            yield
+
+
+_limiters: Dict[str, ProviderRateLimiter] = {}
+
+
+def limit_from_env(provider: str, name: str, default: int) -> int:
+    """Positive integer setting ``<PROVIDER>_<NAME>`` from the environment, else ``default``"""
+    value = os.getenv(f"{provider.upper()}_{name.upper()}")
+    if not value:
+        return default
+    try:
+        return max(1, int(value))
+    except ValueError:
+        logger.warning(f"Ignoring invalid {provider.upper()}_{name.upper()}={value!r}")
+        return default
+
+
+def get_provider_limiter(provider: str) -> ProviderRateLimiter:
+    """Shared limiter for ``provider``, built from defaults and env overrides"""
+    if provider not in _limiters:
+        defaults = DEFAULT_PROVIDER_LIMITS.get(provider, DEFAULT_PROVIDER_LIMITS["default"])
+        _limiters[provider] = ProviderRateLimiter(
+            provider,
+            rpm=limit_from_env(provider, "rpm", defaults["rpm"]),
+            tpm=limit_from_env(provider, "tpm", defaults["tpm"]),
+            max_concurrency=limit_from_env(provider, "max_concurrency", defaults["max_concurrency"]),
+        )
+    return _limiters[provider]
+
+
+def reset_provider_limiters():
+    """Drop cached limiters (e.g. after changing limits in the environment)"""
+    _limiters.clear()
@@ -2,18 +2,43 @@
 Vision Language Model engine for intelligent content understanding
 """
 import base64
+import hashlib
 import json
-from typing import Dict, Any, List, Optional
+import os
+from typing import Dict, Any, List, Optional, Union
 import asyncio
+import cv2
 from loguru import logger
-from tenacity import retry, stop_after_attempt, wait_exponential
+import time
 
-from ...ocr_engine.vlm import VLMEngine as BaseVLMEngine
+from ..core.stage_cache import StageCache, hash_bytes
+from ..ocr_engine.clients import close_client_registry
+from ..ocr_engine.vlm import DEFAULT_MODELS, VLMEngine as BaseVLMEngine, build_system_prompt
+from ..preprocessor.page_image import PageImage
+from ..utils.error_handler import VLMError
+from .context_builder import ContextBuilder, PageContext, page_text
+from .provider_router import get_provider_router
+from .rate_limiter import estimate_request_tokens, get_provider_limiter
 
 class VLMEngine(BaseVLMEngine):
-    def __init__(self):
-        super().__init__()
+    """
+    Multi-provider VLM engine used by the OCR pipeline
+
+    ``provider``/``model`` configure the engine's own client (used by
+    ``initialize``); page requests are routed across all providers, each
+    served by a per-provider engine from ``_create_engine``.
+    """
+    def __init__(self, provider: str = "deepseek", model: Optional[str] = None, api_key: Optional[str] = None):
+        super().__init__(provider, model or DEFAULT_MODELS[provider], api_key)
+        self._engines: Dict[str, BaseVLMEngine] = {}
         self.is_initialized = False
+        # Replaced by OCRProcessor with its shared stage cache
+        self.stage_cache = StageCache()
+        # Pages are OCR'd at up to 300+ DPI, but providers downscale large
+        # images anyway; uploads are capped separately
+        self.max_upload_dpi = int(os.getenv("VLM_MAX_UPLOAD_DPI", "150"))
+        self.max_upload_side = int(os.getenv("VLM_MAX_UPLOAD_SIDE", "2048"))
+        self.context_builder = ContextBuilder()
     
     async def initialize(self):
         """Initialize VLM engine with multiple providers"""
@@ -28,17 +53,21 @@ class VLMEngine(BaseVLMEngine):
         except Exception as e:
             logger.error(f"Failed to initialize VLM engine: {e}")
             raise
+
+    async def shutdown(self):
+        """Close pooled provider clients"""
+        for engine in self._engines.values():
+            await engine.close()
+        self._engines.clear()
+        await self.close()
+        await close_client_registry()
+        self.is_initialized = False
     
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=1, max=10),
-        reraise=True
-    )
     async def process(
         self,
-        images: List[bytes],
+        images: List[Union[PageImage, bytes]],
         text_results: List[Dict[str, Any]],
-        layout_analysis: Dict[str, Any],
+        layout_analysis: List[Dict[str, Any]],
         document_type: str = "building_title",
         language: str = "zh-TW",
         provider_priority: Optional[List[str]] = None
@@ -47,9 +76,9 @@ class VLMEngine(BaseVLMEngine):
         Process document with VLM for intelligent understanding
         
         Args:
-            images: List of preprocessed image bytes
+            images: Preprocessed pages (or encoded image bytes)
             text_results: OCR text recognition results
-            layout_analysis: Document layout analysis
+            layout_analysis: Per-page layout summaries
             document_type: Type of document being processed
             language: Document language
             provider_priority: Preferred VLM providers in order
@@ -58,21 +87,30 @@ class VLMEngine(BaseVLMEngine):
             Structured understanding of document content
         """
         try:
-            # Prepare context for VLM
-            context = self._prepare_context(
+            # Prepare per-page context for VLM
+            contexts = self._prepare_context(
                 text_results, layout_analysis, document_type, language
             )
             
-            # Process each image with VLM
-            vlm_results = []
-            for i, image_data in enumerate(images):
-                result = await self._process_image_with_vlm(
+            # Dispatch all pages concurrently; provider limiters bound the fan-out
+            tasks = [
+                asyncio.create_task(self._process_image_with_vlm(
                     image_data, context, document_type, language, provider_priority
-                )
-                vlm_results.append({
-                    'page': i + 1,
-                    'result': result
-                })
+                ))
+                for image_data, context in zip(images, contexts)
+            ]
+            try:
+                page_results = await asyncio.gather(*tasks)
+            except Exception:
+                for task in tasks:
+                    task.cancel()
+                raise
+            
+            # gather keeps input order, so pages merge in document order
+            vlm_results = [
+                {'page': i + 1, 'result': result}
+                for i, result in enumerate(page_results)
+            ]
             
             # Merge results from all pages
             final_result = self._merge_results(vlm_results, document_type)
@@ -87,77 +125,176 @@ class VLMEngine(BaseVLMEngine):
     def _prepare_context(
         self,
         text_results: List[Dict[str, Any]],
-        layout_analysis: Dict[str, Any],
+        layout_analysis: List[Dict[str, Any]],
         document_type: str,
         language: str
-    ) -> str:
-        """Prepare context information for VLM"""
-        # Extract key text content
-        all_text = []
-        for page_result in text_results:
-            for text_item in page_result.get('text_blocks', []):
-                if text_item.get('text'):
-                    all_text.append(text_item['text'])
-        
-        context = f"""
-Document Type: {document_type}
-Language: {language}
-Layout Analysis: {json.dumps(layout_analysis, ensure_ascii=False, indent=2)}
-
-Extracted Text Content:
-{"\n".join(all_text)}
-"""
+    ) -> List[PageContext]:
+        """
+        Per-page context inputs for VLM, in page order
         
-        return context.strip()
+        Each page only carries its own OCR text and layout summary; the
+        prompt text is rendered per provider by ``context_builder``.
+        """
+        layouts = {layout.get('page'): layout for layout in layout_analysis or []}
+        total = len(text_results)
+        contexts = []
+        for index, page_result in enumerate(text_results):
+            page = page_result.get('page', index + 1)
+            layout = layouts.get(page)
+            contexts.append(PageContext(
+                page=page,
+                total_pages=total,
+                text=page_text(page_result.get('text_blocks', [])),
+                layout={key: value for key, value in layout.items() if key != 'page'} if layout else None
+            ))
+        return contexts
     
     async def _process_image_with_vlm(
         self,
-        image_data: bytes,
-        context: str,
+        image_data: Union[PageImage, bytes],
+        context: PageContext,
         document_type: str,
         language: str,
         provider_priority: Optional[List[str]] = None
     ) -> Dict[str, Any]:
-        """Process single image with VLM"""
+        """Process single image with VLM, cached by page content and prompt"""
+        if not self.stage_cache.enabled:
+            return await self._call_vlm_for_page(
+                image_data, context, document_type, language, provider_priority
+            )
+        
+        if isinstance(image_data, PageImage):
+            content_hash = image_data.content_hash
+        else:
+            content_hash = hash_bytes(image_data)
+        # Keyed on the context inputs: the rendered text depends on which
+        # provider (and budget) ends up serving the page
+        system_prompt = self._system_prompt(context, document_type)
+        prompt = f"{system_prompt}\n{context.fingerprint()}".encode('utf-8')
+        params = {
+            'prompt': hashlib.blake2b(prompt, digest_size=16).hexdigest(),
+            'document_type': str(document_type),
+            'language': language,
+            'upload': [self.max_upload_dpi, self.max_upload_side]
+        }
+        return await self.stage_cache.get_or_compute(
+            'vlm', content_hash, params,
+            lambda: self._call_vlm_for_page(
+                image_data, context, document_type, language, provider_priority
+            )
+        )
+    
+    async def _call_vlm_for_page(
+        self,
+        image_data: Union[PageImage, bytes],
+        context: PageContext,
+        document_type: str,
+        language: str,
+        provider_priority: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """Send one page to the best available VLM provider"""
+        # Pages are only PNG-encoded here, when they leave the process
+        if isinstance(image_data, PageImage):
+            image_data = self._fit_for_upload(image_data).to_png()
+        
         # Convert image to base64 for VLM API
         base64_image = base64.b64encode(image_data).decode('utf-8')
         
-        # Prepare messages for VLM
-        messages = [
-            {
-                "role": "system",
-                "content": self.SYSTEM_PROMPT
-            },
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": f"Context: {context}\n\nPlease analyze this document image and extract structured information."
-                    },
-                    {
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:image/png;base64,{base64_image}"
+        system_prompt = self._system_prompt(context, document_type)
+        
+        def build_messages(provider: str) -> List[Dict[str, Any]]:
+            prompt_context = self.context_builder.build(context, document_type, language, provider)
+            return [
+                {
+                    "role": "system",
+                    "content": system_prompt
+                },
+                {
+                    "role": "user",
+                    "content": [
+                        {
+                            "type": "text",
+                            "text": f"Context: {prompt_context}\n\nPlease analyze this document image and extract structured information."
+                        },
+                        {
+                            "type": "image_url",
+                            "image_url": {
+                                "url": f"data:image/png;base64,{base64_image}"
+                            }
                         }
-                    }
-                ]
-            }
-        ]
+                    ]
+                }
+            ]
         
-        # Try providers in priority order
+        # Try healthy providers once each, best first; failing providers are
+        # skipped by their circuit breaker instead of being retried
         providers = provider_priority or ["deepseek", "grok", "openai", "anthropic", "google"]
+        router = get_provider_router()
         
-        for provider in providers:
+        for provider in router.order(providers):
+            # Providers without credentials are not candidates
+            if not self._create_engine(provider).api_key:
+                continue
+            # Checked before the limiter so open circuits spend no RPM/TPM budget
+            if not router.allow_request(provider):
+                continue
+            # The context is fitted to each provider's token budget
+            messages = build_messages(provider)
+            request_tokens = estimate_request_tokens(messages)
+            start_time = time.monotonic()
             try:
-                result = await self._call_vlm_provider(provider, messages, document_type)
-                if result:
-                    return result
+                async with get_provider_limiter(provider).limit(request_tokens):
+                    start_time = time.monotonic()
+                    result = await self._call_vlm_provider(provider, messages, document_type)
+            except asyncio.CancelledError:
+                # Also releases a half-open probe reserved before the limiter wait
+                router.record_cancelled(provider)
+                raise
             except Exception as e:
+                router.record_failure(provider, (time.monotonic() - start_time) * 1000)
                 logger.warning(f"VLM provider {provider} failed: {e}")
                 continue
+            
+            latency_ms = (time.monotonic() - start_time) * 1000
+            if result:
+                router.record_success(provider, latency_ms)
+                return result
+            router.record_failure(provider, latency_ms)
         
-        raise Exception("All VLM providers failed")
+        raise VLMError("All VLM providers failed", details={'providers': providers})
+    
+    def _system_prompt(self, context: PageContext, document_type: str) -> str:
+        """System prompt carrying only the schema sections the page appears to contain"""
+        return build_system_prompt(self.context_builder.schema_sections(document_type, context.text))
+    
+    def _fit_for_upload(self, page: PageImage) -> PageImage:
+        """Downscale a page to the VLM upload DPI / size caps"""
+        height, width = page.shape[:2]
+        scale = self.max_upload_side / max(height, width)
+        dpi = page.metadata.get('dpi')
+        if dpi:
+            scale = min(scale, self.max_upload_dpi / dpi)
+        if scale >= 1:
+            return page
+        
+        resized = cv2.resize(
+            page.array,
+            (max(1, round(width * scale)), max(1, round(height * scale))),
+            interpolation=cv2.INTER_AREA
+        )
+        upload = page.with_array(resized)
+        if dpi:
+            upload.metadata['dpi'] = round(dpi * scale)
+        return upload
+    
+    def _create_engine(self, provider: str, model: str = "auto") -> BaseVLMEngine:
+        """Per-provider engine, created once and reused (its client is pooled)"""
+        if model == "auto":
+            model = DEFAULT_MODELS.get(provider, model)
+        key = f"{provider}:{model}"
+        if key not in self._engines:
+            self._engines[key] = BaseVLMEngine(provider, model)
+        return self._engines[key]
     
     async def _call_vlm_provider(
         self,
@@ -171,7 +308,7 @@ Extracted Text Content:
             engine = self._create_engine(provider, "auto")
             
             # Call VLM API
-            response = await engine.process(messages)
+            response = await engine.complete(messages)
             
             # Parse response
             if isinstance(response, str):
@@ -290,7 +427,7 @@ Extracted Text Content:
                     continue
                 
                 # Try a simple call
-                await engine.process(test_messages, timeout=5.0)
+                await engine.complete(test_messages, timeout=5.0, json_output=False)
                 service_status[provider] = {"status": "healthy", "message": "Service responding"}
                 
             except Exception as e:
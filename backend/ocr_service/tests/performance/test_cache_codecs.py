@@ -0,0 +1,98 @@
+"""
+Size and speed benchmarks for cache codecs on real transcript results
+"""
+import copy
+import json
+import pickle
+import statistics
+import time
+from pathlib import Path
+
+import pytest
+
+from src.utils.codecs import Codec, decode
+
+RESULT_PATH = (
+    Path(__file__).parent.parent.parent
+    / "data" / "output" / "102AF022944REG02E9EC68747504C53A80B70B286C68179_result.json"
+)
+
+CODECS = [
+    ("pickle", "none"),
+    ("json", "none"),
+    ("json", "zlib"),
+    ("orjson", "none"),
+    ("orjson", "zstd"),
+    ("msgpack", "zstd"),
+]
+
+
+@pytest.fixture(scope="module")
+def transcript_result():
+    if not RESULT_PATH.exists():
+        pytest.skip("Sample transcript result not found")
+    with open(RESULT_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.fixture(scope="module")
+def pipeline_result(transcript_result):
+    """Full cached pipeline output: VLM result plus OCR text and layout payloads"""
+    text_blocks = [
+        {
+            "text": value if isinstance(value, str) else str(value),
+            "bbox": [40 + i % 7 * 120, 60 + i * 18, 110, 16],
+            "confidence": 0.91,
+            "block_num": i // 10,
+            "line_num": i % 10,
+        }
+        for i, value in enumerate(json.dumps(transcript_result, ensure_ascii=False).split(",") * 4)
+    ]
+    return {
+        "vlm_analysis": copy.deepcopy(transcript_result),
+        "text_results": [{"page": 1, "text_blocks": text_blocks}],
+        "layout_analysis": {
+            "lines": {
+                "horizontal": [[0, y, 2480, y] for y in range(100, 3400, 12)],
+                "vertical": [[x, 0, x, 3508] for x in range(80, 2400, 40)],
+            },
+            "contours": [[[x, y], [x + 30, y], [x + 30, y + 20]] for x in range(0, 2400, 60) for y in range(0, 3400, 200)],
+        },
+    }
+
+
+def _measure(codec: Codec, value, rounds: int = 50):
+    encoded = codec.encode(value)
+    encode_times, decode_times = [], []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        codec.encode(value)
+        encode_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        decode(encoded)
+        decode_times.append(time.perf_counter() - start)
+
+    return len(encoded), statistics.median(encode_times) * 1000, statistics.median(decode_times) * 1000
+
+
+@pytest.mark.performance
+@pytest.mark.parametrize("fixture_name", ["transcript_result", "pipeline_result"])
+def test_codec_size_and_speed(request, fixture_name):
+    """Compare encoded size and encode/decode time per codec"""
+    value = request.getfixturevalue(fixture_name)
+    baseline = len(pickle.dumps(value))
+
+    print(f"\n{fixture_name} (pickle baseline {baseline} bytes)")
+    sizes = {}
+    for serializer, compression in CODECS:
+        codec = Codec(serializer, compression)
+        size, encode_ms, decode_ms = _measure(codec, value)
+        sizes[codec.name] = size
+        print(f"  {codec.name:<14} {size:>9} B  {size / baseline:6.1%}  "
+              f"encode {encode_ms:7.3f} ms  decode {decode_ms:7.3f} ms")
+
+        assert decode(codec.encode(value)) == json.loads(json.dumps(value))
+
+    # The compressed OCR namespace codec must beat raw pickle on size
+    assert sizes[Codec("orjson", "zstd").name] < baseline
@@ -0,0 +1,115 @@
+"""
+Speed and accuracy benchmarks for ImagePreprocessor profiles
+"""
+import statistics
+import time
+from difflib import SequenceMatcher
+
+import cv2
+import fitz
+import numpy as np
+import pytest
+
+from src.preprocessor.image_preprocessor import PROFILES, ImagePreprocessor
+from src.preprocessor.pdf_preprocessor import pixmap_to_page
+
+LINE = "建物登記第二類謄本 所有權部 登記次序 0001 權利範圍 全部 1分之1"
+DPI = 300
+
+
+@pytest.fixture(scope="module")
+def clean_page():
+    """A4 transcript-like page rendered at 300 DPI"""
+    doc = fitz.open()
+    page = doc.new_page()
+    for i in range(30):
+        page.insert_text((40, 60 + i * 24), LINE, fontsize=11, fontname="china-t")
+    zoom = DPI / 72
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csGRAY, alpha=False)
+    array = pixmap_to_page(pix).array.copy()
+    doc.close()
+    return array
+
+
+@pytest.fixture(scope="module")
+def scanned_page(clean_page):
+    """The same page as a mediocre scan: soft, low contrast, shaded, noisy"""
+    rng = np.random.default_rng(0)
+    shade = np.linspace(1.0, 0.8, clean_page.shape[1], dtype=np.float32)[None, :]
+    page = cv2.GaussianBlur(clean_page, (0, 0), 1.0).astype(np.float32) * 0.55 + 60
+    page = page * shade + rng.normal(0, 12, page.shape)
+    return np.clip(page, 0, 255).astype(np.uint8)
+
+
+def _ink(image: np.ndarray) -> np.ndarray:
+    _, binary = cv2.threshold(image, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+    return binary > 0
+
+
+def _ink_f1(image: np.ndarray, reference: np.ndarray) -> float:
+    """Agreement of globally binarized ink (what Tesseract thresholds) with the clean render"""
+    ink, expected = _ink(image), _ink(reference)
+    overlap = np.count_nonzero(ink & expected)
+    return 2 * overlap / (np.count_nonzero(ink) + np.count_nonzero(expected))
+
+
+def _ocr_accuracy(image: np.ndarray):
+    """Character accuracy against the known text, when Tesseract is installed"""
+    try:
+        import pytesseract
+        text = pytesseract.image_to_string(image, lang="chi_tra", config="--psm 6")
+    except Exception:
+        return None
+    expected = "".join(LINE.split()) * 30
+    return SequenceMatcher(None, "".join(text.split()), expected).ratio()
+
+
+@pytest.mark.performance
+def test_profile_speed_and_accuracy(clean_page, scanned_page):
+    """Compare milliseconds per page and output quality per profile"""
+    preprocessor = ImagePreprocessor()
+    timings = {}
+
+    print(f"\nscanned page {scanned_page.shape[1]}x{scanned_page.shape[0]} @ {DPI} DPI, "
+          f"unprocessed ink F1 {_ink_f1(scanned_page, clean_page):.3f}")
+    for name, profile in PROFILES.items():
+        times = []
+        for _ in range(3):
+            start = time.perf_counter()
+            output = preprocessor._run_chain(scanned_page, profile)
+            times.append(time.perf_counter() - start)
+        timings[name] = statistics.median(times) * 1000
+
+        assert output.shape == scanned_page.shape
+        assert output.dtype == np.uint8
+
+        ocr = _ocr_accuracy(output)
+        ocr_text = f"  OCR accuracy {ocr:.3f}" if ocr is not None else ""
+        print(f"  {name:<9} {timings[name]:8.1f} ms/page  ink F1 {_ink_f1(output, clean_page):.3f}{ocr_text}")
+
+    # The bilateral d=9 chain is what the cheaper profiles replace
+    assert timings["balanced"] < timings["legacy"]
+    assert timings["fast"] < timings["balanced"]
+
+
+@pytest.mark.performance
+def test_quality_gate_on_clean_render(clean_page):
+    """Assessing a clean render and skipping its passes beats running the chain"""
+    preprocessor = ImagePreprocessor()
+    profile = PROFILES["balanced"]
+    stages = ImagePreprocessor.STAGES
+
+    def median_ms(gate: bool):
+        times = []
+        for _ in range(3):
+            start = time.perf_counter()
+            _, operations, _ = preprocessor._preprocess_array(clean_page, profile, stages, None, gate)
+            times.append(time.perf_counter() - start)
+        return statistics.median(times) * 1000, operations
+
+    gated, operations = median_ms(True)
+    ungated, _ = median_ms(False)
+    print(f"\nclean render: gated {gated:.1f} ms/page ({list(operations)}), ungated {ungated:.1f} ms/page")
+
+    assert operations == ()
+    assert gated < ungated
@@ -0,0 +1,54 @@
+"""
+Speed benchmark for ruled table reconstruction on a dense transcript page
+"""
+import statistics
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+from src.layout.line_extractor import extract_lines
+from src.layout.table_detector import TableDetector
+
+ROWS, COLUMNS = 50, 6
+
+
+@pytest.fixture(scope="module")
+def dense_page():
+    """A4 at 300 DPI with a 50x6 ruled grid and two words per cell"""
+    page = np.full((3508, 2480), 255, dtype=np.uint8)
+    ys = np.linspace(200, 3300, ROWS + 1).astype(int)
+    xs = np.linspace(120, 2360, COLUMNS + 1).astype(int)
+    for y in ys:
+        cv2.line(page, (int(xs[0]), int(y)), (int(xs[-1]), int(y)), 0, 3)
+    for x in xs:
+        cv2.line(page, (int(x), int(ys[0])), (int(x), int(ys[-1])), 0, 3)
+
+    words = []
+    for top in ys[:-1]:
+        for left in xs[:-1]:
+            for offset, text in ((20, "0001"), (160, "全部")):
+                cv2.putText(page, text, (int(left) + offset, int(top) + 45), cv2.FONT_HERSHEY_SIMPLEX, 1.2, 0, 2)
+                words.append({'text': text, 'bbox': [int(left) + offset, int(top) + 15, 120, 35]})
+    return page, words
+
+
+@pytest.mark.performance
+def test_dense_table_speed(dense_page):
+    """Milliseconds per page for line extraction plus grid reconstruction"""
+    page, words = dense_page
+    detector = TableDetector()
+
+    times = []
+    for _ in range(3):
+        start = time.perf_counter()
+        tables = detector.detect_array(page, words, extract_lines(page))
+        times.append(time.perf_counter() - start)
+    elapsed = statistics.median(times) * 1000
+
+    print(f"\n{ROWS}x{COLUMNS} table, {len(words)} words: {elapsed:.1f} ms/page")
+    assert len(tables) == 1
+    assert (tables[0]['rows'], tables[0]['columns']) == (ROWS, COLUMNS)
+    assert tables[0]['data'][ROWS - 1][COLUMNS - 1] == "0001全部"
+    assert elapsed < detector.time_budget * 1000
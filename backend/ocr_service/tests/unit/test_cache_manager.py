@@ -3,8 +3,11 @@ Unit tests for CacheManager module
 """
 import pytest
 import asyncio
+import threading
+import numpy as np
 from unittest.mock import AsyncMock, patch, MagicMock
-from src.utils.cache_manager import CacheManager
+from src.preprocessor.page_image import PageImage
+from src.utils.cache_manager import CacheManager, estimate_size
 
 
 class TestCacheManager:
@@ -68,6 +71,50 @@ class TestCacheManager:
         assert set_result is True
         mock_client.set.assert_called_once()
     
+    @pytest.mark.asyncio
+    async def test_tiered_promotes_l2_hits(self, test_data):
+        """Test an L2 (Redis) hit is promoted into L1"""
+        import pickle
+        
+        cache_manager = CacheManager(tiered=True)
+        mock_client = AsyncMock()
+        mock_client.get = AsyncMock(return_value=pickle.dumps(test_data))
+        cache_manager.redis_client = mock_client
+        cache_manager.is_initialized = True
+        
+        assert await cache_manager.get("doc") == test_data
+        assert await cache_manager.get("doc") == test_data
+        
+        mock_client.get.assert_awaited_once_with("doc")
+        assert "doc" in cache_manager.memory_cache
+    
+    @pytest.mark.asyncio
+    async def test_tiered_write_through(self, test_data):
+        """Test writes land in both tiers and are broadcast"""
+        cache_manager = CacheManager(tiered=True, broadcast_invalidations=True)
+        mock_client = AsyncMock()
+        cache_manager.redis_client = mock_client
+        cache_manager.is_initialized = True
+        
+        assert await cache_manager.set("doc", test_data, ttl=60) is True
+        
+        mock_client.set.assert_awaited_once()
+        assert cache_manager.memory_cache.get("doc") == test_data
+        mock_client.publish.assert_awaited_once_with(
+            cache_manager.invalidation_channel, f"{cache_manager.instance_id}:doc"
+        )
+    
+    def test_invalidation_drops_l1_entry(self, test_data):
+        """Test invalidations from other processes evict L1, own ones are ignored"""
+        cache_manager = CacheManager(tiered=True, broadcast_invalidations=True)
+        cache_manager.memory_cache.set("ocr:doc", test_data, 100)
+        
+        cache_manager._handle_invalidation(f"{cache_manager.instance_id}:ocr:doc".encode())
+        assert "ocr:doc" in cache_manager.memory_cache
+        
+        cache_manager._handle_invalidation(b"other-worker:ocr:doc")
+        assert "ocr:doc" not in cache_manager.memory_cache
+    
     @pytest.mark.asyncio
     async def test_delete_memory_cache(self, cache_manager, test_data):
         """Test delete operation with memory cache"""
@@ -131,6 +178,41 @@ class TestCacheManager:
         assert key.startswith("ocr:building_title:zh-TW:")
         assert len(key) > 0
     
+    @pytest.mark.asyncio
+    async def test_generate_key_is_content_addressed(self, cache_manager):
+        """Test keys are stable for equal content and change with config/version"""
+        content = b"test content"
+        
+        key = await cache_manager.generate_key(content, "building_title", "zh-TW", {"pdf_dpi": 300}, "1.0")
+        same = await cache_manager.generate_key(bytes(content), "building_title", "zh-TW", {"pdf_dpi": 300}, "1.0")
+        other_config = await cache_manager.generate_key(content, "building_title", "zh-TW", {"pdf_dpi": 200}, "1.0")
+        other_version = await cache_manager.generate_key(content, "building_title", "zh-TW", {"pdf_dpi": 300}, "1.1")
+        
+        assert key == same
+        assert CacheManager.content_hash(content) in key
+        assert len({key, other_config, other_version}) == 3
+    
+    @pytest.mark.asyncio
+    async def test_get_or_compute_single_flight(self, cache_manager, test_data):
+        """Test concurrent misses for one key compute once and then hit the cache"""
+        cache_manager.redis_client = None
+        await cache_manager.initialize()
+        calls = 0
+        
+        async def compute():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return test_data
+        
+        results = await asyncio.gather(*(
+            cache_manager.get_or_compute("doc_key", compute) for _ in range(5)
+        ))
+        
+        assert calls == 1
+        assert all(value == test_data and not cached for value, cached in results)
+        assert await cache_manager.get_or_compute("doc_key", compute) == (test_data, True)
+    
     @pytest.mark.asyncio
     async def test_get_stats_memory_cache(self, cache_manager):
         """Test getting statistics for memory cache"""
@@ -228,19 +310,102 @@ class TestCacheManager:
     
     @pytest.mark.asyncio
     async def test_cache_expiration(self, cache_manager, test_data):
-        """Test cache expiration (simulated)"""
+        """Test memory cache honors the TTL"""
         cache_manager.redis_client = None
         await cache_manager.initialize()
         
         # Set data with very short TTL
         await cache_manager.set("temp_key", test_data, ttl=1)
+        assert await cache_manager.get("temp_key") == test_data
         
         # Wait for expiration
         await asyncio.sleep(1.1)
         
-        # Data should still be there (memory cache doesn't auto-expire)
         result = await cache_manager.get("temp_key")
-        assert result == test_data
+        assert result is None
+        assert cache_manager.memory_cache.expirations == 1
+    
+    @pytest.mark.asyncio
+    async def test_memory_cache_lru_eviction(self, cache_manager):
+        """Test least recently used entries are evicted first"""
+        cache_manager.redis_client = None
+        cache_manager.max_memory_mb = 1
+        await cache_manager.initialize()
+        
+        chunk = {"large": "x" * 300000}  # ~300KB
+        await cache_manager.set("a", chunk)
+        await cache_manager.set("b", chunk)
+        await cache_manager.set("c", chunk)
+        
+        # Touch "a" so "b" becomes least recently used
+        assert await cache_manager.get("a") == chunk
+        await cache_manager.set("d", chunk)
+        
+        assert "b" not in cache_manager.memory_cache
+        assert "a" in cache_manager.memory_cache
+        assert cache_manager.memory_cache.current_bytes <= 1024 * 1024
+        
+        stats = (await cache_manager.get_stats())["memory_cache"]
+        assert stats["evictions"] == 1
+        assert stats["hits"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_memory_cache_counts_hits_and_misses(self, cache_manager, test_data):
+        """Test hit/miss counters"""
+        cache_manager.redis_client = None
+        await cache_manager.initialize()
+        
+        await cache_manager.set("key", test_data)
+        await cache_manager.get("key")
+        await cache_manager.get("missing")
+        
+        stats = (await cache_manager.get_stats())["memory_cache"]
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == 0.5
+    
+    @pytest.mark.asyncio
+    async def test_memory_cache_sizes_live_objects_without_encoding(self, cache_manager):
+        """Test memory-only sets skip the codec and count array bytes"""
+        cache_manager.redis_client = None
+        cache_manager.is_initialized = True
+        cache_manager.codecs = MagicMock()
+        page = PageImage(np.random.randint(0, 255, (1000, 800), dtype=np.uint8))
+        
+        assert await cache_manager.set("page", page) is True
+        
+        cache_manager.codecs.encode.assert_not_called()
+        assert await cache_manager.get("page") is page
+        assert cache_manager.memory_cache.current_bytes == page.nbytes == 800000
+    
+    @pytest.mark.asyncio
+    async def test_redis_set_encodes_off_the_event_loop(self, cache_manager, test_data):
+        """Test values bound for Redis are encoded on a worker thread"""
+        threads = []
+        encode = cache_manager.codecs.encode
+        
+        def spy(key, value):
+            threads.append(threading.current_thread())
+            return encode(key, value)
+        
+        cache_manager.codecs.encode = spy
+        cache_manager.redis_client = AsyncMock()
+        cache_manager.is_initialized = True
+        
+        assert await cache_manager.set("doc", test_data) is True
+        
+        assert threads and threads[0] is not threading.main_thread()
+        cache_manager.redis_client.set.assert_awaited_once()
+    
+    def test_estimate_size(self):
+        """Test sizes follow buffers and scale with container length"""
+        array = np.zeros((100, 100), dtype=np.uint8)
+        blocks = [{'text': 'word', 'bbox': [1, 2, 3, 4], 'confidence': 0.9} for _ in range(1000)]
+        
+        assert estimate_size(array) == 10000
+        assert estimate_size({'page': array}) > 10000
+        assert estimate_size(blocks) > 1000 * estimate_size(blocks[0])
+        assert estimate_size("x" * 300000) >= 300000
 
 
 if __name__ == "__main__":
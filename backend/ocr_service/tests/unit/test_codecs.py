@@ -0,0 +1,99 @@
+"""
+Unit tests for cache serialization codecs
+"""
+import pickle
+from collections import namedtuple
+from decimal import Decimal
+
+import pytest
+
+from src.utils import codecs
+from src.utils.codecs import Codec, CodecRegistry, HEADER_SIZE, MAGIC, decode, default_registry
+
+Point = namedtuple("Point", "x y")
+
+
+@pytest.fixture
+def ocr_result():
+    return {
+        "register_office": "臺北市松山地政事務所",
+        "sections": {"basic": {"building_number": "02069-000建號", "area": 2029.25}},
+        "text_blocks": [{"text": "所有權人", "bbox": [10, 20, 30, 12], "confidence": 0.94}] * 50,
+    }
+
+
+class TestCodec:
+    @pytest.mark.parametrize("serializer", ["pickle", "json", "orjson", "msgpack"])
+    @pytest.mark.parametrize("compression", ["none", "zlib", "zstd"])
+    def test_round_trip(self, ocr_result, serializer, compression):
+        """Test every codec (or its fallback) round-trips a result"""
+        codec = Codec(serializer, compression, min_compress_bytes=0)
+
+        data = codec.encode(ocr_result)
+
+        assert data.startswith(MAGIC)
+        assert decode(data) == ocr_result
+
+    def test_small_payload_not_compressed(self):
+        """Test payloads under the threshold skip compression"""
+        codec = Codec("json", "zlib", min_compress_bytes=1024)
+
+        data = codec.encode({"a": 1})
+
+        assert data[HEADER_SIZE - 1] == codecs.COMPRESSIONS["none"]
+
+    def test_compression_shrinks_large_payload(self, ocr_result):
+        """Test compressed frames are smaller than pickle"""
+        compressed = Codec("orjson", "zstd").encode(ocr_result)
+
+        assert len(compressed) < len(pickle.dumps(ocr_result))
+
+    def test_missing_backend_falls_back(self, monkeypatch):
+        """Test optional backends fall back to stdlib equivalents"""
+        monkeypatch.setattr(codecs, "orjson", None)
+        monkeypatch.setattr(codecs, "zstandard", None)
+
+        codec = Codec("orjson", "zstd")
+
+        assert codec.name == "json+zlib"
+
+    def test_unsupported_values_fall_back_to_pickle(self, ocr_result):
+        """Test values orjson rejects are still cached, losslessly"""
+        value = dict(ocr_result, area=Decimal("2029.25"), origin=Point(1, 2))
+        codec = Codec("orjson", "zlib", min_compress_bytes=0)
+
+        data = codec.encode(value)
+
+        assert data[HEADER_SIZE - 2] == codecs.SERIALIZERS["pickle"]
+        assert data[HEADER_SIZE - 1] == codecs.COMPRESSIONS["zlib"]
+        assert decode(data) == value
+        assert codec.encode(ocr_result)[HEADER_SIZE - 2] == codecs.SERIALIZERS["orjson"]
+
+    def test_legacy_pickle_decodes(self):
+        """Test values written before framing are still readable"""
+        assert decode(pickle.dumps({"legacy": True})) == {"legacy": True}
+
+    def test_unknown_version_rejected(self):
+        """Test frames from a newer format version are refused"""
+        data = bytearray(Codec("json", "none").encode({"a": 1}))
+        data[len(MAGIC)] = 99
+
+        with pytest.raises(ValueError):
+            decode(bytes(data))
+
+
+class TestCodecRegistry:
+    def test_namespace_selection(self):
+        """Test codecs are chosen by key prefix"""
+        json_codec = Codec("json", "zlib")
+        registry = CodecRegistry(default=Codec("pickle", "none"), namespaces={"ocr": json_codec})
+
+        assert registry.for_key("ocr:building_title:zh-TW:abc") is json_codec
+        assert registry.for_key("health_check") is registry.default
+
+    def test_default_registry(self):
+        """Test OCR results use a compact codec, other keys keep pickle"""
+        registry = default_registry()
+
+        assert registry.for_key("ocr:x").serializer in ("orjson", "json")
+        assert registry.for_key("other").serializer == "pickle"
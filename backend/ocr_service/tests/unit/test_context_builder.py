@@ -0,0 +1,94 @@
+"""
+Unit tests for the VLM context builder
+"""
+import pytest
+
+from src.models.schemas import DocumentType
+from src.vlm.context_builder import ContextBuilder, PageContext, page_text
+from src.vlm.rate_limiter import estimate_tokens
+
+LAYOUT = {
+    'document_type': 'form',
+    'ruled_lines': {'horizontal': 12, 'vertical': 4},
+    'sections': {'main_content': 6},
+    'text_regions': 40,
+    'confidence': 0.8
+}
+
+
+class TestContextBuilder:
+    @pytest.fixture
+    def builder(self):
+        return ContextBuilder(budgets={'deepseek': 6000, 'anthropic': 200})
+    
+    def test_page_text_groups_lines(self):
+        """Test words on one recognizer line share a text line"""
+        blocks = [
+            {'text': '所有權部', 'block_num': 1, 'line_num': 1},
+            {'text': '0001', 'block_num': 1, 'line_num': 1},
+            {'text': ' ', 'block_num': 1, 'line_num': 1},
+            {'text': '權利範圍', 'block_num': 1, 'line_num': 2},
+        ]
+        
+        assert page_text(blocks) == "所有權部 0001\n權利範圍"
+    
+    def test_build_compact_context(self, builder):
+        """Test the page's own text, layout digest and schema sections are rendered"""
+        context = PageContext(page=2, total_pages=3, text="所有權部\n權利範圍 全部", layout=LAYOUT)
+        
+        text = builder.build(context, DocumentType.BUILDING_TITLE, 'zh-TW', 'deepseek')
+        
+        assert "Document Type: building_title" in text
+        assert "Page: 2/3" in text
+        assert "Schema Sections: ownership_info" in text
+        assert 'Layout: {"document_type":"form"' in text
+        assert text.endswith("所有權部\n權利範圍 全部")
+    
+    def test_schema_sections_default_to_all(self, builder):
+        """Test pages without recognizable wording keep the whole schema"""
+        sections = builder.schema_sections('building_title', 'illegible')
+        
+        assert 'document_info' in sections and 'ownership_info' in sections
+        assert builder.schema_sections('generic', '所有權部') == []
+    
+    def test_budget_truncates_text(self, builder):
+        """Test OCR text is cut to the provider budget with an omission note"""
+        lines = [f"登記次序 {i:04d} 所有權人 王大明 權利範圍 全部" for i in range(100)]
+        context = PageContext(page=1, total_pages=1, text="\n".join(lines), layout=LAYOUT)
+        
+        text = builder.build(context, 'building_title', 'zh-TW', 'anthropic')
+        
+        assert estimate_tokens(text) <= 200
+        assert lines[0] in text
+        assert lines[-1] not in text
+        assert "more lines omitted]" in text
+        assert "Layout:" in text
+    
+    def test_budget_drops_layout_last(self):
+        """Test the layout summary is dropped when it alone exceeds the budget"""
+        builder = ContextBuilder(budgets={'default': 40})
+        context = PageContext(page=1, total_pages=1, text="全部", layout=LAYOUT)
+        
+        text = builder.build(context, 'generic', 'zh-TW')
+        
+        assert "Layout:" not in text
+        assert estimate_tokens(text) <= 40
+    
+    def test_budget_env_override(self, builder, monkeypatch):
+        """Test <PROVIDER>_CONTEXT_TOKENS overrides the default budget"""
+        monkeypatch.setenv('DEEPSEEK_CONTEXT_TOKENS', '1234')
+        
+        assert builder.budget_for('deepseek') == 1234
+        assert builder.budget_for('unknown') == builder.budgets['default']
+    
+    def test_fingerprint_is_stable(self):
+        """Test equal contexts share a cache fingerprint regardless of key order"""
+        first = PageContext(1, 2, "text", {'a': 1, 'b': 2})
+        second = PageContext(1, 2, "text", {'b': 2, 'a': 1})
+        
+        assert first.fingerprint() == second.fingerprint()
+        assert first.fingerprint() != PageContext(2, 2, "text", {'a': 1, 'b': 2}).fingerprint()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,167 @@
+"""
+Unit tests for OCR engine failover and hedged requests
+"""
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from src.ocr_engine.base import OCREngine
+from src.ocr_engine.manager import OCREngineManager
+from src.vlm.provider_router import CircuitState, ProviderRouter
+
+
+class FakeEngine(OCREngine):
+    def __init__(self, name, delay=0.0, result=None, error=None):
+        self._name = name
+        self.delay = delay
+        self.result = result if result is not None else {"engine": name}
+        self.error = error
+        self.started = False
+        self.cancelled = False
+
+    @property
+    def name(self):
+        return self._name
+
+    async def process(self, image_path: Path):
+        self.started = True
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error:
+            raise self.error
+        return dict(self.result)
+
+
+def make_manager(engines, **kwargs):
+    kwargs.setdefault("router", ProviderRouter())
+    manager = OCREngineManager(**kwargs)
+    manager.engines = engines
+    return manager
+
+
+class TestOCREngineManager:
+    @pytest.mark.asyncio
+    async def test_failover_in_order(self):
+        """Test sequential failover to the next engine"""
+        primary = FakeEngine("primary", error=RuntimeError("boom"))
+        backup = FakeEngine("backup")
+        manager = make_manager([primary, backup])
+
+        result = await manager.process_document(Path("page.png"))
+
+        assert result["engine"] == "backup"
+        assert result["metadata"]["ocr_engine"] == "backup"
+
+    @pytest.mark.asyncio
+    async def test_all_engines_fail(self):
+        """Test error when every engine fails"""
+        manager = make_manager([FakeEngine("a", error=RuntimeError("x"))], hedge=True)
+
+        with pytest.raises(RuntimeError, match="All OCR engines failed"):
+            await manager.process_document(Path("page.png"))
+
+    @pytest.mark.asyncio
+    async def test_hedge_fires_after_delay_and_cancels_loser(self):
+        """Test slow primary is hedged and cancelled once the backup wins"""
+        primary = FakeEngine("primary", delay=1.0)
+        backup = FakeEngine("backup", delay=0.01)
+        manager = make_manager([primary, backup], hedge=True, default_hedge_delay=0.05)
+
+        result = await manager.process_document(Path("page.png"))
+        await asyncio.sleep(0)
+
+        assert result["engine"] == "backup"
+        assert primary.cancelled
+
+    @pytest.mark.asyncio
+    async def test_fast_primary_is_not_hedged(self):
+        """Test backup is never started when the primary answers in time"""
+        primary = FakeEngine("primary", delay=0.01)
+        backup = FakeEngine("backup")
+        manager = make_manager([primary, backup], hedge=True, default_hedge_delay=0.5)
+
+        result = await manager.process_document(Path("page.png"))
+
+        assert result["engine"] == "primary"
+        assert not backup.started
+
+    @pytest.mark.asyncio
+    async def test_failure_starts_next_engine_immediately(self):
+        """Test a failing primary hands over without waiting for the hedge delay"""
+        primary = FakeEngine("primary", error=RuntimeError("boom"))
+        backup = FakeEngine("backup")
+        manager = make_manager([primary, backup], hedge=True, default_hedge_delay=5.0)
+
+        result = await asyncio.wait_for(manager.process_document(Path("page.png")), timeout=1.0)
+
+        assert result["engine"] == "backup"
+
+    @pytest.mark.asyncio
+    async def test_hedge_delay_learned_from_metrics(self):
+        """Test p95 latency replaces the default once enough samples exist"""
+        engine = FakeEngine("primary")
+        manager = make_manager([engine], default_hedge_delay=9.0, min_latency_samples=3)
+
+        assert await manager._hedge_delay(engine) == 9.0
+
+        for latency_ms in (100, 200, 300):
+            await manager.metrics_collector.timing(
+                manager.LATENCY_METRIC, latency_ms, tags={"engine": "primary"}
+            )
+
+        assert 0.1 <= await manager._hedge_delay(engine) <= 0.3
+
+    @pytest.mark.asyncio
+    async def test_open_circuit_is_skipped(self):
+        """Test a provider with an open circuit is not called"""
+        router = ProviderRouter(min_calls=1)
+        primary = FakeEngine("primary", error=RuntimeError("down"))
+        backup = FakeEngine("backup")
+        manager = make_manager([primary, backup], router=router)
+
+        await manager.process_document(Path("page.png"))
+        assert router.breaker("primary").state == CircuitState.OPEN
+
+        primary.started = False
+        result = await manager.process_document(Path("page.png"))
+
+        assert result["engine"] == "backup"
+        assert not primary.started
+
+    @pytest.mark.asyncio
+    async def test_hedge_loser_does_not_count_as_failure(self):
+        """Test cancelling the hedged loser leaves its breaker untouched"""
+        router = ProviderRouter()
+        primary = FakeEngine("primary", delay=1.0)
+        backup = FakeEngine("backup", delay=0.01)
+        manager = make_manager([primary, backup], router=router, hedge=True, default_hedge_delay=0.05)
+
+        await manager.process_document(Path("page.png"))
+        await asyncio.sleep(0)
+
+        assert router.breaker("primary").failure_rate == 0.0
+        assert router.breaker("backup").success_rate == 1.0
+
+    @pytest.mark.asyncio
+    async def test_losers_and_failures_feed_latency(self):
+        """Test cancelled and failed attempts are recorded, not only winners"""
+        primary = FakeEngine("primary", delay=1.0)
+        backup = FakeEngine("backup", delay=0.01, error=RuntimeError("down"))
+        fallback = FakeEngine("fallback")
+        manager = make_manager(
+            [primary, backup, fallback], hedge=True, default_hedge_delay=0.05
+        )
+
+        await manager.process_document(Path("page.png"))
+        await asyncio.sleep(0)
+
+        for name, at_least in (("primary", 50), ("backup", 10)):
+            stats = await manager.metrics_collector.get_statistics(
+                manager.LATENCY_METRIC, tags={"engine": name}
+            )
+            assert stats["count"] == 1
+            assert stats["min"] >= at_least
@@ -1,10 +1,12 @@
 """
 Unit tests for ImagePreprocessor module
 """
+import cv2
 import pytest
 import numpy as np
 from unittest.mock import AsyncMock, patch
-from src.preprocessor.image_preprocessor import ImagePreprocessor
+from src.preprocessor.image_preprocessor import PROFILES, ImagePreprocessor, get_profile, stretch_lut
+from src.preprocessor.page_image import PageImage
 
 
 class TestImagePreprocessor:
@@ -47,6 +49,19 @@ class TestImagePreprocessor:
         assert len(result2) > 0
         assert len(result3) > 0
     
+    @pytest.mark.asyncio
+    async def test_preprocess_page(self, preprocessor):
+        """Test preprocessing a decoded page without re-encoding"""
+        test_image = np.random.randint(0, 255, (100, 100, 3), dtype=np.uint8)
+        page = PageImage(test_image, page_number=2)
+        
+        result = await preprocessor.preprocess_page(page)
+        
+        assert isinstance(result, PageImage)
+        assert result.page_number == 2
+        assert result.array.shape == (100, 100)
+        assert result._encoded == {}
+    
     @pytest.mark.asyncio
     async def test_enhance_image_quality(self, preprocessor):
         """Test image quality enhancement"""
@@ -97,6 +112,108 @@ class TestImagePreprocessor:
         with pytest.raises(ValueError):
             await preprocessor.preprocess(b"")
     
+    def test_stretch_lut(self):
+        """Test the LUT maps the occupied range onto 0-255"""
+        image = np.tile(np.arange(50, 151, dtype=np.uint8), (10, 1))
+        lut = stretch_lut(image)
+        
+        assert lut.dtype == np.uint8
+        assert lut[50] == 0 and lut[150] == 255 and lut[100] == 128
+        assert stretch_lut(np.tile(np.arange(256, dtype=np.uint8), (4, 1))) is None
+        assert stretch_lut(np.full((4, 4), 7, dtype=np.uint8)) is None
+    
+    @pytest.mark.parametrize("profile", list(PROFILES))
+    def test_profiles_leave_input_untouched(self, preprocessor, profile):
+        """Test every profile works on read-only input and returns a new uint8 page"""
+        image = np.random.randint(40, 200, (120, 90), dtype=np.uint8)
+        original = image.copy()
+        image.flags.writeable = False
+        
+        result = preprocessor._run_chain(image, get_profile(profile))
+        
+        assert result.shape == image.shape
+        assert result.dtype == np.uint8
+        assert not np.shares_memory(result, image)
+        assert np.array_equal(image, original)
+    
+    @pytest.mark.asyncio
+    async def test_preprocess_page_profile(self, preprocessor):
+        """Test the profile is selectable per call and unknown names are rejected"""
+        image = np.random.randint(40, 200, (60, 60), dtype=np.uint8)
+        page = PageImage(image)
+        
+        fast = await preprocessor.preprocess_page(page, profile="fast")
+        # fast only stretches contrast: the occupied range becomes 0-255
+        assert fast.array.min() == 0 and fast.array.max() == 255
+        
+        with pytest.raises(ValueError):
+            await preprocessor.preprocess_page(page, profile="unknown")
+    
+    @staticmethod
+    def _document(height: int = 700, width: int = 500) -> np.ndarray:
+        page = np.full((height, width), 255, dtype=np.uint8)
+        for y in range(50, height - 30, 40):
+            cv2.putText(page, "Title deed 0001", (30, y), cv2.FONT_HERSHEY_SIMPLEX, 0.9, 0, 2)
+        return page
+    
+    @pytest.mark.asyncio
+    async def test_quality_gate_passes_clean_page_through(self, preprocessor):
+        """Test a clean render is returned unfiltered with its assessment recorded"""
+        image = self._document()
+        
+        result = await preprocessor.preprocess_page(PageImage(image, page_number=2))
+        
+        assert np.array_equal(result.array, image)
+        assert result.page_number == 2
+        recorded = result.metadata['preprocessing']
+        assert recorded['profile'] == 'balanced'
+        assert recorded['operations'] == []
+        assert recorded['quality']['contrast'] > 240
+    
+    @pytest.mark.asyncio
+    async def test_quality_gate_selects_needed_operations(self, preprocessor):
+        """Test a noisy, faded page runs only the denoise and contrast passes"""
+        rng = np.random.default_rng(0)
+        image = self._document() * 0.5 + 80 + rng.normal(0, 12, (700, 500))
+        page = PageImage(np.clip(image, 0, 255).astype(np.uint8))
+        
+        result = await preprocessor.preprocess_page(page)
+        
+        operations = result.metadata['preprocessing']['operations']
+        assert operations == ['denoise', 'stretch', 'clahe']
+        assert not np.array_equal(result.array, page.array)
+    
+    @pytest.mark.asyncio
+    async def test_quality_gate_deskews(self, preprocessor):
+        """Test a skewed page is rotated level"""
+        image = self._document()
+        matrix = cv2.getRotationMatrix2D((250, 350), 3.0, 1.0)
+        skewed = cv2.warpAffine(image, matrix, (500, 700), borderValue=255)
+        
+        result = await preprocessor.preprocess_page(PageImage(skewed))
+        
+        recorded = result.metadata['preprocessing']
+        assert recorded['operations'][0] == 'deskew'
+        assert recorded['quality']['skew'] == pytest.approx(3.0, abs=0.5)
+    
+    @pytest.mark.asyncio
+    async def test_quality_gate_disabled(self, preprocessor):
+        """Test the ungated chain runs every pass the profile and flags enable"""
+        page = PageImage(self._document())
+        
+        result = await preprocessor.preprocess_page(page, quality_gate=False, remove_noise=False)
+        
+        recorded = result.metadata['preprocessing']
+        assert recorded['operations'] == ['sharpen', 'stretch', 'clahe']
+        assert recorded['quality'] is None
+    
+    def test_select_operations(self, preprocessor):
+        """Test metrics map onto passes and the profile order is kept"""
+        quality = {'sharpness': 0.01, 'noise': 0.0, 'contrast': 250, 'illumination': 45.0, 'skew': 0.0}
+        operations = PROFILES['legacy'].operations()
+        
+        assert preprocessor.select_operations(operations, quality) == ('sharpen', 'clahe')
+    
     @pytest.mark.asyncio
     async def test_health_check(self, preprocessor):
         """Test health check"""
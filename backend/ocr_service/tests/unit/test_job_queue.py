@@ -0,0 +1,160 @@
+"""
+Unit tests for the persistent OCR job queue
+"""
+import asyncio
+
+import pytest
+
+from src.core.job_queue import Job, JobQueue, SQLiteJobStore
+from src.models.schemas import ProcessingStatus
+
+
+def make_job(job_id="job-1", content=b"data"):
+    return Job(id=job_id, filename="title.pdf", document_type="building_title",
+               language="zh-TW", content=content)
+
+
+async def wait_for_status(queue, job_id, status, timeout=2.0):
+    async def poll():
+        while True:
+            job = await queue.get(job_id)
+            if job.status == status:
+                return job
+            await asyncio.sleep(0.01)
+    return await asyncio.wait_for(poll(), timeout)
+
+
+class TestSQLiteJobStore:
+    def test_claim_in_fifo_order(self):
+        """Test jobs are claimed oldest first and only once"""
+        store = SQLiteJobStore(":memory:")
+        store.add([make_job("a"), make_job("b")])
+
+        first = store.claim_next()
+        second = store.claim_next()
+
+        assert (first.id, second.id) == ("a", "b")
+        assert first.content == b"data"
+        assert first.status == ProcessingStatus.PROCESSING
+        assert store.claim_next() is None
+
+    def test_complete_stores_result_and_drops_content(self):
+        """Test completion persists the result and frees the upload"""
+        store = SQLiteJobStore(":memory:")
+        store.add([make_job()])
+        store.claim_next()
+
+        store.update_progress("job-1", 2, 3)
+        assert store.get("job-1").progress == 66
+
+        store.complete("job-1", {"text": "建物"})
+        job = store.get("job-1", include_content=True)
+
+        assert job.status == ProcessingStatus.COMPLETED
+        assert job.result == {"text": "建物"}
+        assert job.content is None
+        assert job.progress == 100
+
+    def test_recover_requeues_interrupted_jobs(self, tmp_path):
+        """Test jobs left processing are re-queued after a restart"""
+        path = str(tmp_path / "jobs.sqlite3")
+        store = SQLiteJobStore(path)
+        store.add([make_job()])
+        store.claim_next()
+        store.close()
+
+        reopened = SQLiteJobStore(path)
+
+        assert reopened.recover() == 1
+        assert reopened.claim_next().id == "job-1"
+
+    def test_recover_fails_jobs_out_of_attempts(self):
+        """Test a job interrupted on its last attempt is failed, not re-queued"""
+        store = SQLiteJobStore(":memory:")
+        store.add([make_job("crashy"), make_job("fresh")])
+        store.claim_next()
+        store.recover(max_attempts=2)
+        store.claim_next()
+        store.claim_next()
+
+        assert store.recover(max_attempts=2) == 1
+
+        crashed = store.get("crashy", include_content=True)
+        assert crashed.status == ProcessingStatus.FAILED
+        assert crashed.attempts == 2
+        assert crashed.content is None
+        assert store.get("fresh").status == ProcessingStatus.QUEUED
+
+
+class TestJobQueue:
+    @pytest.mark.asyncio
+    async def test_processes_submitted_jobs(self):
+        """Test workers run the handler and report progress"""
+        async def handler(job, progress):
+            await progress(1, 2)
+            await progress(2, 2)
+            return {"filename": job.filename, "size": len(job.content)}
+
+        queue = JobQueue(handler, store=SQLiteJobStore(":memory:"), max_workers=2)
+        await queue.start()
+        try:
+            jobs = await queue.submit(
+                [{"filename": "a.pdf", "content": b"abc"}], "building_title", "zh-TW"
+            )
+            job = await wait_for_status(queue, jobs[0].id, ProcessingStatus.COMPLETED)
+        finally:
+            await queue.stop()
+
+        assert job.result == {"filename": "a.pdf", "size": 3}
+        assert (job.pages_done, job.pages_total) == (2, 2)
+
+    @pytest.mark.asyncio
+    async def test_concurrency_is_bounded(self):
+        """Test no more than max_workers jobs run at once"""
+        running = 0
+        peak = 0
+
+        async def handler(job, progress):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.02)
+            running -= 1
+            return {}
+
+        queue = JobQueue(handler, store=SQLiteJobStore(":memory:"), max_workers=2)
+        await queue.start()
+        try:
+            jobs = await queue.submit(
+                [{"filename": f"{i}.png", "content": b"x"} for i in range(6)],
+                "building_title", "zh-TW"
+            )
+            for job in jobs:
+                await wait_for_status(queue, job.id, ProcessingStatus.COMPLETED)
+        finally:
+            await queue.stop()
+
+        assert peak == 2
+
+    @pytest.mark.asyncio
+    async def test_failed_job_retried_then_failed(self):
+        """Test a failing job is retried up to max_attempts"""
+        calls = 0
+
+        async def handler(job, progress):
+            nonlocal calls
+            calls += 1
+            raise RuntimeError("broken scan")
+
+        queue = JobQueue(handler, store=SQLiteJobStore(":memory:"), max_workers=1, max_attempts=2)
+        await queue.start()
+        try:
+            jobs = await queue.submit(
+                [{"filename": "a.png", "content": b"x"}], "building_title", "zh-TW"
+            )
+            job = await wait_for_status(queue, jobs[0].id, ProcessingStatus.FAILED)
+        finally:
+            await queue.stop()
+
+        assert calls == 2
+        assert job.error == "broken scan"
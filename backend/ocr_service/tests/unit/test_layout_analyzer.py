@@ -0,0 +1,95 @@
+"""
+Unit tests for LayoutAnalyzer module
+"""
+import cv2
+import numpy as np
+import pytest
+
+from src.layout.layout_analyzer import LayoutAnalyzer, summarize_layout
+
+
+def _lines(positions, horizontal):
+    """Segments at the given positions, as returned by extract_lines"""
+    if horizontal:
+        return np.array([[0, p, 999, p] for p in positions], dtype=np.int32).reshape(-1, 4)
+    return np.array([[p, 0, p, 999] for p in positions], dtype=np.int32).reshape(-1, 4)
+
+
+class TestLayoutAnalyzer:
+    @pytest.fixture
+    def analyzer(self):
+        return LayoutAnalyzer()
+    
+    @pytest.fixture
+    def image(self):
+        return np.full((1000, 1000), 255, dtype=np.uint8)
+    
+    def test_identify_sections_counts_regions_per_cell(self, analyzer, image):
+        """Test regions are counted in the cell that fully contains them"""
+        horizontal = _lines([100, 400, 700], horizontal=True)
+        vertical = _lines([100, 500, 900], horizontal=False)
+        regions = [
+            {'bbox': [120, 120, 50, 20]},
+            {'bbox': [200, 300, 50, 20]},
+            {'bbox': [600, 450, 50, 20]},
+            # Straddles the x=500 boundary
+            {'bbox': [480, 150, 50, 20]},
+            # Outside the grid
+            {'bbox': [20, 20, 30, 20]},
+            {'bbox': [950, 800, 30, 20]},
+        ]
+        
+        sections = analyzer._identify_sections(image, horizontal, vertical, regions)
+        
+        assert [(s['bbox'], s['text_regions_count']) for s in sections] == [
+            ([100, 100, 400, 300], 2),
+            ([500, 400, 400, 300], 1),
+        ]
+    
+    def test_identify_sections_merges_duplicate_lines(self, analyzer, image):
+        """Test near-coincident rulings collapse into one boundary"""
+        horizontal = _lines([100, 102, 98, 400, 403, 700], horizontal=True)
+        vertical = _lines([100, 101, 500, 499, 900], horizontal=False)
+        regions = [{'bbox': [120 + 400 * (i % 2), 120 + 300 * (i // 2), 50, 20]} for i in range(4)]
+        
+        sections = analyzer._identify_sections(image, horizontal, vertical, regions)
+        
+        assert len(sections) == 4
+        assert all(s['text_regions_count'] == 1 for s in sections)
+        assert sections[0]['bbox'] == [100, 100, 400, 302]
+    
+    def test_identify_sections_without_grid(self, analyzer, image):
+        """Test pages without a grid or regions have no sections"""
+        empty = np.empty((0, 4), dtype=np.int32)
+        regions = [{'bbox': [120, 120, 50, 20]}]
+        
+        assert analyzer._identify_sections(image, empty, empty, regions) == []
+        assert analyzer._identify_sections(
+            image, _lines([100, 400], True), _lines([100, 500], False), []
+        ) == []
+
+    
+    def test_analyze_array_and_summary(self, analyzer):
+        """Test a ruled page is analyzed synchronously and summarized compactly"""
+        page = np.full((600, 800), 255, dtype=np.uint8)
+        for y in (100, 300, 500):
+            cv2.line(page, (100, y), (700, y), 0, 2)
+        for x in (100, 400, 700):
+            cv2.line(page, (x, 100), (x, 500), 0, 2)
+        for y in (200, 400):
+            for x in (150, 450):
+                cv2.putText(page, "0001", (x, y), cv2.FONT_HERSHEY_SIMPLEX, 1.0, 0, 2)
+        
+        layout = analyzer.analyze_array(page)
+        summary = summarize_layout(layout)
+        
+        assert len(layout['horizontal_lines']) == 3
+        assert len(layout['vertical_lines']) == 3
+        assert summary['ruled_lines'] == {'horizontal': 3, 'vertical': 3}
+        assert sum(summary['sections'].values()) == len(layout['sections'])
+        assert summary['text_regions'] == len(layout['text_regions'])
+        assert set(summary) == {'document_type', 'ruled_lines', 'sections', 'text_regions', 'confidence'}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
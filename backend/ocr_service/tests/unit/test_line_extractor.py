@@ -0,0 +1,76 @@
+"""
+Unit tests for ruling line extraction
+"""
+import cv2
+import numpy as np
+import pytest
+
+from src.layout.line_extractor import cluster_positions, extract_lines
+
+
+@pytest.fixture
+def form_page():
+    """A 3x2 ruled grid with text inside the cells"""
+    page = np.full((400, 600), 255, dtype=np.uint8)
+    for y in (50, 150, 250, 350):
+        cv2.line(page, (40, y), (560, y), 0, 2)
+    for x in (40, 300, 560):
+        cv2.line(page, (x, 50), (x, 350), 0, 2)
+    for row, y in enumerate((110, 210, 310)):
+        cv2.putText(page, f"owner {row}", (60, y), cv2.FONT_HERSHEY_SIMPLEX, 0.8, 0, 2)
+        cv2.putText(page, "0001", (320, y), cv2.FONT_HERSHEY_SIMPLEX, 0.8, 0, 2)
+    return page
+
+
+class TestExtractLines:
+    def test_grid_lines(self, form_page):
+        """Test each ruling line becomes one segment and text is ignored"""
+        lines = extract_lines(form_page)
+        
+        assert lines.horizontal.shape == (4, 4) and lines.horizontal.dtype == np.int32
+        assert lines.vertical.shape == (3, 4)
+        np.testing.assert_allclose(lines.horizontal_positions, [50, 150, 250, 350], atol=1)
+        np.testing.assert_allclose(lines.vertical_positions, [40, 300, 560], atol=1)
+        
+        x1, y1, x2, y2 = lines.horizontal[0]
+        assert y1 == y2 and x1 <= 40 and x2 >= 559
+        x1, y1, x2, y2 = lines.vertical[1]
+        assert x1 == x2 and y1 <= 50 and y2 >= 349
+    
+    def test_masks_hold_only_lines(self, form_page):
+        """Test the masks keep the rulings and drop the text strokes"""
+        lines = extract_lines(form_page)
+        
+        assert lines.horizontal_mask.shape == form_page.shape
+        assert lines.horizontal_mask[150, 100] == 255
+        assert lines.vertical_mask[200, 300] == 255
+        # Inside a text cell, away from the rulings
+        assert not lines.horizontal_mask[85:115, 60:200].any()
+        assert not lines.vertical_mask[85:115, 60:200].any()
+    
+    def test_page_without_lines(self):
+        """Test plain text yields empty line sets"""
+        page = np.full((200, 300), 255, dtype=np.uint8)
+        cv2.putText(page, "no rulings", (20, 100), cv2.FONT_HERSHEY_SIMPLEX, 1.0, 0, 2)
+        
+        lines = extract_lines(page)
+        
+        assert lines.horizontal.shape == (0, 4)
+        assert lines.vertical.shape == (0, 4)
+
+
+class TestClusterPositions:
+    def test_merges_close_positions(self):
+        """Test positions within the tolerance merge into their rounded mean"""
+        merged = cluster_positions(np.array([402, 100, 98, 400, 700, 103]), tolerance=8)
+        
+        assert merged.tolist() == [100, 401, 700]
+        assert merged.dtype == np.int32
+    
+    def test_empty(self):
+        """Test no positions give an empty boundary array"""
+        assert cluster_positions(np.empty(0), tolerance=8).shape == (0,)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
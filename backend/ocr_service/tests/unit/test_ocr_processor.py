@@ -0,0 +1,309 @@
+"""
+Unit tests for the OCR processor pipeline orchestration
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import cv2
+import fitz
+import numpy as np
+import pytest
+
+from src.core import ocr_processor
+from src.core.ocr_processor import OCRProcessor
+from src.layout.layout_analyzer import summarize_layout
+from src.models.schemas import ProcessingConfig
+from src.preprocessor.page_image import PageImage
+from src.utils.cache_manager import CacheManager
+
+
+def ruled_page(page_number, label="A"):
+    """Two-by-two ruled grid with a label drawn in the first cell"""
+    image = np.full((400, 600), 255, dtype=np.uint8)
+    for y in (50, 150, 250):
+        cv2.line(image, (50, y), (550, y), 0, 2)
+    for x in (50, 300, 550):
+        cv2.line(image, (x, 50), (x, 250), 0, 2)
+    cv2.putText(image, label, (100, 120), cv2.FONT_HERSHEY_SIMPLEX, 1, 0, 2)
+    return PageImage(image, page_number=page_number)
+
+
+def with_text_layer(page):
+    """Mark a page as carrying a usable PDF text layer"""
+    page.metadata['text_layer'] = {
+        'usable': True,
+        'text_blocks': [{'text': 'layer', 'bbox': [80, 90, 60, 20], 'confidence': 1.0}]
+    }
+    return page
+
+
+def sample_pdf(page_count):
+    """PDF with one line of text per page"""
+    doc = fitz.open()
+    for number in range(1, page_count + 1):
+        doc.new_page().insert_text((72, 72), f"Page {number}", fontsize=14)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def spy_renders(processor):
+    """Record each iter_pages call's page range and whether it was closed"""
+    calls = []
+    iter_pages = processor.pdf_preprocessor.iter_pages
+
+    async def spy(content, **kwargs):
+        call = {'page_range': kwargs.get('page_range'), 'closed': False}
+        calls.append(call)
+        try:
+            async for page_info in iter_pages(content, **kwargs):
+                yield page_info
+        finally:
+            call['closed'] = True
+
+    processor.pdf_preprocessor.iter_pages = spy
+    return calls
+
+
+@pytest.fixture
+def processor():
+    """Processor with an in-memory stage cache and OCR stubbed per page"""
+    processor = OCRProcessor(max_page_workers=1, stage_cache=CacheManager())
+    processor.is_initialized = True
+    processor.text_detector.detect_array = MagicMock(return_value=[])
+
+    async def recognize(page, regions, language):
+        return [{'text': f"word-{page.page_number}", 'bbox': [80, 90, 100, 20], 'confidence': 0.9}]
+
+    processor.text_recognizer.recognize = AsyncMock(side_effect=recognize)
+    return processor
+
+
+class TestOCRProcessor:
+    @pytest.mark.asyncio
+    async def test_cached_ocr_renumbered_per_position(self, processor):
+        """Test a cached page result takes the page number of where it is reused"""
+        config = ProcessingConfig(enable_table_detection=True)
+        pages = [ruled_page(1, "A"), ruled_page(2, "B"), ruled_page(3, "A")]
+
+        first = await processor._recognize_pages(pages, 'zh-TW', config)
+        second = await processor._recognize_pages(pages, 'zh-TW', config)
+
+        assert processor.text_recognizer.recognize.await_count == 3
+        for results in (first, second):
+            assert [result['page'] for result in results] == [1, 2, 3]
+            assert [result['tables'][0]['page'] for result in results] == [1, 2, 3]
+        # Hits are copies; the cached entries keep their own numbering
+        assert second[2] is not second[0]
+
+    
+    @pytest.mark.asyncio
+    async def test_serial_detection_runs_off_the_event_loop(self, processor):
+        """Test in-process text detection is offloaded to a worker thread"""
+        threads = []
+        
+        def detect_array(image):
+            threads.append(threading.current_thread())
+            return []
+        
+        processor.text_detector.detect_array = MagicMock(side_effect=detect_array)
+        page = ruled_page(1)
+        
+        await processor._recognize_pages([page], 'zh-TW', ProcessingConfig(enable_stage_cache=False))
+        
+        processor.text_detector.detect_array.assert_called_once()
+        assert processor.text_detector.detect_array.call_args.args[0] is page.gray
+        assert threads and threads[0] is not threading.main_thread()
+    
+    @pytest.mark.asyncio
+    async def test_render_only_pages_missing_from_cache(self, processor):
+        """Test a partially warm render cache only renders the missing pages"""
+        content = sample_pdf(4)
+        calls = spy_renders(processor)
+        
+        # Renders are keyed per page, not by the page limit
+        warm = [page async for page in processor._render_pdf_pages(
+            content, ProcessingConfig(max_pages=2, pdf_dpi=72, adaptive_dpi=False)
+        )]
+        pages = [page async for page in processor._render_pdf_pages(
+            content, ProcessingConfig(max_pages=4, pdf_dpi=72, adaptive_dpi=False)
+        )]
+        
+        assert [page.page_number for page in warm] == [1, 2]
+        assert [page.page_number for page in pages] == [1, 2, 3, 4]
+        assert [call['page_range'] for call in calls] == ["1,2", "3,4"]
+        assert all(call['closed'] for call in calls)
+        
+        # Fully warm: nothing left to render
+        again = [page async for page in processor._render_pdf_pages(
+            content, ProcessingConfig(max_pages=4, pdf_dpi=72, adaptive_dpi=False)
+        )]
+        assert [page.page_number for page in again] == [1, 2, 3, 4]
+        assert len(calls) == 2
+    
+    @pytest.mark.asyncio
+    async def test_short_render_stream_names_missing_page(self, processor):
+        """Test a renderer yielding fewer pages than requested raises a clear error"""
+        content = sample_pdf(3)
+        iter_pages = processor.pdf_preprocessor.iter_pages
+        
+        async def short(content, **kwargs):
+            async for page_info in iter_pages(content, **kwargs):
+                yield page_info
+                return
+        
+        processor.pdf_preprocessor.iter_pages = short
+        
+        with pytest.raises(ValueError, match="before page 2"):
+            async for _ in processor._render_pdf_pages(
+                content, ProcessingConfig(pdf_dpi=72, adaptive_dpi=False)
+            ):
+                pass
+    
+    @pytest.mark.asyncio
+    async def test_page_images_kept_out_of_result_cache(self, processor):
+        """Test rendered and preprocessed pages go to the bounded image cache only"""
+        config = ProcessingConfig(pdf_dpi=72, adaptive_dpi=False)
+        
+        pages = await processor._process_pdf(sample_pdf(2), config)
+        
+        results = processor.stage_cache.cache_manager.memory_cache
+        images = processor.image_cache.cache_manager.memory_cache
+        assert not any(key.startswith(('stage:render:', 'stage:preprocess:')) for key in results.keys())
+        assert sum(key.startswith('stage:render:') for key in images.keys()) == 2
+        assert sum(key.startswith('stage:preprocess:') for key in images.keys()) == 2
+        # Accounted by the arrays held, at least the preprocessed pages handed out
+        assert images.current_bytes >= sum(page.array.nbytes for page in pages)
+        assert processor.image_cache.ttl == 600
+        assert processor.image_cache.cache_manager.redis_client is None
+        assert not OCRProcessor().image_cache.enabled
+    
+    @pytest.mark.asyncio
+    async def test_render_closed_early_closes_renderer(self, processor):
+        """Test closing the page stream early stops the underlying renderer"""
+        content = sample_pdf(3)
+        calls = spy_renders(processor)
+        
+        pages = processor._render_pdf_pages(
+            content, ProcessingConfig(pdf_dpi=72, adaptive_dpi=False)
+        )
+        first = await pages.__anext__()
+        await pages.aclose()
+        
+        assert first.page_number == 1
+        assert len(calls) == 1 and calls[0]['closed']
+        
+        # Only the page actually consumed was cached
+        pages = [page async for page in processor._render_pdf_pages(
+            content, ProcessingConfig(pdf_dpi=72, adaptive_dpi=False)
+        )]
+        assert [page.page_number for page in pages] == [1, 2, 3]
+        assert calls[1]['page_range'] == "2,3"
+
+    
+    @pytest.mark.asyncio
+    async def test_pages_keep_their_own_layout(self, processor):
+        """Test each page gets its own layout and text-layer pages keep their source"""
+        config = ProcessingConfig(enable_stage_cache=False)
+        pages = [with_text_layer(ruled_page(1)), PageImage(np.full((400, 600), 255, np.uint8), page_number=2)]
+        
+        results = await processor._recognize_pages(pages, 'zh-TW', config)
+        
+        assert [result['page'] for result in results] == [1, 2]
+        assert results[0]['source'] == 'text_layer'
+        assert results[0]['text_blocks'][0]['text'] == 'layer'
+        assert 'source' not in results[1]
+        assert results[1]['text_blocks'][0]['text'] == 'word-2'
+        # Only the OCR page went through recognition
+        assert processor.text_recognizer.recognize.await_count == 1
+        # The ruled page has lines and a table, the blank page neither
+        assert results[0]['layout']['horizontal_lines']
+        assert not results[1]['layout']['horizontal_lines']
+        assert [table['page'] for table in results[0]['tables']] == [1]
+        assert results[1]['tables'] == []
+    
+    @pytest.mark.asyncio
+    async def test_pool_results_merge_in_page_order(self, processor):
+        """Test pooled pages merge into text-layer entries and keep page order"""
+        config = ProcessingConfig(page_workers=2, enable_stage_cache=False)
+        processor.max_page_workers = 2
+        pages = [with_text_layer(ruled_page(1)), ruled_page(2), ruled_page(3)]
+        calls = []
+        
+        def run_page_pipeline(page, language, recognize, detect_tables, text_blocks):
+            calls.append((page.page_number, recognize, text_blocks))
+            result = {'page': page.page_number, 'layout': {'page_marker': page.page_number}, 'tables': []}
+            if recognize:
+                result['text_blocks'] = [{'text': f"pool-{page.page_number}"}]
+            return result
+        
+        with ThreadPoolExecutor(max_workers=2) as pool, \
+                patch.object(ocr_processor, 'run_page_pipeline', run_page_pipeline), \
+                patch.object(processor, '_get_page_pool', return_value=pool):
+            results = await processor._recognize_pages(pages, 'zh-TW', config)
+        
+        assert sorted(calls, key=lambda call: call[0]) == [
+            (1, False, pages[0].metadata['text_layer']['text_blocks']),
+            (2, True, None),
+            (3, True, None)
+        ]
+        assert [result['page'] for result in results] == [1, 2, 3]
+        assert [result['layout']['page_marker'] for result in results] == [1, 2, 3]
+        assert results[0]['source'] == 'text_layer'
+        assert results[0]['text_blocks'][0]['text'] == 'layer'
+        assert [result['text_blocks'][0]['text'] for result in results[1:]] == ['pool-2', 'pool-3']
+    
+    @pytest.mark.asyncio
+    async def test_document_hands_page_layouts_to_vlm(self, processor):
+        """Test process_document passes per-page layout summaries to the VLM"""
+        pages = [with_text_layer(ruled_page(1)), PageImage(np.full((400, 600), 255, np.uint8), page_number=2)]
+        processor._process_pdf = AsyncMock(return_value=pages)
+        processor.vlm_engine.process = AsyncMock(return_value={'owner': 'x'})
+        
+        result = await processor.process_document(
+            b'%PDF', 'doc.pdf', config=ProcessingConfig(enable_stage_cache=False)
+        )
+        
+        layouts = result['layout_analysis']
+        assert [layout['page'] for layout in layouts] == [1, 2]
+        assert layouts[0]['horizontal_lines'] and not layouts[1]['horizontal_lines']
+        assert [entry['page'] for entry in result['raw_text']] == [1, 2]
+        assert all('layout' not in entry and 'tables' not in entry for entry in result['raw_text'])
+        assert result['raw_text'][0]['source'] == 'text_layer'
+        assert [table['page'] for table in result['tables']] == [1]
+        
+        kwargs = processor.vlm_engine.process.await_args.kwargs
+        assert kwargs['text_results'] == result['raw_text']
+        assert kwargs['layout_analysis'] == [
+            {'page': layout['page'], **summarize_layout(layout)} for layout in layouts
+        ]
+
+    
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('enable_table_detection', [True, False])
+    async def test_document_tables_on_ruled_page(self, processor, enable_table_detection):
+        """Test a ruled page yields a filled table only with table detection enabled"""
+        content = cv2.imencode('.png', ruled_page(1).gray)[1].tobytes()
+        processor.vlm_engine.process = AsyncMock(return_value={})
+        
+        result = await processor.process_document(
+            content, 'page.png', config=ProcessingConfig(
+                enable_stage_cache=False, enable_table_detection=enable_table_detection
+            )
+        )
+        
+        assert [layout['page'] for layout in result['layout_analysis']] == [1]
+        if not enable_table_detection:
+            assert result['tables'] == []
+            return
+        
+        assert len(result['tables']) == 1
+        table = result['tables'][0]
+        assert table['page'] == 1
+        assert (table['rows'], table['columns']) == (2, 2)
+        assert table['data'][0][0] == 'word-1'
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,171 @@
+"""
+Unit tests for the OCR API routes
+"""
+import asyncio
+import base64
+from unittest.mock import AsyncMock, MagicMock
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.api.routes import ocr
+from src.core.job_queue import JobQueue, SQLiteJobStore
+from src.utils.cache_manager import CacheManager
+from src.utils.metrics_collector import MetricsCollector
+
+
+@pytest.fixture
+def services(monkeypatch):
+    """Route globals backed by an in-memory cache and a mocked processor"""
+    processor = MagicMock()
+    processor.PIPELINE_VERSION = "test"
+    processor.process_document = AsyncMock(return_value={'document_type': 'building_title'})
+    cache = CacheManager()
+    metrics = MetricsCollector()
+
+    monkeypatch.setattr(ocr, "ocr_processor", processor)
+    monkeypatch.setattr(ocr, "cache_manager", cache)
+    monkeypatch.setattr(ocr, "metrics", metrics)
+    return processor, cache, metrics
+
+
+def make_app():
+    app = FastAPI()
+    app.include_router(ocr.router, prefix="/api/v1")
+    return app
+
+
+@pytest.fixture
+def client():
+    return TestClient(make_app())
+
+
+@pytest.fixture
+def job_queue(monkeypatch):
+    """Job queue running the real handler; tests that start it also stop it"""
+    queue = JobQueue(handler=ocr.process_job, store=SQLiteJobStore(":memory:"), max_workers=1)
+    monkeypatch.setattr(ocr, "job_queue", queue)
+    yield queue
+    queue.store.close()
+
+
+def post_single(client, content=b"%PDF-1.4 test", **params):
+    return client.post(
+        "/api/v1/ocr/single",
+        files={'file': ('title.pdf', content, 'application/pdf')},
+        params=params
+    )
+
+
+class TestOCRRoutes:
+    def test_app_wires_routes(self):
+        """Test the application module imports and mounts the OCR routes"""
+        from src.api.main import app
+
+        paths = app.openapi()['paths']
+        assert {"/api/v1/ocr/single", "/api/v1/ocr/batch", "/api/v1/health"} <= set(paths)
+
+    @pytest.mark.asyncio
+    async def test_single_cache_miss_then_hit(self, client, services):
+        """Test a repeated upload is served from the result cache"""
+        processor, _, metrics = services
+
+        first = post_single(client)
+        second = post_single(client)
+
+        assert first.status_code == 200 and second.status_code == 200
+        assert first.json()['cached'] is False
+        assert second.json()['cached'] is True
+        assert second.json()['result'] == {'document_type': 'building_title'}
+        processor.process_document.assert_awaited_once()
+        assert (await metrics.get_statistics('cache_miss'))['count'] == 1
+        assert (await metrics.get_statistics('cache_hit'))['count'] == 1
+        assert (await metrics.get_statistics('ocr_success'))['count'] == 1
+
+    @pytest.mark.asyncio
+    async def test_cache_key_tracks_pipeline_version(self, client, services):
+        """Test a pipeline upgrade misses results cached by the previous version"""
+        processor, _, _ = services
+
+        post_single(client)
+        processor.PIPELINE_VERSION = "next"
+        response = post_single(client)
+
+        assert response.json()['cached'] is False
+        assert processor.process_document.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_cache_disabled(self, client, services):
+        """Test enable_cache=false always processes and leaves the cache untouched"""
+        processor, cache, metrics = services
+
+        post_single(client, enable_cache=False)
+        response = post_single(client, enable_cache=False)
+
+        assert response.json()['cached'] is False
+        assert processor.process_document.await_count == 2
+        assert len(cache.memory_cache) == 0
+        assert await metrics.get_statistics('cache_miss') == {}
+
+    @pytest.mark.asyncio
+    async def test_processing_error(self, client, services):
+        """Test pipeline failures return 500 and count as errors"""
+        processor, _, metrics = services
+        processor.process_document.side_effect = RuntimeError("boom")
+
+        response = post_single(client)
+
+        assert response.status_code == 500
+        assert (await metrics.get_statistics('ocr_error'))['count'] == 1
+
+    @pytest.mark.asyncio
+    async def test_batch_queues_jobs_and_reports_status(self, services, job_queue):
+        """Test batch uploads are queued, processed by the workers and pollable"""
+        processor, _, _ = services
+        files = [
+            {'filename': name, 'content_base64': base64.b64encode(name.encode()).decode()}
+            for name in ('a.pdf', 'b.pdf')
+        ]
+        transport = httpx.ASGITransport(app=make_app())
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.post("/api/v1/ocr/batch", json={'files': files})
+            assert response.status_code == 200
+            queued = response.json()
+            assert [item['status'] for item in queued] == ['queued', 'queued']
+
+            async def wait_completed(request_id):
+                while True:
+                    status = (await client.get(f"/api/v1/ocr/status/{request_id}")).json()
+                    if status['status'] == 'completed':
+                        return status
+                    await asyncio.sleep(0.01)
+
+            await job_queue.start()
+            try:
+                statuses = await asyncio.wait_for(
+                    asyncio.gather(*(wait_completed(item['request_id']) for item in queued)), 2.0
+                )
+            finally:
+                await job_queue.stop()
+            missing = await client.get("/api/v1/ocr/status/unknown")
+
+        assert [status['filename'] for status in statuses] == ['a.pdf', 'b.pdf']
+        assert all(status['result'] == {'document_type': 'building_title'} for status in statuses)
+        assert processor.process_document.await_count == 2
+        assert missing.status_code == 404
+
+    def test_batch_rejects_invalid_base64(self, client, services, job_queue):
+        """Test undecodable content fails the whole batch with 400"""
+        response = client.post(
+            "/api/v1/ocr/batch",
+            json={'files': [{'filename': 'a.pdf', 'content_base64': '***'}]}
+        )
+
+        assert response.status_code == 400
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
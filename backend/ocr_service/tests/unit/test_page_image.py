@@ -0,0 +1,119 @@
+"""
+Unit tests for PageImage module
+"""
+import pickle
+
+import cv2
+import numpy as np
+import pytest
+
+from src.preprocessor.page_image import PageImage, as_gray_array
+
+
+class TestPageImage:
+    @pytest.fixture
+    def color_array(self):
+        image = np.full((60, 80, 3), 255, dtype=np.uint8)
+        cv2.rectangle(image, (10, 10), (50, 40), (0, 0, 0), -1)
+        return image
+
+    @pytest.fixture
+    def png_bytes(self, color_array):
+        _, encoded = cv2.imencode('.png', color_array)
+        return encoded.tobytes()
+
+    def test_from_bytes_decodes_once(self, png_bytes):
+        """Test decoding keeps the source PNG for reuse"""
+        page = PageImage.from_bytes(png_bytes, page_number=3)
+
+        assert page.page_number == 3
+        assert page.shape == (60, 80, 3)
+        assert page.to_png() == png_bytes
+
+    def test_invalid_bytes(self):
+        """Test handling of invalid and empty image data"""
+        with pytest.raises(ValueError):
+            PageImage.from_bytes(b"invalid image data")
+
+        with pytest.raises(ValueError):
+            PageImage.from_bytes(b"")
+
+    def test_gray_is_memoized(self, color_array):
+        """Test grayscale conversion happens once"""
+        page = PageImage(color_array)
+
+        assert page.gray.shape == (60, 80)
+        assert page.gray is page.gray
+
+    def test_gray_page_is_its_own_gray(self):
+        """Test grayscale pages are not converted"""
+        array = np.zeros((10, 10), dtype=np.uint8)
+        page = PageImage(array)
+
+        assert page.gray is array
+
+    def test_nbytes_counts_buffers(self, color_array):
+        """Test nbytes covers the pixels, a distinct gray copy and encodings"""
+        page = PageImage(color_array)
+        assert page.nbytes == color_array.nbytes
+
+        page.gray
+        png = page.to_png()
+        assert page.nbytes == color_array.nbytes + 60 * 80 + len(png)
+        assert PageImage(page.gray).nbytes == 60 * 80
+
+    def test_lazy_encodings_are_cached(self, color_array):
+        """Test PNG/JPEG are encoded on first use only"""
+        page = PageImage(color_array)
+
+        png = page.to_png()
+        jpeg = page.to_jpeg(quality=80)
+
+        assert png.startswith(b'\x89PNG')
+        assert jpeg.startswith(b'\xff\xd8')
+        assert page.to_png() is png
+        assert page.to_jpeg(quality=80) is jpeg
+
+    def test_with_array_keeps_page_info(self, color_array):
+        """Test derived pages keep page number and metadata"""
+        page = PageImage(color_array, page_number=2, metadata={"dpi": 300})
+        derived = page.with_array(page.gray)
+
+        assert derived.page_number == 2
+        assert derived.metadata == {"dpi": 300}
+        assert derived.metadata is not page.metadata
+
+    def test_pickle_drops_encodings(self, color_array):
+        """Test only pixels cross process boundaries"""
+        page = PageImage(color_array, page_number=4)
+        page.to_png()
+
+        restored = pickle.loads(pickle.dumps(page))
+
+        assert restored.page_number == 4
+        assert np.array_equal(restored.array, color_array)
+        assert restored._encoded == {}
+
+    def test_as_gray_array(self, color_array, png_bytes):
+        """Test grayscale access for pages, arrays and bytes"""
+        page = PageImage(color_array)
+
+        assert as_gray_array(page) is page.gray
+        assert as_gray_array(color_array).shape == (60, 80)
+        assert as_gray_array(png_bytes).shape == (60, 80)
+        assert as_gray_array(b"") is None
+
+    def test_content_hash_tracks_pixels(self, color_array):
+        """Test the content hash depends on pixels only, not page metadata"""
+        page = PageImage(color_array, page_number=1)
+        same = PageImage(color_array.copy(), page_number=7, metadata={'source': 'other'})
+        changed = color_array.copy()
+        changed[0, 0] = 0
+
+        assert page.content_hash == same.content_hash
+        assert page.content_hash != PageImage(changed).content_hash
+        assert page.content_hash != page.with_array(color_array[:, :, 0]).content_hash
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
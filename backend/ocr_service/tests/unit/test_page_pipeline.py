@@ -0,0 +1,105 @@
+"""
+Unit tests for the per-page worker pipeline
+"""
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+import cv2
+import numpy as np
+import pytest
+from unittest.mock import patch
+
+from src.core.page_pipeline import run_page_pipeline
+from src.preprocessor.page_image import PageImage
+
+
+class TestPagePipeline:
+    @pytest.fixture
+    def text_page(self):
+        image = np.full((300, 600), 255, dtype=np.uint8)
+        cv2.putText(image, "TEST", (40, 150), cv2.FONT_HERSHEY_SIMPLEX, 2, 0, 4)
+        return PageImage(image, page_number=2)
+
+    @pytest.fixture
+    def ocr_data(self):
+        return {
+            'text': ['TEST'],
+            'conf': ['91'],
+            'left': [17],
+            'top': [20],
+            'width': [30],
+            'height': [12],
+            'block_num': [1],
+            'line_num': [1],
+            'word_num': [1],
+        }
+
+    def test_run_page_pipeline(self, text_page, ocr_data):
+        """Test detection and recognition run for one page"""
+        regions = [{'bbox': [40, 100, 200, 60], 'confidence': 0.9, 'area': 12000}]
+
+        with patch('src.ocr.text_detector.TextDetector.detect_array', return_value=regions), \
+                patch('pytesseract.image_to_data', return_value=ocr_data) as mock_ocr:
+            result = run_page_pipeline(text_page, 'zh-TW')
+
+        assert result['page'] == 2
+        assert mock_ocr.call_count == 1
+        assert result['text_blocks'][0]['text'] == 'TEST'
+        assert result['text_blocks'][0]['bbox'] == [41, 104, 30, 12]
+        assert 'layout' in result
+
+    def test_blank_page_has_no_blocks(self):
+        """Test a blank page yields an empty result"""
+        page = PageImage(np.full((100, 100), 255, dtype=np.uint8))
+
+        result = run_page_pipeline(page, 'en')
+
+        assert result['page'] == 1
+        assert result['text_blocks'] == []
+        assert result['layout']['sections'] == []
+
+    def test_layout_only(self, text_page):
+        """Test text-layer pages get layout analysis without OCR"""
+        with patch('pytesseract.image_to_data') as mock_ocr:
+            result = run_page_pipeline(text_page, 'zh-TW', recognize=False)
+
+        mock_ocr.assert_not_called()
+        assert 'text_blocks' not in result
+        assert result['page'] == 2
+        assert result['layout']['document_type'] == 'unknown'
+
+    def test_detect_tables_with_text_layer_words(self):
+        """Test table cells are filled from supplied words when OCR is skipped"""
+        image = np.full((400, 600), 255, dtype=np.uint8)
+        for y in (50, 150, 250):
+            cv2.line(image, (50, y), (550, y), 0, 2)
+        for x in (50, 300, 550):
+            cv2.line(image, (x, 50), (x, 250), 0, 2)
+        words = [{'text': '權利範圍', 'bbox': [80, 90, 100, 20]}, {'text': '全部', 'bbox': [330, 90, 60, 20]}]
+
+        result = run_page_pipeline(
+            PageImage(image, page_number=4), 'zh-TW', recognize=False,
+            detect_tables=True, text_blocks=words
+        )
+
+        assert len(result['tables']) == 1
+        assert result['tables'][0]['page'] == 4
+        assert result['tables'][0]['data'] == [['權利範圍', '全部'], ['', '']]
+        assert len(result['layout']['horizontal_lines']) == 3
+
+    def test_runs_in_spawned_worker(self):
+        """Test pages can be shipped to a spawned worker process"""
+        pages = [
+            PageImage(np.full((50, 50), 255, dtype=np.uint8), page_number=n)
+            for n in (1, 2, 3)
+        ]
+        context = multiprocessing.get_context('spawn')
+
+        with ProcessPoolExecutor(max_workers=2, mp_context=context) as pool:
+            results = list(pool.map(run_page_pipeline, pages, ['en'] * 3))
+
+        assert [r['page'] for r in results] == [1, 2, 3]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
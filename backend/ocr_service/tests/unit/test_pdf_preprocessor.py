@@ -3,8 +3,9 @@ Unit tests for PDFPreprocessor module
 """
 import pytest
 import io
+import numpy as np
 from unittest.mock import AsyncMock, patch, MagicMock
-from src.preprocessor.pdf_preprocessor import PDFPreprocessor
+from src.preprocessor.pdf_preprocessor import PDFPreprocessor, estimate_x_height, pixmap_to_page
 
 
 class TestPDFPreprocessor:
@@ -180,6 +181,206 @@ class TestPDFPreprocessor:
         pages = await preprocessor.extract_pages(pdf_data)
         assert len(pages) == preprocessor.max_pages
 
+    
+    @pytest.fixture
+    def multi_page_pdf_data(self):
+        import fitz
+        doc = fitz.open()
+        for i in range(6):
+            page = doc.new_page(width=200, height=200)
+            page.insert_text((50, 50), f"Page {i+1}", fontsize=12)
+        pdf_data = doc.tobytes()
+        doc.close()
+        return pdf_data
+    
+    @pytest.mark.asyncio
+    async def test_iter_pages_streams_in_order(self, preprocessor, multi_page_pdf_data):
+        """Test streamed pages arrive in page order at the requested DPI"""
+        pages = [
+            page_info
+            async for page_info in preprocessor.iter_pages(
+                multi_page_pdf_data, page_range="2-4", extract_text=False, dpi=144
+            )
+        ]
+        
+        assert [page["page_number"] for page in pages] == [2, 3, 4]
+        assert all(page["dimensions"]["dpi"] == 144 for page in pages)
+        assert pages[0]["dimensions"]["width"] == 400
+    
+    @pytest.mark.asyncio
+    async def test_iter_pages_bounds_render_ahead(self, preprocessor, multi_page_pdf_data):
+        """Test rendering never runs more than max_in_flight pages ahead"""
+        rendered = []
+        render_page = preprocessor._render_page
+        
+        def tracking_render(pdf_document, page_num, *args):
+            rendered.append(page_num)
+            return render_page(pdf_document, page_num, *args)
+        
+        preprocessor._render_page = tracking_render
+        pages = preprocessor.iter_pages(multi_page_pdf_data, extract_text=False, dpi=72, max_in_flight=2)
+        
+        first = await pages.__anext__()
+        assert first["page_number"] == 1
+        # The consumed page plus at most two renders ahead
+        assert len(rendered) <= 3
+        
+        await pages.aclose()
+        assert len(rendered) <= 3
+
+    
+    @pytest.mark.asyncio
+    async def test_iter_pages_grayscale_skips_encoding(self, preprocessor, multi_page_pdf_data):
+        """Test gray pages are handed over as raw pixels without a PNG"""
+        pages = preprocessor.iter_pages(multi_page_pdf_data, extract_text=False, dpi=72, grayscale=True)
+        page_info = await pages.__anext__()
+        await pages.aclose()
+        
+        image = page_info["image"]
+        assert "image_data" not in page_info
+        assert image.array.ndim == 2
+        assert image.shape == (200, 200)
+        assert image._encoded == {}
+    
+    def test_pixmap_to_page_zero_copy(self):
+        """Test gray pixmaps are wrapped without copying and kept alive"""
+        import fitz
+        import gc
+        doc = fitz.open()
+        page = doc.new_page(width=120, height=80)
+        page.insert_text((10, 40), "zero copy", fontsize=12)
+        pix = page.get_pixmap(colorspace=fitz.csGRAY, alpha=False)
+        doc.close()
+        
+        image = pixmap_to_page(pix, page_number=2)
+        assert image.page_number == 2
+        assert image.shape == (pix.height, pix.width)
+        assert image.array.ctypes.data == pix.samples_ptr
+        
+        # Views keep the pixmap; derived arrays do not
+        assert image.with_array(image.array[10:20])._owner is pix
+        assert image.with_array(image.array.copy())._owner is None
+        
+        expected = bytes(pix.samples)
+        view = image.array[5:]
+        del pix, image
+        gc.collect()
+        # A bare view still keeps the pixmap memory valid
+        assert view.tobytes() == expected[5 * view.shape[1]:]
+    
+    def test_pixmap_to_page_rgb_to_bgr(self):
+        """Test color pixmaps come out in OpenCV channel order"""
+        import fitz
+        doc = fitz.open()
+        page = doc.new_page(width=50, height=50)
+        page.draw_rect(page.rect, color=(1, 0, 0), fill=(1, 0, 0))
+        pix = page.get_pixmap(colorspace=fitz.csRGB, alpha=False)
+        doc.close()
+        
+        image = pixmap_to_page(pix)
+        assert image.shape == (pix.height, pix.width, 3)
+        assert tuple(image.array[25, 25]) == (0, 0, 255)
+
+    
+    @pytest.mark.asyncio
+    async def test_text_layer_born_digital(self, preprocessor):
+        """Test a born-digital page yields OCR-shaped words in pixel coordinates"""
+        import fitz
+        doc = fitz.open()
+        page = doc.new_page(width=300, height=200)
+        page.insert_text((20, 40), "Building title transcript issued by the land office", fontsize=10)
+        pdf_data = doc.tobytes()
+        doc.close()
+        
+        pages = preprocessor.iter_pages(pdf_data, dpi=144, grayscale=True)
+        page_info = await pages.__anext__()
+        await pages.aclose()
+        
+        text_layer = page_info["text_layer"]
+        assert text_layer["usable"] is True
+        assert text_layer["coverage"] == 1.0
+        words = text_layer["text_blocks"]
+        assert [word["text"] for word in words[:2]] == ["Building", "title"]
+        x, y, w, h = words[0]["bbox"]
+        # 20pt from the left edge at 2x zoom
+        assert x == 40
+        assert 0 < y < 80 and w > 0 and h > 0
+        assert words[0]["confidence"] == 1.0
+    
+    @pytest.mark.asyncio
+    async def test_text_layer_scanned_page_needs_ocr(self, preprocessor):
+        """Test a full-page image with a small text stamp is not trusted"""
+        import fitz
+        doc = fitz.open()
+        page = doc.new_page(width=300, height=200)
+        scan = fitz.Pixmap(fitz.csGRAY, fitz.IRect(0, 0, 60, 40), False)
+        scan.clear_with(200)
+        page.insert_image(page.rect, pixmap=scan)
+        page.insert_text((20, 190), "Scanned copy, page 1 of 1", fontsize=6)
+        pdf_data = doc.tobytes()
+        doc.close()
+        
+        pages = preprocessor.iter_pages(pdf_data, dpi=72)
+        page_info = await pages.__anext__()
+        await pages.aclose()
+        
+        text_layer = page_info["text_layer"]
+        assert text_layer["usable"] is False
+        assert text_layer["coverage"] < preprocessor.min_text_coverage
+        assert "text_blocks" not in text_layer
+
+    
+    @staticmethod
+    def _text_page_pdf(fontsize, lines=10):
+        import fitz
+        doc = fitz.open()
+        page = doc.new_page()
+        for i in range(lines):
+            page.insert_text((40, 60 + i * fontsize * 1.6), "The quick brown fox jumps over the lazy dog", fontsize=fontsize)
+        pdf_data = doc.tobytes()
+        doc.close()
+        return pdf_data
+    
+    def test_estimate_x_height(self):
+        """Test glyph height is measured from connected components"""
+        import cv2
+        gray = np.full((200, 400), 255, dtype=np.uint8)
+        for i in range(12):
+            cv2.rectangle(gray, (10 + i * 30, 50), (25 + i * 30, 69), 0, -1)
+        # A table rule must not count as text
+        cv2.line(gray, (0, 150), (399, 150), 0, 2)
+        
+        assert estimate_x_height(gray) == 20
+        assert estimate_x_height(np.full((100, 100), 255, dtype=np.uint8)) is None
+    
+    @pytest.mark.asyncio
+    async def test_adaptive_dpi_follows_text_size(self, preprocessor):
+        """Test large print renders at lower DPI than small print, within bounds"""
+        large = await preprocessor.extract_pages(
+            self._text_page_pdf(28), extract_text=False, dpi=300, adaptive_dpi=True
+        )
+        small = await preprocessor.extract_pages(
+            self._text_page_pdf(8), extract_text=False, dpi=300, adaptive_dpi=True
+        )
+        
+        large_dpi = large[0]["dimensions"]["dpi"]
+        small_dpi = small[0]["dimensions"]["dpi"]
+        assert preprocessor.min_dpi <= large_dpi < small_dpi <= 300
+        assert large_dpi % preprocessor.dpi_step == 0
+    
+    @pytest.mark.asyncio
+    async def test_adaptive_dpi_without_text_keeps_max(self, preprocessor):
+        """Test pages with nothing to measure render at the requested DPI"""
+        import fitz
+        doc = fitz.open()
+        doc.new_page(width=200, height=200)
+        pdf_data = doc.tobytes()
+        doc.close()
+        
+        pages = await preprocessor.extract_pages(pdf_data, extract_text=False, dpi=200, adaptive_dpi=True)
+        assert pages[0]["dimensions"]["dpi"] == 200
+        assert pages[0]["dimensions"]["width"] == 556
+
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
\ No newline at end of file
@@ -0,0 +1,101 @@
+"""
+Unit tests for provider circuit breakers and routing
+"""
+from src.vlm.provider_router import (
+    CircuitBreaker,
+    CircuitState,
+    ProviderRouter,
+    get_provider_router,
+    reset_provider_router,
+)
+
+
+class TestCircuitBreaker:
+    def test_opens_on_failure_rate(self):
+        """Test breaker opens once the failure rate crosses the threshold"""
+        breaker = CircuitBreaker("openai", failure_threshold=0.5, min_calls=4)
+
+        breaker.record_success()
+        breaker.record_failure()
+        breaker.record_success()
+        assert breaker.state == CircuitState.CLOSED
+
+        breaker.record_failure()
+        assert breaker.state == CircuitState.OPEN
+        assert not breaker.allow_request()
+
+    def test_half_open_probe_closes_circuit(self):
+        """Test a successful probe after the cool-down closes the circuit"""
+        breaker = CircuitBreaker("openai", min_calls=1, open_seconds=0.0)
+        breaker.record_failure()
+
+        assert breaker.allow_request()
+        assert breaker.state == CircuitState.HALF_OPEN
+        # Only one probe at a time
+        assert not breaker.allow_request()
+
+        breaker.record_success()
+        assert breaker.state == CircuitState.CLOSED
+
+    def test_half_open_failure_reopens(self):
+        """Test a failed probe re-opens the circuit"""
+        breaker = CircuitBreaker("openai", min_calls=1, open_seconds=0.0)
+        breaker.record_failure()
+        assert breaker.allow_request()
+
+        breaker.open_seconds = 60.0
+        breaker.record_failure()
+
+        assert breaker.state == CircuitState.OPEN
+        assert not breaker.allow_request()
+
+    def test_cancelled_probe_releases_slot(self):
+        """Test an abandoned probe frees the half-open slot"""
+        breaker = CircuitBreaker("openai", min_calls=1, open_seconds=0.0)
+        breaker.record_failure()
+        assert breaker.allow_request()
+
+        breaker.record_cancelled()
+
+        assert breaker.allow_request()
+
+    def test_slow_call_counts_as_failure(self):
+        """Test calls above the latency threshold count as failures"""
+        breaker = CircuitBreaker("openai", min_calls=1, slow_call_ms=1000.0)
+
+        breaker.record_success(latency_ms=5000.0)
+
+        assert breaker.state == CircuitState.OPEN
+
+
+class TestProviderRouter:
+    def test_cost_orders_equally_healthy_providers(self):
+        """Test cheaper providers come first when health is equal"""
+        router = ProviderRouter(costs={"a": 3.0, "b": 1.0, "c": 2.0})
+
+        assert router.order(["a", "b", "c"]) == ["b", "c", "a"]
+
+    def test_success_rate_beats_cost(self):
+        """Test a failing cheap provider drops behind a healthy one"""
+        router = ProviderRouter(costs={"cheap": 0.1, "pricey": 5.0})
+        router.record_failure("cheap")
+
+        assert router.order(["cheap", "pricey"]) == ["pricey", "cheap"]
+
+    def test_open_circuit_excluded(self):
+        """Test providers with an open circuit are skipped"""
+        router = ProviderRouter(min_calls=1)
+        router.record_failure("deepseek")
+
+        assert router.order(["deepseek", "openai"]) == ["openai"]
+        assert router.snapshot()["deepseek"]["state"] == "open"
+
+    def test_shared_router(self):
+        """Test the process-wide router is reused until reset"""
+        reset_provider_router()
+        router = get_provider_router()
+
+        assert get_provider_router() is router
+
+        reset_provider_router()
+        assert get_provider_router() is not router
@@ -0,0 +1,81 @@
+"""
+Unit tests for page quality assessment
+"""
+import cv2
+import numpy as np
+import pytest
+
+from src.preprocessor.quality import assess_quality, estimate_skew
+
+
+def _render_page() -> np.ndarray:
+    page = np.full((1400, 1000), 255, dtype=np.uint8)
+    for i in range(25):
+        cv2.putText(page, "Registry transcript 0001 owner", (60, 80 + i * 50),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1.0, 0, 2)
+    return page
+
+
+def _rotate(page: np.ndarray, angle: float) -> np.ndarray:
+    height, width = page.shape
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    return cv2.warpAffine(page, matrix, (width, height), borderValue=255)
+
+
+@pytest.fixture(scope="module")
+def clean_page():
+    return _render_page()
+
+
+class TestAssessQuality:
+    def test_clean_render(self, clean_page):
+        """Test a digital render scores as sharp, noiseless, full-contrast and level"""
+        quality = assess_quality(clean_page)
+        
+        assert set(quality) == {'sharpness', 'noise', 'contrast', 'illumination', 'skew'}
+        assert quality['sharpness'] > 0.05
+        assert quality['noise'] < 1.0
+        assert quality['contrast'] > 240
+        assert quality['illumination'] < 10
+        assert abs(quality['skew']) < 0.5
+    
+    def test_noise(self, clean_page):
+        """Test additive noise raises the noise estimate"""
+        rng = np.random.default_rng(0)
+        noisy = np.clip(clean_page + rng.normal(0, 15, clean_page.shape), 0, 255).astype(np.uint8)
+        
+        assert assess_quality(noisy)['noise'] > 2.0
+    
+    def test_blur(self, clean_page):
+        """Test blur lowers sharpness"""
+        blurred = cv2.GaussianBlur(clean_page, (0, 0), 2.5)
+        
+        assert assess_quality(blurred)['sharpness'] < assess_quality(clean_page)['sharpness'] / 4
+    
+    def test_low_contrast(self, clean_page):
+        """Test a compressed intensity range is reported as low contrast"""
+        faded = (clean_page * 0.4 + 100).astype(np.uint8)
+        
+        assert assess_quality(faded)['contrast'] < 120
+    
+    def test_uneven_illumination(self, clean_page):
+        """Test a shading gradient across the page is reported"""
+        shade = np.linspace(1.0, 0.6, clean_page.shape[1], dtype=np.float32)[None, :]
+        shaded = (clean_page * shade).astype(np.uint8)
+        
+        assert assess_quality(shaded)['illumination'] > 30
+
+
+class TestEstimateSkew:
+    @pytest.mark.parametrize("angle", [-3.0, 2.0])
+    def test_rotated_page(self, clean_page, angle):
+        """Test the skew of a rotated page is recovered, counter-clockwise positive"""
+        assert estimate_skew(_rotate(clean_page, angle)) == pytest.approx(angle, abs=0.5)
+    
+    def test_blank_page(self):
+        """Test a page without ink has no skew"""
+        assert estimate_skew(np.full((200, 200), 255, dtype=np.uint8)) == 0.0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
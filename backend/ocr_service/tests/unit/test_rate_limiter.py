@@ -0,0 +1,108 @@
+"""
+Unit tests for VLM provider rate limiting
+"""
+import asyncio
+import time
+
+import pytest
+
+from src.vlm.rate_limiter import (
+    IMAGE_TOKEN_ESTIMATE,
+    ProviderRateLimiter,
+    TokenBucket,
+    estimate_request_tokens,
+    estimate_tokens,
+    get_provider_limiter,
+    reset_provider_limiters,
+)
+
+
+class TestTokenEstimate:
+    def test_estimate_tokens(self):
+        """Test CJK and latin text estimates"""
+        assert estimate_tokens("") == 0
+        assert estimate_tokens("建物謄本") == 4
+        assert estimate_tokens("abcdefgh") == 2
+
+    def test_estimate_request_tokens(self):
+        """Test chat messages with text and image parts"""
+        messages = [
+            {"role": "system", "content": "abcd"},
+            {"role": "user", "content": [
+                {"type": "text", "text": "地號"},
+                {"type": "image_url", "image_url": {"url": "data:..."}},
+            ]},
+        ]
+
+        assert estimate_request_tokens(messages) == 1 + 2 + IMAGE_TOKEN_ESTIMATE
+
+
+class TestTokenBucket:
+    @pytest.mark.asyncio
+    async def test_burst_then_wait(self):
+        """Test capacity is available immediately, then refills at rate"""
+        bucket = TokenBucket(rate_per_minute=6000, capacity=2)  # 100 tokens/s
+
+        start = time.monotonic()
+        await bucket.acquire()
+        await bucket.acquire()
+        burst = time.monotonic() - start
+        await bucket.acquire()
+        total = time.monotonic() - start
+
+        assert burst < 0.005
+        assert total >= 0.009
+
+    @pytest.mark.asyncio
+    async def test_oversized_request_does_not_deadlock(self):
+        """Test a request larger than the bucket is clamped"""
+        bucket = TokenBucket(rate_per_minute=60000, capacity=10)
+
+        await asyncio.wait_for(bucket.acquire(50), timeout=1)
+
+
+class TestProviderRateLimiter:
+    @pytest.mark.asyncio
+    async def test_concurrency_cap(self):
+        """Test at most max_concurrency calls run at once"""
+        limiter = ProviderRateLimiter("test", rpm=60000, tpm=10**9, max_concurrency=2)
+        active = 0
+        peak = 0
+
+        async def call():
+            nonlocal active, peak
+            async with limiter.limit(tokens=10):
+                active += 1
+                peak = max(peak, active)
+                await asyncio.sleep(0.01)
+                active -= 1
+
+        await asyncio.gather(*(call() for _ in range(6)))
+
+        assert peak == 2
+
+    def test_limits_from_env(self, monkeypatch):
+        """Test RPM/TPM/concurrency overrides from environment"""
+        reset_provider_limiters()
+        monkeypatch.setenv("DEEPSEEK_RPM", "120")
+        monkeypatch.setenv("DEEPSEEK_TPM", "5000")
+        monkeypatch.setenv("DEEPSEEK_MAX_CONCURRENCY", "3")
+
+        limiter = get_provider_limiter("deepseek")
+
+        assert (limiter.rpm, limiter.tpm, limiter.max_concurrency) == (120, 5000, 3)
+        assert get_provider_limiter("deepseek") is limiter
+        reset_provider_limiters()
+
+    def test_unknown_provider_uses_default(self):
+        """Test unknown providers get the default limits"""
+        reset_provider_limiters()
+
+        limiter = get_provider_limiter("unknown")
+
+        assert limiter.rpm == 30
+        reset_provider_limiters()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
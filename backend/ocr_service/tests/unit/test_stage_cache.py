@@ -0,0 +1,76 @@
+"""
+Unit tests for StageCache module
+"""
+import asyncio
+
+import pytest
+
+from src.core.stage_cache import StageCache, hash_bytes
+from src.utils.cache_manager import CacheManager
+
+
+class TestStageCache:
+    @pytest.fixture
+    def stage_cache(self):
+        # Memory-only: CacheManager is never initialized against Redis
+        return StageCache(CacheManager(max_memory_mb=10), version="test")
+
+    def test_key_depends_on_stage_params(self, stage_cache):
+        """Test keys vary with stage, content and parameters but not param order"""
+        content_hash = hash_bytes(b"page")
+        key = stage_cache.key('preprocess', content_hash, {'enhance_quality': True, 'remove_noise': False})
+
+        assert key.startswith(f"stage:preprocess:{content_hash}:")
+        assert key == stage_cache.key('preprocess', content_hash, {'remove_noise': False, 'enhance_quality': True})
+        assert key != stage_cache.key('preprocess', content_hash, {'enhance_quality': True, 'remove_noise': True})
+        assert key != stage_cache.key('ocr', content_hash, {'enhance_quality': True, 'remove_noise': False})
+        assert key != stage_cache.key('preprocess', hash_bytes(b"other"), {'enhance_quality': True, 'remove_noise': False})
+
+    def test_key_depends_on_version(self, stage_cache):
+        """Test a pipeline version bump invalidates every stage"""
+        other = StageCache(stage_cache.cache_manager, version="other")
+        assert stage_cache.key('ocr', "abc", {'language': 'zh-TW'}) != other.key('ocr', "abc", {'language': 'zh-TW'})
+
+    @pytest.mark.asyncio
+    async def test_get_or_compute_caches_per_params(self, stage_cache):
+        """Test a stage is recomputed only when its own parameters change"""
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0)
+            return {'text_blocks': [{'text': '建物'}]}
+
+        params = {'language': 'zh-TW'}
+        first = await stage_cache.get_or_compute('ocr', "abc", params, compute)
+        second = await stage_cache.get_or_compute('ocr', "abc", params, compute)
+        await stage_cache.get_or_compute('ocr', "abc", {'language': 'en'}, compute)
+
+        assert first == second == {'text_blocks': [{'text': '建物'}]}
+        assert len(calls) == 2
+        assert await stage_cache.get('ocr', "abc", params) == first
+
+    @pytest.mark.asyncio
+    async def test_set_and_get(self, stage_cache):
+        """Test explicit set/get round trip"""
+        assert await stage_cache.get('ocr', "abc", {'language': 'en'}) is None
+
+        await stage_cache.set('ocr', "abc", {'language': 'en'}, {'page': 1})
+
+        assert await stage_cache.get('ocr', "abc", {'language': 'en'}) == {'page': 1}
+
+    @pytest.mark.asyncio
+    async def test_disabled_passthrough(self):
+        """Test a cache without a backend always computes"""
+        stage_cache = StageCache()
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            return "value"
+
+        assert not stage_cache.enabled
+        assert await stage_cache.get_or_compute('render', "abc", {'dpi': 300}, compute) == "value"
+        assert await stage_cache.get_or_compute('render', "abc", {'dpi': 300}, compute) == "value"
+        assert await stage_cache.get('render', "abc", {'dpi': 300}) is None
+        assert len(calls) == 2
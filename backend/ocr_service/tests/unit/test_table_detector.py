@@ -0,0 +1,127 @@
+"""
+Unit tests for TableDetector module
+"""
+from unittest.mock import patch
+
+import cv2
+import numpy as np
+import pytest
+
+from src.layout.line_extractor import extract_lines
+from src.layout.table_detector import TableDetector, _join_words
+from src.preprocessor.page_image import PageImage
+
+
+@pytest.fixture
+def table_page():
+    """4x3 ruled table whose header row spans all three columns"""
+    page = np.full((800, 1000), 255, dtype=np.uint8)
+    for y in (100, 200, 300, 400, 500):
+        cv2.line(page, (100, y), (900, y), 0, 3)
+    for x in (100, 900):
+        cv2.line(page, (x, 100), (x, 500), 0, 3)
+    for x in (350, 650):
+        cv2.line(page, (x, 200), (x, 500), 0, 3)
+    return page
+
+
+@pytest.fixture
+def words():
+    blocks = [{'text': '所有權部', 'bbox': [400, 140, 120, 30]}]
+    for row, y in enumerate((240, 340, 440)):
+        for col, x in enumerate((120, 370, 670)):
+            blocks.append({'text': f'r{row}', 'bbox': [x, y, 40, 30]})
+            blocks.append({'text': f'c{col}', 'bbox': [x + 50, y, 40, 30]})
+    # Outside the table
+    blocks.append({'text': 'footer', 'bbox': [100, 700, 80, 30]})
+    return blocks
+
+
+class TestTableDetector:
+    @pytest.fixture
+    def detector(self):
+        return TableDetector()
+    
+    @pytest.mark.asyncio
+    async def test_initialize(self, detector):
+        """Test initialization"""
+        await detector.initialize()
+        assert detector.is_initialized is True
+    
+    def test_grid_reconstruction(self, detector, table_page, words):
+        """Test rows, columns, spanning cells and cell texts are recovered"""
+        tables = detector.detect_array(table_page, words, page_number=3)
+        
+        assert len(tables) == 1
+        table = tables[0]
+        assert table['page'] == 3
+        assert (table['rows'], table['columns']) == (4, 3)
+        np.testing.assert_allclose(table['row_boundaries'], [100, 200, 300, 400, 500], atol=3)
+        np.testing.assert_allclose(table['column_boundaries'], [100, 350, 650, 900], atol=3)
+        
+        header = table['cells'][0]
+        assert (header['row'], header['column'], header['row_span'], header['column_span']) == (0, 0, 1, 3)
+        assert len(table['cells']) == 1 + 3 * 3
+        
+        assert table['data'][0] == ['所有權部', '', '']
+        assert table['data'][1:] == [[f'r{row} c{col}' for col in range(3)] for row in range(3)]
+    
+    def test_reuses_extracted_lines(self, detector, table_page, words):
+        """Test precomputed ruling lines give the same tables"""
+        lines = extract_lines(table_page)
+        
+        assert detector.detect_array(table_page, words, lines=lines) == detector.detect_array(table_page, words)
+    
+    def test_page_without_table(self, detector):
+        """Test a lone rule or plain text is not a table"""
+        page = np.full((400, 600), 255, dtype=np.uint8)
+        cv2.line(page, (50, 200), (550, 200), 0, 2)
+        cv2.putText(page, "no table", (50, 100), cv2.FONT_HERSHEY_SIMPLEX, 1.0, 0, 2)
+        
+        assert detector.detect_array(page) == []
+    
+    def test_time_budget(self, table_page):
+        """Test tables beyond the per-page budget are skipped"""
+        detector = TableDetector(time_budget=0.0)
+        
+        assert detector.detect_array(table_page) == []
+    
+    def test_deadline_stops_label_propagation(self, detector, table_page, words):
+        """Test a table whose grid outlasts the deadline mid-propagation is dropped"""
+        lines = extract_lines(table_page)
+        bbox = detector._table_regions(lines)[0]
+        word_arrays = detector._word_arrays(words)
+        
+        assert detector._build_table(lines, bbox, word_arrays, deadline=None) is not None
+        
+        # The spanning header needs a second propagation pass; time runs out before it
+        clock = iter([0.0] + [10.0] * 10)
+        with patch('src.layout.table_detector.time.perf_counter', side_effect=lambda: next(clock)):
+            assert detector._build_table(lines, bbox, word_arrays, deadline=5.0) is None
+    
+    @pytest.mark.asyncio
+    async def test_detect_tables_all_pages(self, detector, table_page, words):
+        """Test every page is searched and OCR words fill the cells"""
+        pages = [PageImage(table_page, page_number=1), PageImage(table_page, page_number=2)]
+        text_results = [{'page': 1, 'text_blocks': words}, {'page': 2, 'text_blocks': []}]
+        
+        tables = await detector.detect_tables(pages, text_results)
+        
+        assert [table['page'] for table in tables] == [1, 2]
+        assert tables[0]['data'][1][0] == 'r0 c0'
+        assert tables[1]['data'][1][0] == ''
+    
+    def test_join_words(self):
+        """Test Latin words are spaced and CJK characters are not"""
+        assert _join_words(['建物', '所有權部', '0001', 'ABC', '全部']) == '建物所有權部0001 ABC全部'
+    
+    @pytest.mark.asyncio
+    async def test_health_check(self, detector):
+        """Test health check"""
+        health_status = await detector.health_check()
+        
+        assert health_status['status'] == 'healthy'
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,183 @@
+"""
+Unit tests for TesseractWorkerPool module
+"""
+import threading
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+
+from src.ocr import tesseract_pool
+from src.ocr.tesseract_pool import TesseractWorkerPool
+from src.ocr.text_recognizer import TextRecognizer
+from src.utils.error_handler import TimeoutError as OCRTimeoutError
+
+
+class FakeWord:
+    def __init__(self, text, bbox, block_start=False, line_start=False):
+        self.text = text
+        self.bbox = bbox
+        self.block_start = block_start
+        self.line_start = line_start
+
+    def IsAtBeginningOf(self, level):
+        return self.block_start if level == "BLOCK" else self.line_start
+
+    def BoundingBox(self, level):
+        return self.bbox
+
+    def Confidence(self, level):
+        return 88.0
+
+    def GetUTF8Text(self, level):
+        return self.text
+
+
+@pytest.fixture
+def fake_tesserocr():
+    """Stand-in for the tesserocr binding"""
+    created = []
+    words = [
+        FakeWord("建物", (10, 20, 50, 40), block_start=True, line_start=True),
+        FakeWord("謄本", (60, 20, 100, 40)),
+        FakeWord("地號", (10, 60, 50, 80), line_start=True),
+    ]
+
+    def make_api(lang, **kwargs):
+        api = MagicMock(name=f"api-{lang}")
+        api.lang = lang
+        api.GetIterator.return_value = object()
+        created.append(api)
+        return api
+
+    fake = SimpleNamespace(
+        PyTessBaseAPI=MagicMock(side_effect=make_api),
+        RIL=SimpleNamespace(WORD="WORD", BLOCK="BLOCK", TEXTLINE="TEXTLINE"),
+        iterate_level=lambda iterator, level: iter(words),
+        created=created,
+    )
+    with patch.object(tesseract_pool, "tesserocr", fake), \
+            patch.object(tesseract_pool, "Image", MagicMock(), create=True):
+        yield fake
+
+
+class TestTesseractWorkerPool:
+    def test_api_reused_per_language(self, fake_tesserocr):
+        """Test models are loaded once and reused"""
+        pool = TesseractWorkerPool(size_per_language=2)
+        image = np.zeros((10, 10), dtype=np.uint8)
+
+        for _ in range(5):
+            pool.image_to_data(image, "chi_tra+eng")
+        pool.image_to_data(image, "eng")
+
+        langs = [api.lang for api in fake_tesserocr.created]
+        assert langs == ["chi_tra+eng", "eng"]
+
+    def test_pool_size_bounds_instances(self, fake_tesserocr):
+        """Test concurrent checkouts never exceed the pool size"""
+        pool = TesseractWorkerPool(size_per_language=2)
+        barrier = threading.Barrier(2)
+
+        def hold():
+            with pool.acquire("eng"):
+                barrier.wait(timeout=5)
+
+        threads = [threading.Thread(target=hold) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        with pool.acquire("eng"):
+            pass
+
+        assert len(fake_tesserocr.created) == 2
+
+    def test_image_to_data_format(self, fake_tesserocr):
+        """Test word iteration matches pytesseract's DICT output"""
+        pool = TesseractWorkerPool()
+
+        data = pool.image_to_data(
+            np.zeros((10, 10), dtype=np.uint8), "eng",
+            psm=6, variables={"preserve_interword_spaces": "1"}
+        )
+
+        assert data["text"] == ["建物", "謄本", "地號"]
+        assert data["left"] == [10, 60, 10]
+        assert data["width"] == [40, 40, 40]
+        assert data["line_num"] == [1, 1, 2]
+        assert data["word_num"] == [1, 2, 1]
+        api = fake_tesserocr.created[0]
+        api.SetPageSegMode.assert_called_with(6)
+        api.SetVariable.assert_called_with("preserve_interword_spaces", "1")
+
+    def test_close_releases_apis(self, fake_tesserocr):
+        """Test close ends every instance"""
+        pool = TesseractWorkerPool()
+        pool.preload("eng")
+
+        pool.close()
+
+        fake_tesserocr.created[0].End.assert_called_once()
+
+    def test_failed_creation_frees_slot(self, fake_tesserocr):
+        """Test a model that fails to load does not use up the pool"""
+        pool = TesseractWorkerPool(size_per_language=1, checkout_timeout=0.1)
+        make_api = fake_tesserocr.PyTessBaseAPI.side_effect
+        failures = [RuntimeError("bad traineddata")]
+
+        def flaky_api(lang, **kwargs):
+            if failures:
+                raise failures.pop()
+            return make_api(lang, **kwargs)
+
+        fake_tesserocr.PyTessBaseAPI.side_effect = flaky_api
+
+        with pytest.raises(RuntimeError):
+            pool.preload("eng")
+        with pool.acquire("eng") as api:
+            assert api.lang == "eng"
+
+    def test_exhausted_pool_times_out(self, fake_tesserocr):
+        """Test waiting for a busy pool ends with a timeout error"""
+        pool = TesseractWorkerPool(size_per_language=1, checkout_timeout=0.05)
+
+        with pool.acquire("eng"):
+            with pytest.raises(OCRTimeoutError):
+                pool.preload("eng")
+
+    def test_close_with_api_checked_out(self, fake_tesserocr):
+        """Test an API in use during close is ended when it is returned"""
+        pool = TesseractWorkerPool()
+
+        with pool.acquire("eng") as api:
+            pool.close()
+            api.End.assert_not_called()
+
+        api.End.assert_called_once()
+        with pool.acquire("eng") as fresh:
+            assert fresh is not api
+
+    def test_recognizer_uses_pool(self, fake_tesserocr):
+        """Test TextRecognizer routes Tesseract calls through the pool"""
+        recognizer = TextRecognizer(use_worker_pool=True, batch_regions=False)
+        page = np.full((200, 200), 255, dtype=np.uint8)
+
+        with patch("pytesseract.image_to_data") as mock_subprocess:
+            results = recognizer.recognize_array(page, [{"bbox": [5, 5, 120, 100]}], "zh-TW")
+
+        mock_subprocess.assert_not_called()
+        assert fake_tesserocr.created[0].lang == "chi_tra+eng"
+        assert results[0]["bbox"] == [15, 25, 40, 20]
+
+    def test_recognizer_falls_back_without_binding(self):
+        """Test pytesseract is used when tesserocr is missing"""
+        with patch.object(tesseract_pool, "tesserocr", None):
+            recognizer = TextRecognizer(use_worker_pool=True)
+
+        assert recognizer.worker_pool is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
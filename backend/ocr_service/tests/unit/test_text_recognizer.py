@@ -0,0 +1,97 @@
+"""
+Unit tests for TextRecognizer module
+"""
+import numpy as np
+import pytest
+from unittest.mock import patch
+
+from src.ocr.text_recognizer import TextRecognizer
+
+
+def _ocr_data(words):
+    """Build a pytesseract image_to_data dict from (text, left, top, w, h)"""
+    return {
+        'level': [5] * len(words),
+        'page_num': [1] * len(words),
+        'block_num': [1] * len(words),
+        'par_num': [1] * len(words),
+        'line_num': list(range(1, len(words) + 1)),
+        'word_num': [1] * len(words),
+        'left': [w[1] for w in words],
+        'top': [w[2] for w in words],
+        'width': [w[3] for w in words],
+        'height': [w[4] for w in words],
+        'conf': ['90'] * len(words),
+        'text': [w[0] for w in words],
+    }
+
+
+class TestTextRecognizer:
+    @pytest.fixture
+    def recognizer(self):
+        return TextRecognizer(mosaic_padding=10)
+
+    @pytest.fixture
+    def page(self):
+        return np.full((500, 400), 255, dtype=np.uint8)
+
+    @pytest.fixture
+    def regions(self):
+        return [
+            {'bbox': [50, 100, 120, 40]},
+            {'bbox': [200, 300, 80, 30]},
+        ]
+
+    def test_build_mosaic(self, recognizer, page, regions):
+        """Test regions are stacked with padding"""
+        rois = [(x, y, page[y:y+h, x:x+w]) for x, y, w, h in (r['bbox'] for r in regions)]
+
+        mosaic, placements = recognizer._build_mosaic(rois)
+
+        assert mosaic.shape == (10 + 40 + 10 + 30 + 10, 120 + 20)
+        assert placements == [(10, 50, 40, 90), (60, 90, 190, 240)]
+
+    def test_batched_recognition_single_call(self, recognizer, page, regions):
+        """Test one Tesseract call maps words back to page coordinates"""
+        # Word boxes in mosaic coordinates: region 1 starts at y=10, region 2 at y=60
+        data = _ocr_data([("建物", 15, 20, 30, 15), ("標示", 12, 65, 20, 12)])
+
+        with patch('pytesseract.image_to_data', return_value=data) as mock_ocr:
+            results = recognizer.recognize_array(page, regions, 'zh-TW')
+
+        assert mock_ocr.call_count == 1
+        assert [r['text'] for r in results] == ["建物", "標示"]
+        assert results[0]['bbox'] == [55, 110, 30, 15]
+        assert results[1]['bbox'] == [202, 305, 20, 12]
+
+    def test_unbatched_recognition_per_region(self, recognizer, page, regions):
+        """Test legacy mode calls Tesseract once per region"""
+        data = _ocr_data([("字", 1, 2, 10, 10)])
+
+        with patch('pytesseract.image_to_data', return_value=data) as mock_ocr:
+            results = recognizer.recognize_array(page, regions, 'zh-TW', batch=False)
+
+        assert mock_ocr.call_count == 2
+        assert results[0]['bbox'] == [51, 102, 10, 10]
+        assert results[1]['bbox'] == [201, 302, 10, 10]
+
+    def test_mosaic_chunking(self, recognizer):
+        """Test mosaics are split below Tesseract's height limit"""
+        tall = np.zeros((12000, 10), dtype=np.uint8)
+        rois = [(0, 0, tall)] * 5
+
+        chunks = recognizer._chunk_for_mosaic(rois)
+
+        assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+
+    def test_empty_regions(self, recognizer, page):
+        """Test no Tesseract call without regions"""
+        with patch('pytesseract.image_to_data') as mock_ocr:
+            results = recognizer.recognize_array(page, [], 'zh-TW')
+
+        assert results == []
+        mock_ocr.assert_not_called()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
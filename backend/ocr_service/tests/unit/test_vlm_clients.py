@@ -0,0 +1,141 @@
+"""
+Unit tests for the pooled VLM client registry
+"""
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from src.ocr_engine import clients
+from src.ocr_engine.clients import VLMClientRegistry
+from src.ocr_engine.vlm import OUTPUT_SCHEMA, SYSTEM_PROMPT, VLMEngine, build_system_prompt
+
+
+class FakeSDKClient:
+    def __init__(self, api_key=None, base_url=None, http_client=None):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.http_client = http_client
+        self.close = AsyncMock()
+
+
+class TestVLMClientRegistry:
+    def test_openai_client_reused_per_base_url(self):
+        """Test one client per provider/base_url"""
+        registry = VLMClientRegistry()
+
+        with patch.object(clients, "AsyncOpenAI", FakeSDKClient):
+            first = registry.openai("deepseek", "key", "https://api.deepseek.com")
+            second = registry.openai("deepseek", "key", "https://api.deepseek.com")
+            other = registry.openai("grok", "key", "https://api.x.ai/v1")
+
+        assert first is second
+        assert other is not first
+
+    def test_http_client_limits(self):
+        """Test SDK clients get a keep-alive transport with the configured limits"""
+        registry = VLMClientRegistry(max_connections=8, max_keepalive_connections=4, keepalive_expiry=30.0)
+
+        httpx = MagicMock()
+
+        with patch.object(clients, "AsyncOpenAI", FakeSDKClient), patch.object(clients, "httpx", httpx):
+            client = registry.openai("openai", "key")
+
+        assert client.http_client is httpx.AsyncClient.return_value
+        httpx.Limits.assert_called_once_with(
+            max_connections=8, max_keepalive_connections=4, keepalive_expiry=30.0
+        )
+
+    def test_google_configured_once(self):
+        """Test genai.configure runs once per API key"""
+        registry = VLMClientRegistry()
+        genai = MagicMock()
+
+        with patch.object(clients, "genai", genai):
+            registry.configure_google("key")
+            registry.configure_google("key")
+
+        genai.configure.assert_called_once_with(api_key="key")
+
+    @pytest.mark.asyncio
+    async def test_aclose_closes_all_clients(self):
+        """Test shutdown closes every pooled client"""
+        registry = VLMClientRegistry()
+
+        with patch.object(clients, "AsyncOpenAI", FakeSDKClient), \
+                patch.object(clients, "AsyncAnthropic", FakeSDKClient):
+            openai_client = registry.openai("openai", "key")
+            anthropic_client = registry.anthropic("key")
+
+        await registry.aclose()
+
+        openai_client.close.assert_awaited_once()
+        anthropic_client.close.assert_awaited_once()
+        assert registry._clients == {}
+
+    @pytest.mark.asyncio
+    async def test_engines_share_registry_client(self):
+        """Test engines for the same provider share one client"""
+        await clients.close_client_registry()
+
+        with patch.object(clients, "AsyncOpenAI", FakeSDKClient):
+            first = VLMEngine(provider="deepseek", model="deepseek-chat", api_key="key")
+            second = VLMEngine(provider="deepseek", model="deepseek-chat", api_key="key")
+            await first.initialize()
+            await second.initialize()
+
+        assert first.client is second.client
+        assert first.client.base_url == "https://api.deepseek.com"
+
+        await clients.close_client_registry()
+
+    @pytest.mark.asyncio
+    async def test_complete_translates_messages_for_anthropic(self):
+        """Test chat messages with a data-URL image become Messages-API blocks"""
+        engine = VLMEngine(provider="anthropic", model="claude", api_key="key")
+        client = MagicMock()
+        client.messages.create = AsyncMock(return_value=MagicMock(content=[MagicMock(text='{"a": 1}')]))
+        engine._client = client
+        messages = [
+            {"role": "system", "content": "schema"},
+            {"role": "user", "content": [
+                {"type": "text", "text": "page"},
+                {"type": "image_url", "image_url": {"url": "data:image/png;base64,QUJD"}},
+            ]},
+        ]
+
+        assert await engine.complete(messages) == '{"a": 1}'
+
+        kwargs = client.messages.create.call_args.kwargs
+        assert kwargs["system"] == "schema"
+        assert kwargs["messages"] == [{"role": "user", "content": [
+            {"type": "text", "text": "page"},
+            {"type": "image", "source": {"type": "base64", "media_type": "image/png", "data": "QUJD"}},
+        ]}]
+
+    @pytest.mark.asyncio
+    async def test_complete_passes_messages_to_openai_compatible(self):
+        """Test OpenAI-compatible providers get the messages as-is in JSON mode"""
+        engine = VLMEngine(provider="deepseek", model="deepseek-chat", api_key="key")
+        client = MagicMock()
+        reply = MagicMock()
+        reply.choices[0].message.content = "{}"
+        client.chat.completions.create = AsyncMock(return_value=reply)
+        engine._client = client
+        messages = [{"role": "user", "content": "Hello"}]
+
+        assert await engine.complete(messages, timeout=5.0) == "{}"
+
+        client.chat.completions.create.assert_awaited_once_with(
+            model="deepseek-chat", messages=messages,
+            response_format={"type": "json_object"}, timeout=5.0
+        )
+
+    def test_system_prompt_limited_to_sections(self):
+        """Test the system prompt schema and example carry only the requested sections"""
+        prompt = build_system_prompt(["ownership_info", "unknown"])
+
+        assert '"ownership_info"' in prompt and '"owner": "詹琬"' in prompt
+        assert all(f'"{name}"' not in prompt for name in OUTPUT_SCHEMA if name != "ownership_info")
+        assert len(prompt) < len(SYSTEM_PROMPT)
+        assert build_system_prompt([]) == build_system_prompt(["unknown"]) == SYSTEM_PROMPT
+        assert all(f'"{name}"' in SYSTEM_PROMPT for name in OUTPUT_SCHEMA)
@@ -0,0 +1,205 @@
+"""
+Unit tests for the multi-provider VLM engine
+"""
+import asyncio
+import json
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from src.ocr_engine.vlm import DEFAULT_MODELS, build_system_prompt
+from src.vlm.context_builder import PageContext
+from src.vlm.provider_router import CircuitState, ProviderRouter
+from src.vlm.rate_limiter import get_provider_limiter, reset_provider_limiters
+from src.vlm.vlm_engine import VLMEngine
+from src.utils.error_handler import VLMError
+
+
+class FakeProviderEngine:
+    """Per-provider engine returning canned replies (or raising)"""
+
+    def __init__(self, provider, reply=None, error=None, api_key="key"):
+        self.provider = provider
+        self.api_key = api_key
+        self.complete = AsyncMock(side_effect=error, return_value=reply)
+        self.close = AsyncMock()
+
+
+@pytest.fixture(autouse=True)
+def fresh_limiters():
+    reset_provider_limiters()
+    yield
+    reset_provider_limiters()
+
+
+@pytest.fixture
+def router():
+    router = ProviderRouter(min_calls=1)
+    with patch("src.vlm.vlm_engine.get_provider_router", return_value=router):
+        yield router
+
+
+def make_engine(providers):
+    engine = VLMEngine()
+    engine._create_engine = lambda provider, model="auto": providers[provider]
+    return engine
+
+
+def page_context(page=1):
+    return PageContext(page=page, total_pages=1, text="建物標示部", layout=None)
+
+
+class TestVLMEngine:
+    def test_default_construction(self):
+        """Test the engine builds without arguments and picks per-provider models"""
+        engine = VLMEngine()
+
+        assert engine.provider == "deepseek"
+        assert engine.model == DEFAULT_MODELS["deepseek"]
+        grok = engine._create_engine("grok")
+        assert grok.model == DEFAULT_MODELS["grok"]
+        assert engine._create_engine("grok") is grok
+
+    @pytest.mark.asyncio
+    async def test_provider_success(self, router):
+        """Test a JSON reply is parsed and recorded as a success"""
+        providers = {"deepseek": FakeProviderEngine("deepseek", reply=json.dumps({"notes": ["ok"]}))}
+        engine = make_engine(providers)
+
+        result = await engine._call_vlm_for_page(
+            b"png", page_context(), "building_title", "zh-TW", ["deepseek"]
+        )
+
+        assert result == {"notes": ["ok"]}
+        messages = providers["deepseek"].complete.call_args.args[0]
+        # Only the schema section the page's wording points at is requested
+        assert messages[0]["content"] == build_system_prompt(["building_characteristics"])
+        assert '"ownership_info"' not in messages[0]["content"]
+        assert router.breaker("deepseek").success_rate == 1.0
+
+    @pytest.mark.asyncio
+    async def test_fallback_to_next_provider(self, router):
+        """Test a failing provider hands the page to the next one"""
+        providers = {
+            "deepseek": FakeProviderEngine("deepseek", error=RuntimeError("down")),
+            "grok": FakeProviderEngine("grok", reply='```json\n{"notes": []}\n```'),
+        }
+        engine = make_engine(providers)
+
+        result = await engine._call_vlm_for_page(
+            b"png", page_context(), "building_title", "zh-TW", ["deepseek", "grok"]
+        )
+
+        assert result == {"notes": []}
+        assert router.breaker("deepseek").failure_rate == 1.0
+
+    @pytest.mark.asyncio
+    async def test_open_circuit_is_skipped(self, router):
+        """Test a provider with an open breaker is not called"""
+        providers = {
+            "deepseek": FakeProviderEngine("deepseek", error=RuntimeError("down")),
+            "grok": FakeProviderEngine("grok", reply='{"notes": []}'),
+        }
+        engine = make_engine(providers)
+        router.record_failure("deepseek")
+        assert router.breaker("deepseek").state == CircuitState.OPEN
+
+        await engine._call_vlm_for_page(
+            b"png", page_context(), "building_title", "zh-TW", ["deepseek", "grok"]
+        )
+
+        providers["deepseek"].complete.assert_not_called()
+        providers["grok"].complete.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_all_providers_fail(self, router):
+        """Test exhausting every provider raises VLMError"""
+        providers = {
+            "deepseek": FakeProviderEngine("deepseek", error=RuntimeError("down")),
+            "grok": FakeProviderEngine("grok", api_key=None),
+        }
+        engine = make_engine(providers)
+
+        with pytest.raises(VLMError):
+            await engine._call_vlm_for_page(
+                b"png", page_context(), "building_title", "zh-TW", ["deepseek", "grok"]
+            )
+
+        # Providers without credentials are skipped, not counted as failures
+        providers["grok"].complete.assert_not_called()
+        assert router.breaker("grok").failure_rate == 0.0
+
+    @pytest.mark.asyncio
+    async def test_open_circuit_spends_no_rate_budget(self, router):
+        """Test the breaker is checked before the provider's limiter is entered"""
+        providers = {
+            "deepseek": FakeProviderEngine("deepseek"),
+            "grok": FakeProviderEngine("grok", reply='{"notes": []}'),
+        }
+        engine = make_engine(providers)
+        router.record_failure("deepseek")
+        limited = []
+
+        def limiter(provider):
+            limited.append(provider)
+            return get_provider_limiter(provider)
+
+        # order() normally drops open circuits; keep deepseek listed, as when
+        # its breaker opens while another page is already past order()
+        with patch("src.vlm.vlm_engine.get_provider_limiter", side_effect=limiter), \
+                patch.object(router, "order", side_effect=lambda providers: list(providers)):
+            await engine._call_vlm_for_page(
+                b"png", page_context(), "building_title", "zh-TW", ["deepseek", "grok"]
+            )
+
+        assert limited == ["grok"]
+
+    @pytest.mark.asyncio
+    async def test_pages_dispatched_concurrently_in_order(self):
+        """Test pages run at once and merge in document order, whatever finishes first"""
+        engine = VLMEngine()
+        active = 0
+        peak = 0
+
+        async def fake_page(image_data, context, document_type, language, provider_priority=None):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            # Earlier pages finish last
+            await asyncio.sleep(0.01 * (4 - context.page))
+            active -= 1
+            return {"items": [context.page]}
+
+        text_results = [{"page": page, "text_blocks": []} for page in (1, 2, 3)]
+        with patch.object(engine, "_process_image_with_vlm", side_effect=fake_page):
+            result = await engine.process([b"1", b"2", b"3"], text_results, [], document_type="generic")
+
+        assert peak == 3
+        assert result == {"items": [1, 2, 3]}
+
+    @pytest.mark.asyncio
+    async def test_failed_page_cancels_the_rest(self):
+        """Test one failing page cancels pages still in flight"""
+        engine = VLMEngine()
+        cancelled = []
+
+        async def fake_page(image_data, context, document_type, language, provider_priority=None):
+            if context.page == 1:
+                raise VLMError("All VLM providers failed")
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelled.append(context.page)
+                raise
+
+        text_results = [{"page": page, "text_blocks": []} for page in (1, 2)]
+        with patch.object(engine, "_process_image_with_vlm", side_effect=fake_page):
+            with pytest.raises(VLMError):
+                await engine.process([b"1", b"2"], text_results, [])
+            await asyncio.sleep(0)
+
+        assert cancelled == [2]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])